@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+"""
+Benchmarks for hot paths: parsing, converting and dispatching of items.
+
+    pip install pytest-benchmark
+    # Run and save results to .benchmarks/<machine>/NNNN_<commit>.json
+    pytest benchmarks --benchmark-autosave
+    # Compare with the latest saved run and fail on regressions
+    pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:10%
+"""
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
+
+try:
+    import pytest_benchmark
+except ImportError:
+    pytest_benchmark = None
+    # (Skip benchmarks instead of failing on missing "benchmark" fixture)
+    collect_ignore_glob = ["test_*.py"]
+
+
+@pytest.fixture(autouse=True)
+def _disable_logging_debug():
+    # (Debug logging of each message would dominate timings)
+    import logging
+    prev_level = logging.root.manager.disable
+    logging.disable(logging.DEBUG)
+    yield
+    logging.disable(prev_level)
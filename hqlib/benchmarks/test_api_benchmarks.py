@@ -0,0 +1,53 @@
+import pytest
+
+from hyperquant.api import Endpoint, item_format_by_endpoint, convert_items_obj_to_list, \
+    convert_items_obj_to_dict, convert_items_dict_to_list, convert_items_list_to_dict, make_data_response, \
+    make_data_stream_response, ResponseFormat, msgpack
+from benchmarks.utils import make_trades
+
+item_format = item_format_by_endpoint[Endpoint.TRADE]
+obj_items = make_trades()
+list_items = convert_items_obj_to_list(obj_items, item_format)
+dict_items = convert_items_obj_to_dict(obj_items, item_format)
+
+
+@pytest.mark.benchmark(group="convert")
+@pytest.mark.parametrize("fun, items", [
+    (convert_items_obj_to_list, obj_items),
+    (convert_items_obj_to_dict, obj_items),
+    (convert_items_dict_to_list, dict_items),
+    (convert_items_list_to_dict, list_items),
+], ids=["obj_to_list", "obj_to_dict", "dict_to_list", "list_to_dict"])
+def test_convert_items(benchmark, fun, items):
+    result = benchmark(fun, items, item_format)
+
+    assert len(result) == len(items)
+
+
+@pytest.mark.benchmark(group="response")
+@pytest.mark.parametrize("items", [obj_items, dict_items, list_items], ids=["obj", "dict", "list"])
+@pytest.mark.parametrize("is_convert_to_list", [True, False], ids=["to_list", "to_dict"])
+def test_make_data_response(benchmark, items, is_convert_to_list):
+    response = benchmark(make_data_response, items, item_format, is_convert_to_list)
+
+    assert response.status_code == 200
+
+
+@pytest.mark.benchmark(group="response")
+@pytest.mark.parametrize("is_ndjson", [False, True], ids=["json", "ndjson"])
+def test_make_data_stream_response(benchmark, is_ndjson):
+    def stream():
+        response = make_data_stream_response(iter(obj_items), item_format, is_ndjson=is_ndjson)
+        return b"".join(response.streaming_content)
+
+    content = benchmark(stream)
+
+    assert content
+
+
+@pytest.mark.benchmark(group="response")
+@pytest.mark.skipif(not msgpack, reason="msgpack is not installed")
+def test_make_msgpack_data_response(benchmark):
+    response = benchmark(make_data_response, obj_items, item_format, True, ResponseFormat.MSGPACK)
+
+    assert response.status_code == 200
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+from hyperquant.api import Endpoint
+from hyperquant.clients.binance import BinanceRESTClient, BinanceWSClient
+from hyperquant.clients.bitfinex import BitfinexRESTClient, BitfinexWSClient
+from hyperquant.clients.bitmex import BitMEXRESTClient, BitMEXWSClient
+from hyperquant.clients.mock import make_binance_trade_message, make_okex_trade_message
+from hyperquant.clients.okex import OkexRESTClient, OkexWSClient
+from hyperquant.clients.timestamps import TimestampCodec
+from benchmarks.utils import ITEM_COUNT, get_platform_data
+
+
+# REST
+
+@pytest.mark.benchmark(group="parse_rest")
+@pytest.mark.parametrize("client_class, endpoint, path, params", [
+    (BinanceRESTClient, Endpoint.TRADE, "/binance/api/v1/trades", {"symbol": "ETHBTC", "limit": ITEM_COUNT}),
+    (BinanceRESTClient, Endpoint.ORDER_BOOK, "/binance/api/v1/depth", {"symbol": "ETHBTC", "limit": ITEM_COUNT}),
+    (BitfinexRESTClient, Endpoint.TRADE, "/bitfinex/v2/trades/tETHBTC/hist", {"limit": ITEM_COUNT}),
+    (BitMEXRESTClient, Endpoint.TRADE, "/bitmex/api/v1/trade", {"symbol": "XBTUSD", "count": 500}),  # (Max for BitMEX)
+    (OkexRESTClient, Endpoint.TRADE, "/okex/api/v1/trades.do", {"symbol": "eth_btc", "size": ITEM_COUNT}),
+], ids=["binance-trade", "binance-orderbook", "bitfinex-trade", "bitmex-trade", "okex-trade"])
+def test_parse_rest(benchmark, client_class, endpoint, path, params):
+    converter = client_class().converter
+    data = get_platform_data(path, **params)
+
+    result = benchmark(converter.parse, endpoint, data)
+
+    assert result
+
+
+@pytest.mark.benchmark(group="parse_rest")
+def test_decode_json(benchmark):
+    text = json.dumps(get_platform_data("/binance/api/v1/trades", symbol="ETHBTC", limit=ITEM_COUNT))
+
+    result = benchmark(json.loads, text)
+
+    assert len(result) == ITEM_COUNT
+
+
+# WebSocket
+
+@pytest.mark.benchmark(group="parse_ws")
+@pytest.mark.parametrize("client_class, messages", [
+    (BinanceWSClient, [make_binance_trade_message(i) for i in range(ITEM_COUNT)]),
+    # (Inflate + JSON)
+    (OkexWSClient, [make_okex_trade_message(i) for i in range(ITEM_COUNT)]),
+], ids=["binance", "okex"])
+def test_decode_and_parse_ws(benchmark, client_class, messages):
+    client = client_class()
+
+    def decode_and_parse():
+        return [client._decode_and_parse(message) for message in messages]
+
+    result = benchmark(decode_and_parse)
+
+    assert all(result)
+
+
+@pytest.mark.benchmark(group="subscriptions")
+@pytest.mark.parametrize("client_class, symbol_format", [
+    (BinanceWSClient, "SYM%sBTC"),
+    (BitfinexWSClient, "SYM%sBTC"),
+    (BitMEXWSClient, "SYM%sUSD"),
+    (OkexWSClient, "sym%s_btc"),
+], ids=["binance", "bitfinex", "bitmex", "okex"])
+def test_generate_subscriptions(benchmark, client_class, symbol_format):
+    converter = client_class().converter
+    symbols = [symbol_format % i for i in range(ITEM_COUNT)]
+
+    result = benchmark(converter.generate_subscriptions, [Endpoint.TRADE], symbols)
+
+    assert len(result) == ITEM_COUNT
+
+
+# Timestamps
+
+@pytest.mark.benchmark(group="timestamps")
+@pytest.mark.parametrize("codec, values", [
+    (TimestampCodec(is_source_in_milliseconds=True), [1530448496789 + i for i in range(ITEM_COUNT)]),
+    # (Bursts of trades with the same second)
+    (TimestampCodec(is_source_in_timestring=True),
+     ["2018-07-01T12:%02d:%02d.%03dZ" % (i // 6000 % 60, i // 100 % 60, i % 1000) for i in range(ITEM_COUNT)]),
+], ids=["milliseconds", "timestring"])
+def test_decode_timestamps(benchmark, codec, values):
+    def decode():
+        return [codec.decode(value, True) for value in values]
+
+    result = benchmark(decode)
+
+    assert len(result) == ITEM_COUNT
@@ -0,0 +1,62 @@
+from threading import Event
+
+import pytest
+
+from hyperquant.api import Endpoint
+from hyperquant.clients.binance import BinanceWSClient
+from hyperquant.clients.mock import make_binance_trade_message, make_okex_trade_message
+from hyperquant.clients.okex import OkexWSClient
+from hyperquant.clients.replay import ReplayServer
+from benchmarks.utils import ITEM_COUNT
+
+binance_frames = [(0, make_binance_trade_message(i)) for i in range(ITEM_COUNT)]
+
+
+@pytest.mark.benchmark(group="dispatch")
+@pytest.mark.parametrize("client_class, frames", [
+    (BinanceWSClient, binance_frames),
+    (OkexWSClient, [(0, make_okex_trade_message(i)) for i in range(ITEM_COUNT)]),
+], ids=["binance", "okex"])
+def test_on_message(benchmark, client_class, frames):
+    # Raw message -> items -> on_data_item() in receiving thread
+    client = client_class()
+    received = []
+    client.on_data_item = received.append
+
+    def on_messages():
+        received.clear()
+        for _, message in frames:
+            client._on_message(message)
+
+    benchmark(on_messages)
+
+    assert len(received) == ITEM_COUNT
+
+
+@pytest.mark.benchmark(group="replay")
+def test_replay(benchmark):
+    # Connecting, receiving and dispatching of frames sent by local server as fast as possible
+    received = []
+    replayed_event = Event()
+
+    def on_data_item(item):
+        received.append(item)
+        if len(received) == ITEM_COUNT:
+            replayed_event.set()
+
+    def setup():
+        received.clear()
+        replayed_event.clear()
+
+    def replay(server):
+        client = BinanceWSClient()
+        client.converter.base_url = server.url
+        client.on_data_item = on_data_item
+        client.subscribe([Endpoint.TRADE], ["ETHBTC"])
+        assert replayed_event.wait(10)
+        client.close()
+
+    with ReplayServer(binance_frames, speed=None) as server:
+        benchmark.pedantic(replay, args=(server,), setup=setup, rounds=5)
+
+    assert len(received) == ITEM_COUNT
@@ -0,0 +1,20 @@
+from hyperquant.api import Platform
+from hyperquant.clients import Trade
+from hyperquant.clients.mock import MockExchangeServer
+
+# (Same amount of items for all benchmarks to compare them with each other)
+ITEM_COUNT = 1000
+
+mock_server = MockExchangeServer(trade_count=ITEM_COUNT)
+
+
+def get_platform_data(path, **params):
+    # Payload which would be returned by platform (without network)
+    status, data, _ = mock_server.handle("GET", path, params)
+    assert status == 200, (path, data)
+    return data
+
+
+def make_trades(count=ITEM_COUNT, symbol="ETHBTC"):
+    return [Trade(Platform.BINANCE, symbol, 1540000000 + i, str(i), "0.0314", "1.5", 1)
+            for i in range(count)]
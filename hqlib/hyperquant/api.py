@@ -1,9 +1,30 @@
-from collections import Iterable
-from decimal import Decimal
+import gzip
+import hashlib
+import json
+import sys
+import time
+from array import array
+from collections import Iterable, OrderedDict
+from decimal import Decimal, ROUND_HALF_EVEN
+from functools import lru_cache
+from itertools import islice, zip_longest
+from operator import attrgetter, itemgetter
+from threading import RLock
 
 from clickhouse_driver.errors import ServerException
 from dateutil import parser
-from django.http import JsonResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
 """
 Common out API format is defined here.
 
@@ -52,6 +73,8 @@ class Endpoint:
     PING = "ping"
     SERVER_TIME = "time"
     SYMBOLS = "symbols"
+    # (Decimal places of prices and amounts by symbols, for clients only)
+    PRECISIONS = "symbols/precisions"
     TRADE = "trade"
     TRADE_HISTORY = "trade/history"
     TRADE_MY = "trade/my"  # Private
@@ -78,7 +101,7 @@ class Endpoint:
     FORMAT = "/format"
 
     ALL = [
-        SERVER_TIME, SYMBOLS, TRADE, TRADE_HISTORY, TRADE_MY, CANDLE, TICKER,
+        SERVER_TIME, SYMBOLS, PRECISIONS, TRADE, TRADE_HISTORY, TRADE_MY, CANDLE, TICKER,
         TICKER_ALL, ORDER_BOOK, ORDER_BOOK_DIFF, ACCOUNT, ORDER, ORDER_TEST,
         ORDER_CURRENT, ORDER_MY, ITEM, HISTORY, FORMAT
     ]
@@ -145,6 +168,7 @@ class ParamName:
     # ENDPOINT = "endpoint"
 
     IS_SHORT = "is_short"
+    RESPONSE_FORMAT = "response_format"  # For our REST API only
 
     ALL = [
         ID, ITEM_ID, TRADE_ID, ORDER_ID, USER_ORDER_ID, LIMIT,
@@ -211,6 +235,13 @@ class Interval:
         HRS_12, DAY_1, DAY_3, WEEK_1, MONTH_1
     ]
 
+    # (Month is the longest one)
+    seconds_by_interval = {
+        MIN_1: 60, MIN_3: 3 * 60, MIN_5: 5 * 60, MIN_15: 15 * 60, MIN_30: 30 * 60,
+        HRS_1: 3600, HRS_2: 2 * 3600, HRS_4: 4 * 3600, HRS_6: 6 * 3600, HRS_8: 8 * 3600,
+        HRS_12: 12 * 3600, DAY_1: 86400, DAY_3: 3 * 86400, WEEK_1: 7 * 86400, MONTH_1: 31 * 86400,
+    }
+
 
 class Direction:
     # (trade, order)
@@ -335,6 +366,45 @@ class ErrorCode:
         ) if code in cls.message_by_code else default or "(no message: todo)"
 
 
+class ResponseFormat:
+    # For our REST API
+
+    JSON = "json"
+    # Columnar: {"item_format": [...], "types": [...], "count": N, "data": [column1, ...]},
+    # where float64 and int64 columns are little-endian bytes
+    # (numpy.frombuffer(column, "<f8")), and str columns are arrays.
+    # Prices and amounts are str columns to not lose precision as float64 (as in JSON),
+    # and with "is_fixed_point": true they are int64 columns (see to_fixed_point())
+    MSGPACK = "msgpack"
+
+    content_type_by_format = {
+        JSON: "application/json",
+        MSGPACK: "application/x-msgpack",
+    }
+    format_by_content_type = {v: k for k, v in content_type_by_format.items()}
+    format_by_content_type["application/msgpack"] = MSGPACK
+
+
+class ColumnType:
+    # For binary response formats
+
+    FLOAT = "float64"  # (None -> NaN)
+    INT = "int64"  # (None -> 0)
+    STR = "str"  # (None -> None)
+
+
+# (Global mode: all timestamps are int milliseconds instead of float seconds, see set_use_milliseconds())
+use_milliseconds = False
+
+
+def set_use_milliseconds(value=True):
+    # For clients' converters and items created after the call, for timestamp columns
+    # of binary responses and for parse_timestamp()
+    # (Read it as api.use_milliseconds, not imported by name)
+    global use_milliseconds
+    use_milliseconds = value
+
+
 # For DB, REST API
 item_format_by_endpoint = {
     Endpoint.TRADE: [
@@ -344,11 +414,113 @@ item_format_by_endpoint = {
     ],
 }
 
+# (Decimal values, such as prices and amounts, are ColumnType.STR)
+column_type_by_name = {
+    ParamName.TIMESTAMP: ColumnType.FLOAT,
+    **{name: ColumnType.INT for name in (
+        ParamName.PLATFORM_ID, ParamName.DIRECTION, ParamName.TRADES_COUNT, ParamName.LEVEL,
+        ParamName.ORDER_TYPE, ParamName.ORDER_STATUS)},
+}
+
+
+def get_column_types(item_format, is_fixed_point=False):
+    # (ColumnType.STR for all other names)
+    return [_get_column_type(name, is_fixed_point) for name in item_format]
+
+
+def _get_column_type(name, is_fixed_point=False):
+    if is_fixed_point and name in fixed_point_names or use_milliseconds and name == ParamName.TIMESTAMP:
+        return ColumnType.INT
+    return column_type_by_name.get(name, ColumnType.STR)
+
+
+# Fixed-point
+
+# (Prices and amounts as int64 scaled by 10 ** precision for fast comparison and aggregation.
+# Precisions are taken for each symbol from symbols' metadata, see SymbolRegistry.get_precision())
+DEFAULT_PRECISION = 8
+fixed_point_price_names = {
+    ParamName.PRICE, ParamName.PRICE_OPEN, ParamName.PRICE_CLOSE, ParamName.PRICE_HIGH, ParamName.PRICE_LOW}
+fixed_point_amount_names = {ParamName.AMOUNT, ParamName.AMOUNT_ORIGINAL, ParamName.AMOUNT_EXECUTED}
+fixed_point_names = fixed_point_price_names | fixed_point_amount_names
+
+
+def to_fixed_point(value, precision=DEFAULT_PRECISION):
+    # "0.03", 0.03, Decimal("0.03"), 3 -> 3000000, 3000000, 3000000, 300000000 (for precision 8)
+    # (Extra digits are rounded half to even)
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value * 10 ** precision
+    if isinstance(value, float):
+        # (Shortest representation: 0.03, not 0.0299999...)
+        value = repr(value)
+    if isinstance(value, str):
+        whole, _, fraction = value.partition(".")
+        if len(fraction) <= precision and "e" not in value and "E" not in value:
+            # (Fast path: "-0.03" -> int("-0" + "03000000"))
+            return int(whole + fraction.ljust(precision, "0"))
+        value = Decimal(value)
+    return int(value.scaleb(precision).to_integral_value(ROUND_HALF_EVEN))
+
+
+def from_fixed_point(value, precision=DEFAULT_PRECISION):
+    # 3000000 -> Decimal("0.03000000") (for precision 8)
+    return Decimal(value).scaleb(-precision) if value is not None else None
+
+
+def get_precision_by_step(step):
+    # Tick or lot size to precision: "0.00100000" -> 3, "1.00000000" -> 0
+    if step is None:
+        return None
+    exponent = Decimal(str(step)).normalize().as_tuple().exponent
+    return max(0, -exponent)
+
+
+def convert_items_to_fixed_point(items, item_format, get_precision):
+    # [[prop1, prop2], ...] -> new lists with prices and amounts as fixed-point ints
+    # (get_precision: symbol -> (price_precision, amount_precision))
+    symbol_index = item_format.index(ParamName.SYMBOL) if ParamName.SYMBOL in item_format else None
+    price_indexes = [i for i, name in enumerate(item_format) if name in fixed_point_price_names]
+    amount_indexes = [i for i, name in enumerate(item_format) if name in fixed_point_amount_names]
+    result = []
+    for item in items or []:
+        if item is None:
+            result.append(None)
+            continue
+        item = list(item)
+        count = len(item)
+        symbol = item[symbol_index] if symbol_index is not None and symbol_index < count else None
+        price_precision, amount_precision = get_precision(symbol)
+        for index in price_indexes:
+            if index < count:
+                item[index] = to_fixed_point(item[index], price_precision)
+        for index in amount_indexes:
+            if index < count:
+                item[index] = to_fixed_point(item[index], amount_precision)
+        result.append(item)
+    return result
+
+
 # REST API:
 
 # Parse request
 
 
+def parse_response_format(params, accept=None):
+    # From "response_format" param or Accept header (request.META.get("HTTP_ACCEPT"))
+    response_format = params.get(ParamName.RESPONSE_FORMAT)
+    if response_format not in ResponseFormat.content_type_by_format and accept:
+        for content_type in accept.split(","):
+            response_format = ResponseFormat.format_by_content_type.get(content_type.split(";")[0].strip())
+            if response_format:
+                break
+    if response_format == ResponseFormat.MSGPACK and not msgpack:
+        # (Not installed)
+        return ResponseFormat.JSON
+    return response_format if response_format in ResponseFormat.content_type_by_format else ResponseFormat.JSON
+
+
 def parse_platform_id(params):
     param_names = [
         ParamName.PLATFORM, ParamName.PLATFORMS, ParamName.PLATFORM_ID
@@ -397,16 +569,18 @@ def parse_direction(params):
 
 
 def parse_timestamp(params, name):
-    # Any time value to Unix timestamp in seconds
+    # Any time value to Unix timestamp in seconds (in int milliseconds if use_milliseconds)
     time = params.get(name)
     if time is None:
         return None
     if time.isnumeric():
         return int(time)
     try:
-        return float(time)
+        value = float(time)
+        return int(value) if use_milliseconds else value
     except ValueError:
-        return parser.parse(time).timestamp()
+        value = parser.parse(time).timestamp()
+        return int(value * 1000) if use_milliseconds else value
 
 
 def parse_decimal(params, name):
@@ -436,52 +610,141 @@ def sort_from_to_params(from_value, to_value):
 
 # Prepare response
 
+# (Items converted and serialized at once in streaming responses)
+STREAM_CHUNK_SIZE = 1000
 
-def make_data_response(data, item_format, is_convert_to_list=True):
+
+def make_data_response(data, item_format, is_convert_to_list=True, response_format=None, get_precision=None):
+    # get_precision: symbol -> (price_precision, amount_precision) to return prices and amounts
+    # as fixed-point ints (see to_fixed_point())
     result = None
     if data:
         if isinstance(data, Exception):
             return make_error_response(exception=data)
 
-        if not isinstance(data, list) or not isinstance(data[0], list):
+        if not isinstance(data, list) or not isinstance(data[0], (list, dict)) and \
+                not hasattr(data[0], "__dict__"):
             # {"param1": "prop1", "param2": "prop2"} -> [{"param1": "prop1", "param2": "prop2"}]
             # ["prop1", "prop2"] -> [["prop1", "prop2"]]
             data = [data]
 
-        if isinstance(data[0], list):
-            # [["prop1", "prop2"], ["prop1", "prop2"]] -> same
-            result = data if is_convert_to_list else convert_items_list_to_dict(
-                data, item_format)
-        elif isinstance(data[0], dict):
-            # [{"param1": "prop1", "param2": "prop2"}] -> [["prop1", "prop2"]]
-            result = convert_items_dict_to_list(
-                data, item_format) if is_convert_to_list else data
-        # elif isinstance(data[0], DataObject):
+        is_convert_to_list = is_convert_to_list or response_format == ResponseFormat.MSGPACK
+        if get_precision:
+            # (Converted by positions in lists)
+            result = convert_items_to_fixed_point(_convert_data_items(data, item_format, True), item_format,
+                                                  get_precision)
+            if not is_convert_to_list:
+                result = convert_items_list_to_dict(result, item_format)
         else:
-            result = convert_items_obj_to_list(data, item_format) if is_convert_to_list else \
-                convert_items_obj_to_dict(data, item_format)
+            result = _convert_data_items(data, item_format, is_convert_to_list)
 
+    if response_format == ResponseFormat.MSGPACK:
+        return HttpResponse(encode_msgpack_data(result, item_format, get_precision is not None),
+                            content_type=ResponseFormat.content_type_by_format[ResponseFormat.MSGPACK])
     return JsonResponse({
         "data": result if result else [],
     })
 
 
+def make_data_stream_response(items, item_format, is_convert_to_list=True, is_ndjson=False):
+    # Same as make_data_response() but items (list or generator, e.g. DB cursor)
+    # are converted and serialized lazily by chunks of STREAM_CHUNK_SIZE.
+    # Content for is_ndjson=False: {"data": [item1, item2, ...]},
+    # for is_ndjson=True: one item per line (application/x-ndjson).
+    # If generator fails, "error" is added after "data" (or as the last line).
+    if isinstance(items, Exception):
+        return make_error_response(exception=items)
+
+    if is_ndjson:
+        content = _generate_ndjson(items, item_format, is_convert_to_list)
+        return StreamingHttpResponse(content, content_type="application/x-ndjson")
+    content = _generate_json(items, item_format, is_convert_to_list)
+    return StreamingHttpResponse(content, content_type="application/json")
+
+
+def _generate_json(items, item_format, is_convert_to_list):
+    # (Same output as for JsonResponse)
+    yield '{"data": ['
+    separator = ""
+    try:
+        for chunk in _iterate_converted_chunks(items, item_format, is_convert_to_list):
+            # [item1, item2] -> item1, item2
+            yield separator + json.dumps(chunk, cls=DjangoJSONEncoder)[1:-1]
+            separator = ", "
+    except Exception as exception:
+        yield '], "error": %s}' % json.dumps(_make_error(exception=exception))
+        return
+    yield ']}'
+
+
+def _generate_ndjson(items, item_format, is_convert_to_list):
+    encode = DjangoJSONEncoder().encode
+    try:
+        for chunk in _iterate_converted_chunks(items, item_format, is_convert_to_list):
+            yield "".join([encode(item) + "\n" for item in chunk])
+    except Exception as exception:
+        yield json.dumps({"error": _make_error(exception=exception)}) + "\n"
+
+
+def _iterate_converted_chunks(items, item_format, is_convert_to_list):
+    iterator = iter(items or [])
+    while True:
+        chunk = []
+        try:
+            chunk.extend(islice(iterator, STREAM_CHUNK_SIZE))
+        except Exception:
+            # (Send items got before error)
+            if chunk:
+                yield _convert_data_items(chunk, item_format, is_convert_to_list)
+            raise
+        if not chunk:
+            return
+        yield _convert_data_items(chunk, item_format, is_convert_to_list)
+
+
+def _convert_data_items(data, item_format, is_convert_to_list):
+    # (Item type is defined by the first not None item)
+    first_item = next((item for item in data if item is not None), None)
+    if isinstance(first_item, list):
+        # [["prop1", "prop2"], ["prop1", "prop2"]] -> same
+        return data if is_convert_to_list else convert_items_list_to_dict(
+            data, item_format)
+    elif isinstance(first_item, dict):
+        # [{"param1": "prop1", "param2": "prop2"}] -> [["prop1", "prop2"]]
+        return convert_items_dict_to_list(
+            data, item_format) if is_convert_to_list else data
+    # elif isinstance(first_item, DataObject):
+    return convert_items_obj_to_list(data, item_format) if is_convert_to_list else \
+        convert_items_obj_to_dict(data, item_format)
+
+
 def make_error_response(error_code=None, exception=None, **kwargs):
+    return JsonResponse({
+        "error": _make_error(error_code, exception, **kwargs)
+    })
+
+
+def _make_error(error_code=None, exception=None, **kwargs):
     if not error_code and exception:
         if isinstance(exception, ServerException):
             error_code = ErrorCode.APP_DB_ERROR
         else:
             error_code = ErrorCode.APP_ERROR
 
-    return JsonResponse({
-        "error": {
-            "code": error_code,
-            "message": ErrorCode.get_message_by_code(error_code, **kwargs)
-        }
-    })
+    return {
+        "code": error_code,
+        "message": ErrorCode.get_message_by_code(error_code, **kwargs)
+    }
 
 
 def make_format_response(item_format):
+    return HttpResponse(_make_format_content(tuple(item_format), use_milliseconds), content_type="application/json")
+
+
+@lru_cache(maxsize=None)
+def _make_format_content(item_format, use_milliseconds):
+    # (Same for the same item_format; use_milliseconds - for types of columns)
+    item_format = list(item_format)
     values = {
         ParamName.PLATFORM_ID:
         Platform.name_by_id,
@@ -489,10 +752,17 @@ def make_format_response(item_format):
         ParamName.DIRECTION:
         Direction.name_by_value,
     }
-    return JsonResponse({
+    return json.dumps({
         "item_format": item_format,
         "values": {k: v
                    for k, v in values.items() if k in item_format},
+        "response_formats": ResponseFormat.content_type_by_format,
+        "example_msgpack": {
+            "item_format": item_format,
+            "types": get_column_types(item_format),
+            "count": 3,
+            "data": [name + "_column" for name in item_format],
+        },
         "example_item": {
             "data": [[name + "X" for name in item_format]]
         },
@@ -506,7 +776,271 @@ def make_format_response(item_format):
                 "message": "Error description."
             }
         },
-    })
+    }, cls=DjangoJSONEncoder).encode()
+
+
+# Compression and caching
+
+# (Smaller responses are not compressed)
+COMPRESS_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+# (Max quality 11 is too slow for dynamic content)
+BROTLI_QUALITY = 5
+
+
+def parse_accept_encoding(accept_encoding):
+    # Preferred supported encoding: "gzip, deflate, br" -> "br", "identity" -> None
+    # (request.META.get("HTTP_ACCEPT_ENCODING"))
+    encodings = set()
+    for value in accept_encoding.split(",") if accept_encoding else []:
+        encoding, _, params = value.partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0"):
+            encodings.add(encoding.strip())
+    if brotli and "br" in encodings:
+        return "br"
+    return "gzip" if "gzip" in encodings else None
+
+
+def compress_content(content, encoding):
+    if encoding == "br":
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    return gzip.compress(content, GZIP_LEVEL)
+
+
+def compress_response(response, accept_encoding):
+    # Compress content of not streaming response if client accepts that
+    patch_vary_headers(response, ("Accept-Encoding",))
+    if response.streaming or response.has_header("Content-Encoding") or \
+            len(response.content) < COMPRESS_MIN_SIZE:
+        return response
+    encoding = parse_accept_encoding(accept_encoding)
+    if not encoding:
+        return response
+
+    response.content = compress_content(response.content, encoding)
+    response["Content-Encoding"] = encoding
+    response["Content-Length"] = str(len(response.content))
+    if response.has_header("ETag") and not response["ETag"].startswith("W/"):
+        # (Compressed content is not byte-for-byte the same)
+        response["ETag"] = "W/" + response["ETag"]
+    return response
+
+
+def is_etag_matched(if_none_match, etag):
+    # (request.META.get("HTTP_IF_NONE_MATCH"); weak comparison)
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag[2:] if etag.startswith("W/") else etag
+    return any((value[2:] if value.startswith("W/") else value) == etag
+               for value in (value.strip() for value in if_none_match.split(",")))
+
+
+class _CachedResponse:
+    def __init__(self, content, content_type) -> None:
+        super().__init__()
+        self.content = content
+        self.content_type = content_type
+        self.etag = '"%s"' % hashlib.md5(content).hexdigest()
+        self._content_by_encoding = {}
+
+    @property
+    def size_bytes(self):
+        return len(self.content) + sum(len(content) for content in self._content_by_encoding.values())
+
+    def make_response(self, if_none_match=None, accept_encoding=None, max_age_sec=None):
+        encoding = parse_accept_encoding(accept_encoding) if len(self.content) >= COMPRESS_MIN_SIZE else None
+        if is_etag_matched(if_none_match, self.etag):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(self._get_content(encoding), content_type=self.content_type)
+            if encoding:
+                response["Content-Encoding"] = encoding
+        response["ETag"] = "W/" + self.etag if encoding else self.etag
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if max_age_sec:
+            response["Cache-Control"] = "public, max-age=%s, immutable" % max_age_sec
+        return response
+
+    def _get_content(self, encoding):
+        if not encoding:
+            return self.content
+        content = self._content_by_encoding.get(encoding)
+        if content is None:
+            content = self._content_by_encoding[encoding] = compress_content(self.content, encoding)
+        return content
+
+
+class ResponseCache:
+    """
+    LRU cache for responses with immutable data, i.e. history ranges which
+    ended some time ago. Cached content is compressed once per encoding and
+    sent with ETag, so repeated requests with If-None-Match get 304.
+
+        response_cache = ResponseCache()
+
+        def trades_view(request):
+            params = request.GET
+            platform_ids, symbols = parse_platform_ids(params), parse_symbols(params)
+            from_time, to_time = sort_from_to_params(parse_timestamp(params, ParamName.FROM_TIME),
+                                                     parse_timestamp(params, ParamName.TO_TIME))
+            key = response_cache.make_key(Endpoint.TRADE, platform_ids, symbols, from_time, to_time,
+                                          parse_response_format(params, request.META.get("HTTP_ACCEPT")))
+            return response_cache.get_response(
+                key, to_time, lambda: make_data_response(...),
+                request.META.get("HTTP_IF_NONE_MATCH"), request.META.get("HTTP_ACCEPT_ENCODING"))
+
+    Responses for mutable ranges (to_time is None or recent) are created each
+    time, but also compressed and get ETag.
+    """
+
+    # Settings:
+    max_size_bytes = 100 * 1024 * 1024
+    # (Data older than this is not changed anymore)
+    immutable_after_sec = 60
+    max_age_sec = 365 * 24 * 60 * 60
+
+    # State:
+    size_bytes = 0
+    hit_count = 0
+    miss_count = 0
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__()
+
+        # Set up settings
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+        self._entry_by_key = OrderedDict()
+        self._lock = RLock()
+
+    @staticmethod
+    def make_key(*args):
+        # Hashable key from parsed params (lists are converted to tuples)
+        return tuple(tuple(arg) if isinstance(arg, list) else arg for arg in args)
+
+    def is_immutable(self, to_time):
+        # (to_time is in milliseconds if use_milliseconds, see parse_timestamp())
+        if to_time is None:
+            return False
+        time_unit = 1000 if use_milliseconds else 1
+        return to_time <= (time.time() - self.immutable_after_sec) * time_unit
+
+    def get_response(self, key, to_time, make_response, if_none_match=None, accept_encoding=None):
+        # key - from make_key(), to_time - the end of requested range (Unix timestamp),
+        # make_response - function creating the response if it's not cached
+        is_immutable = self.is_immutable(to_time)
+        entry = self._get(key) if is_immutable else None
+        if not entry:
+            response = make_response()
+            if response.streaming or response.status_code != 200 or response.content.startswith(b'{"error"'):
+                # (Errors are not cached)
+                return compress_response(response, accept_encoding)
+            entry = _CachedResponse(response.content, response["Content-Type"])
+            if is_immutable:
+                self._put(key, entry)
+
+        prev_size_bytes = entry.size_bytes
+        response = entry.make_response(if_none_match, accept_encoding, self.max_age_sec if is_immutable else None)
+        if is_immutable and entry.size_bytes != prev_size_bytes:
+            # (Compressed content added)
+            with self._lock:
+                if self._entry_by_key.get(key) is entry:
+                    self.size_bytes += entry.size_bytes - prev_size_bytes
+                    self._evict()
+        return response
+
+    def clear(self):
+        with self._lock:
+            self._entry_by_key.clear()
+            self.size_bytes = 0
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entry_by_key.get(key)
+            if entry:
+                self._entry_by_key.move_to_end(key)
+                self.hit_count += 1
+            else:
+                self.miss_count += 1
+            return entry
+
+    def _put(self, key, entry):
+        with self._lock:
+            prev_entry = self._entry_by_key.pop(key, None)
+            if prev_entry:
+                self.size_bytes -= prev_entry.size_bytes
+            self._entry_by_key[key] = entry
+            self.size_bytes += entry.size_bytes
+            self._evict()
+
+    def _evict(self):
+        # (Least recently used first; entry bigger than max_size_bytes is not kept too)
+        while self.size_bytes > self.max_size_bytes and self._entry_by_key:
+            _, entry = self._entry_by_key.popitem(last=False)
+            self.size_bytes -= entry.size_bytes
+
+
+# Binary format
+
+
+def encode_msgpack_data(items, item_format, is_fixed_point=False):
+    # [[prop1, prop2], ...] -> columnar MessagePack (see ResponseFormat.MSGPACK)
+    # (is_fixed_point - prices and amounts are already fixed-point ints, see convert_items_to_fixed_point())
+    if not msgpack:
+        raise Exception("msgpack is not installed!")
+    items = [item for item in items if item is not None] if items else []
+    column_types = get_column_types(item_format, is_fixed_point)
+    # (zip_longest() fills short items with None)
+    columns = list(zip_longest(*items, fillvalue=None))[:len(item_format)] if items else []
+    columns += [(None,) * len(items)] * (len(item_format) - len(columns))
+    result = {
+        "item_format": item_format,
+        "types": column_types,
+        "count": len(items),
+        "data": [_encode_column(values, column_type) for values, column_type in zip(columns, column_types)],
+    }
+    if is_fixed_point:
+        result["is_fixed_point"] = True
+    return msgpack.packb(result, use_bin_type=True)
+
+
+def decode_msgpack_data(content):
+    # Columnar MessagePack -> (item_format, [[prop1, prop2], ...])
+    # (For Python clients and tests; NaN is decoded as None)
+    result = msgpack.unpackb(content, raw=False)
+    columns = [_decode_column(column, column_type) for column, column_type in zip(result["data"], result["types"])]
+    return result["item_format"], [list(values) for values in zip(*columns)]
+
+
+_typecode_by_column_type = {ColumnType.FLOAT: "d", ColumnType.INT: "q"}
+
+
+def _encode_column(values, column_type):
+    if column_type == ColumnType.FLOAT:
+        column = array("d", [float(value) if value is not None else float("nan") for value in values])
+    elif column_type == ColumnType.INT:
+        column = array("q", [int(value) if value is not None else 0 for value in values])
+    else:
+        return [str(value) if value is not None else None for value in values]
+
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column.tobytes()
+
+
+def _decode_column(column, column_type):
+    typecode = _typecode_by_column_type.get(column_type)
+    if not typecode:
+        return column
+    values = array(typecode, column)
+    if sys.byteorder == "big":
+        values.byteswap()
+    if column_type == ColumnType.FLOAT:
+        return [value if value == value else None for value in values]
+    return values.tolist()
 
 
 # Utility:
@@ -565,27 +1099,57 @@ def _convert_item_or_items_with_fun(item_or_items, item_format, fun):
 
 
 def _convert_items_obj_to_list(items, item_format):
-    return [[getattr(item, p) for p in item_format
-             if hasattr(item, p)] if item is not None else None
-            for item in items] if items else []
+    if not items:
+        return []
+    get_values = _get_values_getters(tuple(item_format))[0]
+    try:
+        return [list(get_values(item)) if item is not None else None
+                for item in items]
+    except AttributeError:
+        # (Slow path for items which are shorter than item_format)
+        return [[getattr(item, p) for p in item_format
+                 if hasattr(item, p)] if item is not None else None
+                for item in items]
 
 
 def _convert_items_dict_to_list(items, item_format):
-    return [[item[p] for p in item_format
-             if p in item] if item is not None else None
-            for item in items] if items else []
+    if not items:
+        return []
+    get_values = _get_values_getters(tuple(item_format))[1]
+    try:
+        return [list(get_values(item)) if item is not None else None
+                for item in items]
+    except KeyError:
+        return [[item[p] for p in item_format
+                 if p in item] if item is not None else None
+                for item in items]
 
 
 def _convert_items_list_to_dict(items, item_format):
-    index_property_list = list(enumerate(item_format))
-    return [{p: item[i]
-             for i, p in index_property_list
-             if i < len(item)} if item is not None else None
+    # (zip() also cuts items which are shorter than item_format)
+    return [dict(zip(item_format, item)) if item is not None else None
             for item in items] if items else []
 
 
 def _convert_items_obj_to_dict(items, item_format):
-    return [{p: getattr(item, p)
-             for p in item_format
-             if hasattr(item, p)} if item is not None else None
-            for item in items] if items else []
+    if not items:
+        return []
+    get_values = _get_values_getters(tuple(item_format))[0]
+    try:
+        return [dict(zip(item_format, get_values(item))) if item is not None else None
+                for item in items]
+    except AttributeError:
+        return [{p: getattr(item, p)
+                 for p in item_format
+                 if hasattr(item, p)} if item is not None else None
+                for item in items]
+
+
+@lru_cache(maxsize=None)
+def _get_values_getters(item_format):
+    # Precompiled (attrgetter, itemgetter) returning a tuple of values for item_format
+    if len(item_format) == 1:
+        # (Getters for one name return a value, not a tuple)
+        name = item_format[0]
+        return (lambda item: (getattr(item, name),)), (lambda item: (item[name],))
+    return attrgetter(*item_format), itemgetter(*item_format)
@@ -1,17 +1,28 @@
+import hashlib
+import hmac
 import json
+import random
 import zlib
 import logging
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy
 from datetime import datetime
+from functools import partial
 from operator import itemgetter
-from threading import Thread
+from threading import Thread, Timer, RLock, Event, Lock, current_thread
 from urllib.parse import urljoin, urlencode
 
 import requests
-from dateutil import parser
 from websocket import WebSocketApp
 
-from hyperquant.api import ParamName, ParamValue, ErrorCode, Endpoint, Platform, Sorting, OrderType
+from hyperquant import api
+from hyperquant.api import ParamName, ParamValue, ErrorCode, Endpoint, Platform, Sorting, OrderType, Interval, \
+    DEFAULT_PRECISION, fixed_point_price_names, fixed_point_amount_names, to_fixed_point, \
+    from_fixed_point
+from hyperquant.clients.cache import get_item_key
+from hyperquant.clients.timestamps import TimestampCodec
 """
 API clients for various trading platforms: REST and WebSocket.
 
@@ -65,14 +76,15 @@ class ItemObject(DataObject):
                  symbol=None,
                  timestamp=None,
                  item_id=None,
-                 is_milliseconds=False) -> None:
+                 is_milliseconds=None) -> None:
         super().__init__()
         self.platform_id = platform_id
         self.symbol = symbol
         self.timestamp = timestamp
         self.item_id = item_id
 
-        self.is_milliseconds = is_milliseconds
+        # (None - by global mode, see api.set_use_milliseconds())
+        self.is_milliseconds = api.use_milliseconds if is_milliseconds is None else is_milliseconds
 
     def __eq__(self, o: object) -> bool:
         # Identifying params:
@@ -87,7 +99,7 @@ class ItemObject(DataObject):
 
     def __repr__(self) -> str:
         platform_name = Platform.get_platform_name_by_id(self.platform_id)
-        timestamp_s = self.timestamp / 1000 if self.is_milliseconds else self.timestamp
+        timestamp_s = self.timestamp / 1000 if self.is_milliseconds and self.timestamp else self.timestamp
         timestamp_iso = datetime.utcfromtimestamp(
             timestamp_s).isoformat() if timestamp_s else timestamp_s
         return "[Item-%s id:%s time:%s symbol:%s]" % (
@@ -110,7 +122,7 @@ class Trade(ItemObject):
                  price=None,
                  amount=None,
                  direction=None,
-                 is_milliseconds=False) -> None:
+                 is_milliseconds=None) -> None:
         super().__init__(platform_id, symbol, timestamp, item_id,
                          is_milliseconds)
         self.price = price
@@ -139,7 +151,7 @@ class MyTrade(Trade):
                  order_id=None,
                  fee=None,
                  rebate=None,
-                 is_milliseconds=False) -> None:
+                 is_milliseconds=None) -> None:
         super().__init__(platform_id, symbol, timestamp, item_id, price,
                          amount, direction, is_milliseconds)
         self.order_id = order_id
@@ -173,7 +185,7 @@ class Candle(ItemObject):
                  price_low=None,
                  amount=None,
                  trades_count=None,
-                 is_milliseconds=False) -> None:
+                 is_milliseconds=None) -> None:
         super().__init__(platform_id, symbol, timestamp, None, is_milliseconds)
         self.interval = interval
         self.price_open = price_open
@@ -196,7 +208,7 @@ class Ticker(ItemObject):
                  symbol=None,
                  timestamp=None,
                  price=None,
-                 is_milliseconds=False) -> None:
+                 is_milliseconds=None) -> None:
         super().__init__(platform_id, symbol, timestamp, None, is_milliseconds)
         self.price = price
 
@@ -218,7 +230,7 @@ class OrderBook(ItemObject):
                  symbol=None,
                  timestamp=None,
                  item_id=None,
-                 is_milliseconds=False,
+                 is_milliseconds=None,
                  asks=None,
                  bids=None) -> None:
         super().__init__(platform_id, symbol, timestamp, item_id,
@@ -244,7 +256,7 @@ class OrderBookItem(ItemObject):
                  symbol=None,
                  timestamp=None,
                  item_id=None,
-                 is_milliseconds=False,
+                 is_milliseconds=None,
                  price=None,
                  amount=None,
                  direction=None,
@@ -320,7 +332,7 @@ class Order(ItemObject):
                  symbol=None,
                  timestamp=None,
                  item_id=None,
-                 is_milliseconds=False,
+                 is_milliseconds=None,
                  user_order_id=None,
                  order_type=None,
                  price=None,
@@ -342,6 +354,24 @@ class Order(ItemObject):
 # Base
 
 
+class Signer:
+    """
+    Makes HMAC signatures with the same secret. The key is encoded and
+    hashed once, and for each message only a copy of keyed state is made.
+    Thread-safe.
+    """
+
+    def __init__(self, secret, digestmod=hashlib.sha256) -> None:
+        super().__init__()
+        self._hmac = hmac.new(secret.encode("utf-8"), digestmod=digestmod)
+
+    def sign(self, message):
+        # Hex digest of str or bytes message
+        result = self._hmac.copy()
+        result.update(message.encode("utf-8") if isinstance(message, str) else message)
+        return result.hexdigest()
+
+
 class ProtocolConverter:
     """
     Contains all the info and logic to convert data between
@@ -357,6 +387,11 @@ class ProtocolConverter:
 
     # Settings:
     is_use_max_limit = False
+    # (SymbolRegistry to convert symbols to platform's ones, see symbols.py; set by client)
+    symbol_registry = None
+    # (Parse prices and amounts to ints scaled by symbol's precisions from symbol_registry,
+    # see api.to_fixed_point(); set by client)
+    is_fixed_point = False
 
     # Converting info:
     # Our endpoint to platform_endpoint
@@ -389,7 +424,8 @@ class ProtocolConverter:
     error_code_by_http_status = None
 
     # For converting time
-    use_milliseconds = False  # todo always use milliseconds
+    # (Int milliseconds instead of float seconds; default is set by api.set_use_milliseconds())
+    use_milliseconds = False
     is_source_in_milliseconds = False
     is_source_in_timestring = False
     timestamp_platform_names = None  # ["startTime", "endTime"]
@@ -403,6 +439,11 @@ class ProtocolConverter:
         if version is not None:
             self.version = version
 
+        if api.use_milliseconds:
+            self.use_milliseconds = True
+        self.timestamp_codec = TimestampCodec(is_source_in_milliseconds=self.is_source_in_milliseconds,
+                                              is_source_in_timestring=self.is_source_in_timestring)
+
         # Create logger
         platform_name = Platform.get_platform_name_by_id(self.platform_id)
         self.logger = logging.getLogger(
@@ -561,6 +602,57 @@ class ProtocolConverter:
 
         return item
 
+    def convert_to_fixed_point(self, item_or_items):
+        # Prices and amounts of parsed items to ints scaled by symbols' precisions (if is_fixed_point)
+        # (Called when symbols are set and after _parse_item() of subclasses which can stringify values)
+        if not self.is_fixed_point:
+            return
+        for item in item_or_items if isinstance(item_or_items, list) else [item_or_items]:
+            self._convert_item_to_fixed_point(item)
+
+    def convert_to_canonical_symbols(self, item_or_items):
+        # Native symbols of parsed items to canonical "BASE/QUOTE" ones (if symbol_registry is set)
+        # (Must be after convert_to_fixed_point() as precisions are looked up by native symbols first)
+        if not self.symbol_registry:
+            return
+        for item in item_or_items if isinstance(item_or_items, list) else [item_or_items]:
+            symbol = getattr(item, ParamName.SYMBOL, None) if isinstance(item, DataObject) else None
+            if symbol:
+                item.symbol = self.symbol_registry.get_symbol(self.platform_id, symbol)
+
+    def _convert_item_to_fixed_point(self, item):
+        if not isinstance(item, DataObject):
+            return
+        price_precision, amount_precision = self._get_precisions(getattr(item, ParamName.SYMBOL, None))
+        # (Order book items have no symbol)
+        for sub_item in [item] + (getattr(item, ParamName.ASKS, None) or []) + \
+                (getattr(item, ParamName.BIDS, None) or []):
+            for name, value in list(vars(sub_item).items()):
+                if value is None:
+                    continue
+                if name in fixed_point_price_names:
+                    setattr(sub_item, name, to_fixed_point(value, price_precision))
+                elif name in fixed_point_amount_names:
+                    setattr(sub_item, name, to_fixed_point(value, amount_precision))
+
+    def convert_params_from_fixed_point(self, params):
+        # Fixed-point int prices and amounts of params back to str: 31200 -> "0.031200" (if is_fixed_point)
+        # (So values of items can be sent back as is: create_order(price=order.price, ...))
+        if not self.is_fixed_point or not params:
+            return
+        price_precision, amount_precision = self._get_precisions(params.get(ParamName.SYMBOL))
+        for name, value in list(params.items()):
+            if not isinstance(value, int) or isinstance(value, bool):
+                continue
+            if name in fixed_point_price_names:
+                params[name] = str(from_fixed_point(value, price_precision))
+            elif name in fixed_point_amount_names:
+                params[name] = str(from_fixed_point(value, amount_precision))
+
+    def _get_precisions(self, symbol):
+        return self.symbol_registry.get_precision(self.platform_id, symbol) \
+            if self.symbol_registry else (DEFAULT_PRECISION, DEFAULT_PRECISION)
+
     def parse_error(self, error_data=None, response=None):
         # (error_data=None and response!=None when REST API returns 404 and html response)
         if response and response.ok:
@@ -572,8 +664,12 @@ class ProtocolConverter:
             else " (code: %s msg: %s)" % (result.code, result.message)
         if not result.code:
             result.code = response.status_code
+        platform_code = result.code
         result.code = self.error_code_by_platform_error_code.get(result.code, result.code) \
             if self.error_code_by_platform_error_code else result.code
+        # (Use HTTP status if platform's code is unknown, as for rate limit errors)
+        if result.code == platform_code and response is not None and self.error_code_by_http_status:
+            result.code = self.error_code_by_http_status.get(response.status_code, result.code)
         result.message = ErrorCode.get_message_by_code(
             result.code) + response_message
         return result
@@ -619,34 +715,11 @@ class ProtocolConverter:
                     value)
 
     def _convert_timestamp_to_platform(self, timestamp):
-        if not timestamp:
-            return timestamp
-
-        if self.use_milliseconds:
-            timestamp /= 1000
-
-        if self.is_source_in_milliseconds:
-            timestamp *= 1000
-        elif self.is_source_in_timestring:
-            dt = datetime.utcfromtimestamp(timestamp)
-            timestamp = dt.isoformat()
-        return timestamp
+        # (See timestamps.py)
+        return self.timestamp_codec.encode(timestamp, self.use_milliseconds)
 
     def _convert_timestamp_from_platform(self, timestamp):
-        if type(timestamp) == str:
-            timestamp = int(timestamp)
-        if not timestamp:
-            return timestamp
-        if self.is_source_in_milliseconds:
-            timestamp /= 1000
-            # if int(timestamp) == timestamp:
-            #     timestamp = int(timestamp)
-        elif self.is_source_in_timestring:
-            timestamp = parser.parse(timestamp).timestamp()
-
-        if self.use_milliseconds:
-            timestamp = int(timestamp * 1000)
-        return timestamp
+        return self.timestamp_codec.decode(timestamp, self.use_milliseconds)
 
 
 class BaseClient:
@@ -660,9 +733,15 @@ class BaseClient:
     version = None
     _api_key = None
     _api_secret = None
+    # (Signer of _api_secret, created in set_credentials())
+    _signer = None
+    signer_digestmod = hashlib.sha256
     default_converter_class = ProtocolConverter
     _converter_class_by_version = None
     _converter_by_version = None
+    _symbol_registry = None
+    _is_fixed_point = False
+    _use_milliseconds = None
 
     # If True then if "symbol" param set to None that will return data for "all symbols"
     IS_NONE_SYMBOL_FOR_ALL_SYMBOLS = False
@@ -673,13 +752,41 @@ class BaseClient:
         # (as a dict for requests (REST) and a list for WebSockets (WS))
         return []
 
+    @property
+    def symbol_registry(self):
+        return self._symbol_registry
+
+    @symbol_registry.setter
+    def symbol_registry(self, value):
+        # (SymbolRegistry used by all converters, see symbols.py)
+        self._symbol_registry = value
+        for converter in (self._converter_by_version or {}).values():
+            if converter:
+                converter.symbol_registry = value
+
+    @property
+    def is_fixed_point(self):
+        return self._is_fixed_point
+
+    @is_fixed_point.setter
+    def is_fixed_point(self, value):
+        # (Prices and amounts as fixed-point ints for all converters, see ProtocolConverter.is_fixed_point)
+        self._is_fixed_point = value
+        for converter in (self._converter_by_version or {}).values():
+            if converter:
+                converter.is_fixed_point = value
+
     @property
     def use_milliseconds(self):
         return self.converter.use_milliseconds
 
     @use_milliseconds.setter
     def use_milliseconds(self, value):
-        self.converter.use_milliseconds = value
+        # (For all converters, can be set in constructor)
+        self._use_milliseconds = value
+        for converter in (self._converter_by_version or {}).values():
+            if converter:
+                converter.use_milliseconds = value
 
     def __init__(self, version=None, **kwargs) -> None:
         super().__init__()
@@ -710,6 +817,7 @@ class BaseClient:
     def set_credentials(self, api_key, api_secret):
         self._api_key = api_key
         self._api_secret = api_secret
+        self._signer = Signer(api_secret, self.signer_digestmod) if api_secret else None
 
     def get_or_create_converter(self, version=None):
         # Converter stores all the info about a platform
@@ -735,6 +843,12 @@ class BaseClient:
         # Create and store
         converter = converter_class(self.platform_id,
                                     version) if converter_class else None
+        if converter and self._symbol_registry:
+            converter.symbol_registry = self._symbol_registry
+        if converter and self._is_fixed_point:
+            converter.is_fixed_point = self._is_fixed_point
+        if converter and self._use_milliseconds is not None:
+            converter.use_milliseconds = self._use_milliseconds
         self._converter_by_version[version] = converter
 
         return converter
@@ -756,6 +870,9 @@ class RESTConverter(ProtocolConverter):
     # sorting values: ASCENDING, DESCENDING (newest first), None
     # DEFAULT_SORTING = Param.ASCENDING  # Const for current platform. See in param_name_lookup
     IS_SORTING_ENABLED = False  # False - SORTING param is not supported for current platform
+    # (False - history is fetched by item ids only (FROM_TIME and TO_TIME are ignored),
+    # so trades history can't be cached by time ranges, see HistoryCache)
+    IS_HISTORY_BY_TIME_SUPPORTED = False
     sorting = Sorting.DESCENDING  # Choose default sorting for all requests
 
     secured_endpoints = [
@@ -771,6 +888,8 @@ class RESTConverter(ProtocolConverter):
     # endpoint -> platform_endpoint
     endpoint_lookup = None
     max_limit_by_endpoint = None
+    # (Weights of requests in platform's rate limits. Endpoint.TICKER_ALL - for tickers without symbol)
+    request_weight_by_endpoint = None
 
     @property
     def default_sorting(self):
@@ -778,6 +897,11 @@ class RESTConverter(ProtocolConverter):
         return self._get_platform_param_value(Sorting.DEFAULT_SORTING)
 
     def preprocess_params(self, endpoint, params):
+        # ("ETH/BTC" -> "eth_btc")
+        if self.symbol_registry and params.get(ParamName.SYMBOL):
+            params[ParamName.SYMBOL] = self.symbol_registry.get_platform_symbol(
+                self.platform_id, params[ParamName.SYMBOL])
+        self.convert_params_from_fixed_point(params)
         self._process_limit_param(endpoint, params)
         self._process_sorting_param(endpoint, params)
         # Must be after sorting added
@@ -818,10 +942,9 @@ class RESTConverter(ProtocolConverter):
         is_descending = self._get_real_sorting(params) == Sorting.DESCENDING
 
         # (from_item <-> to_item)
-        # is_from_newer_than_to = getattr(from_item, self.ITEM_TIMESTAMP_ATTR, 0) > \
-        #                         getattr(to_item, self.ITEM_TIMESTAMP_ATTR, 0)
-        is_from_newer_than_to = (from_item.timestamp or 0) > (to_item.timestamp
-                                                              or 0)
+        # (Items can be also set by item_id)
+        is_from_newer_than_to = (getattr(from_item, self.ITEM_TIMESTAMP_ATTR, None) or 0) > \
+                                (getattr(to_item, self.ITEM_TIMESTAMP_ATTR, None) or 0)
         if from_item and to_item and is_from_newer_than_to:
             params[ParamName.FROM_ITEM] = to_item
             params[ParamName.TO_ITEM] = from_item
@@ -831,14 +954,15 @@ class RESTConverter(ProtocolConverter):
             params[ParamName.TO_ITEM] = from_item
             del params[ParamName.FROM_ITEM]
 
-    def process_secured(self, endpoint, platform_params, api_key, api_secret):
+    def process_secured(self, endpoint, platform_params, api_key, signer):
+        # (signer - Signer of client's api_secret)
         if endpoint in self.secured_endpoints:
             platform_params = self._generate_and_add_signature(
-                platform_params, api_key, api_secret)
+                platform_params, api_key, signer)
         return platform_params
 
     def _generate_and_add_signature(self, platform_params, api_key,
-                                    api_secret):
+                                    signer):
         # Generate and add signature here
         return platform_params
 
@@ -860,6 +984,8 @@ class RESTConverter(ProtocolConverter):
         #             result.symbol = symbol
         self._propagate_param_to_result(ParamName.SYMBOL, params, result)
         self._propagate_param_to_result(ParamName.INTERVAL, params, result)
+        self.convert_to_fixed_point(result)
+        self.convert_to_canonical_symbols(result)
 
         return result
 
@@ -875,14 +1001,37 @@ class RESTConverter(ProtocolConverter):
                     setattr(result, param_name, value)
 
 
+class _Flight:
+    # Request in progress which results are waited by other threads
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.event = Event()
+        self.result = None
+        self.exception = None
+
+
 class BaseRESTClient(BaseClient):
     # Settings:
     _log_prefix = "RESTClient"
 
     default_converter_class = RESTConverter
 
+    # (Identical GET requests made by several threads at the same time share
+    # one network call; each caller gets its own copy of the parsed result)
+    is_coalescing_enabled = False
+    # (Time to reuse results of GET requests: {Endpoint.TICKER: 0.5, ...})
+    ttl_sec_by_endpoint = None
+    # (Results kept for ttl_sec_by_endpoint; least recently added are removed first)
+    max_cached_result_count = 1000
+    # (Each request must be sent: for measuring latency and for private state
+    # which can be changed by the client's previous requests)
+    not_coalesced_endpoints = {Endpoint.SERVER_TIME}
+
     # State:
     delay_before_next_request_sec = 0
+    # (Number of requests which got result of another one)
+    coalesced_count = 0
 
     session = None
     _last_response_for_debugging = None
@@ -898,6 +1047,11 @@ class BaseRESTClient(BaseClient):
         super().__init__(version, **kwargs)
 
         self.session = requests.session()
+        # {request_key: _Flight}
+        self._flight_by_key = {}
+        # {request_key: (expire_time, result)} (in order of adding)
+        self._cached_result_by_key = OrderedDict()
+        self._flights_lock = Lock()
 
     def close(self):
         if self.session:
@@ -911,11 +1065,77 @@ class BaseRESTClient(BaseClient):
         params = converter.preprocess_params(endpoint, params)
         url, platform_params = converter.make_url_and_platform_params(
             endpoint, params, version=version)
-        platform_params = converter.process_secured(
-            endpoint, platform_params, self._api_key, self._api_secret)
         if not url:
             return None
 
+        ttl_sec = self.ttl_sec_by_endpoint.get(endpoint) if self.ttl_sec_by_endpoint else None
+        if method.upper() != "GET" or not (self.is_coalescing_enabled or ttl_sec) or \
+                endpoint in self.not_coalesced_endpoints or endpoint in converter.secured_endpoints:
+            return self._send_request(converter, method, endpoint, params, url, platform_params)
+
+        # Coalesce identical requests
+        # (Key is made before signing which can add nonce or timestamp)
+        # (Same URL can be parsed differently for different endpoints)
+        key = (endpoint, url, repr(sorted(platform_params.items())) if platform_params else None)
+        with self._flights_lock:
+            if ttl_sec:
+                expire_time, result = self._cached_result_by_key.get(key, (0, None))
+                if expire_time > time.time():
+                    self.coalesced_count += 1
+                    return self._copy_result(result)
+                self._cached_result_by_key.pop(key, None)
+            flight = self._flight_by_key.get(key)
+            is_waiting = flight is not None and self.is_coalescing_enabled
+            if is_waiting:
+                self.coalesced_count += 1
+            else:
+                flight = self._flight_by_key[key] = _Flight()
+
+        if is_waiting:
+            flight.event.wait()
+            if flight.exception:
+                raise flight.exception
+            return self._copy_result(flight.result)
+
+        try:
+            flight.result = self._send_request(converter, method, endpoint, params, url, platform_params)
+        except Exception as exception:
+            flight.exception = exception
+            raise
+        finally:
+            with self._flights_lock:
+                if self._flight_by_key.get(key) is flight:
+                    del self._flight_by_key[key]
+                if ttl_sec and not flight.exception and not isinstance(flight.result, Error):
+                    self._add_cached_result(key, time.time() + ttl_sec, flight.result)
+            flight.event.set()
+        # (Shared result is kept unchanged)
+        return self._copy_result(flight.result)
+
+    def _add_cached_result(self, key, expire_time, result):
+        # (Under _flights_lock)
+        cached_result_by_key = self._cached_result_by_key
+        cached_result_by_key.pop(key, None)
+        cached_result_by_key[key] = (expire_time, result)
+
+        # Remove expired (from the oldest, until a not expired one) and the oldest over max count
+        now = time.time()
+        while cached_result_by_key:
+            oldest_expire_time, _ = next(iter(cached_result_by_key.values()))
+            if oldest_expire_time > now and len(cached_result_by_key) <= self.max_cached_result_count:
+                break
+            cached_result_by_key.popitem(last=False)
+
+    def _copy_result(self, result):
+        # (Items are changed by callers: symbol, interval, timestamp are set, lists are reversed)
+        if isinstance(result, list):
+            return [copy(item) for item in result]
+        return copy(result) if isinstance(result, DataObject) else result
+
+    def _send_request(self, converter, method, endpoint, params, url, platform_params):
+        platform_params = converter.process_secured(
+            endpoint, platform_params, self._api_key, self._signer)
+
         # Send
         kwargs = {"headers": self.headers}
         params_name = "params" if method.lower() == "get" else "data"
@@ -955,6 +1175,23 @@ class PlatformRESTClient(BaseRESTClient):
     """
     _server_time_diff_s = None
 
+    # Settings:
+    # (HistoryCache for closed candles and past trades, see cache.py; can be shared by clients)
+    history_cache = None
+    # (Trades older than that are not changed anymore)
+    history_cache_delay_sec = 60
+    # (Max requests to fetch one missing range)
+    history_cache_max_pages = 100
+    # (ServerClock which keeps time difference with server up to date, see clock.py)
+    server_clock = None
+    # (TickerSnapshot to take tickers from instead of requests while it's actual, see tickers.py)
+    ticker_snapshot = None
+
+    def close(self):
+        if self.server_clock:
+            self.server_clock.close()
+        super().close()
+
     def ping(self, version=None, **kwargs):
         endpoint = Endpoint.PING
         return self._send("GET", endpoint, version=version, **kwargs)
@@ -965,10 +1202,9 @@ class PlatformRESTClient(BaseRESTClient):
                              **kwargs):
         endpoint = Endpoint.SERVER_TIME
 
-        if not force_from_server and self._server_time_diff_s is not None:
-            # (Calculate using time difference with server taken from previous call)
-            result = self._server_time_diff_s + time.time()
-            return int(result * 1000) if self.use_milliseconds else result
+        if not force_from_server and (self._server_time_diff_s is not None or
+                                      self.server_clock and self.server_clock.is_synced):
+            return self.estimate_server_timestamp()
 
         time_before = time.time()
 
@@ -976,15 +1212,34 @@ class PlatformRESTClient(BaseRESTClient):
         if isinstance(result, Error):
             return result
 
-        # (Update time diff)
+        # (Update time diff supposing server time was taken at the middle of request)
         self._server_time_diff_s = (result / 1000 if self.use_milliseconds else
-                                    result) - time_before
+                                    result) - (time_before + time.time()) / 2
         return result
 
+    def estimate_server_timestamp(self):
+        # Server time without requests (local time if time difference with server is not known yet)
+        if self.server_clock and self.server_clock.is_synced:
+            # (Synced in background)
+            result = self.server_clock.time()
+        else:
+            # (Calculate using time difference with server taken from previous call)
+            result = (self._server_time_diff_s or 0) + time.time()
+        return int(result * 1000) if self.use_milliseconds else result
+
     def get_symbols(self, version=None, **kwargs):
         endpoint = Endpoint.SYMBOLS
         return self._send("GET", endpoint, version=version, **kwargs)
 
+    def get_precisions(self, version=None, **kwargs):
+        # -> {symbol: (price_precision, amount_precision)}
+        # (None if platform doesn't provide them: default precisions are used then)
+        endpoint = Endpoint.PRECISIONS
+        converter = self.get_or_create_converter(version)
+        if not converter.endpoint_lookup or endpoint not in converter.endpoint_lookup:
+            return None
+        return self._send("GET", endpoint, version=version, **kwargs)
+
     def fetch_history(self,
                       endpoint,
                       symbol,
@@ -1048,6 +1303,11 @@ class PlatformRESTClient(BaseRESTClient):
         # from_time and to_time used along with from_item and to_item as we often need to fetch
         # history by time and only Binance (as far as I know) doesn't support that (only by id)
 
+        if self.history_cache and from_time is not None and from_item is None and to_item is None and \
+                self.get_or_create_converter(version).IS_HISTORY_BY_TIME_SUPPORTED:
+            return self._fetch_history_with_cache(Endpoint.TRADE, symbol, None, limit, from_time,
+                                                  to_time, sorting, version, **kwargs)
+
         return self.fetch_history(Endpoint.TRADE, symbol, limit, from_item,
                                   to_item, sorting, is_use_max_limit,
                                   from_time, to_time, version, **kwargs)
@@ -1063,6 +1323,10 @@ class PlatformRESTClient(BaseRESTClient):
                       is_use_max_limit=False,
                       version=None,
                       **kwargs):
+        if self.history_cache and from_time is not None and interval in Interval.seconds_by_interval:
+            return self._fetch_history_with_cache(Endpoint.CANDLE, symbol, interval, limit, from_time,
+                                                  to_time, None, version, **kwargs)
+
         endpoint = Endpoint.CANDLE
         params = {
             ParamName.SYMBOL: symbol,
@@ -1076,6 +1340,117 @@ class PlatformRESTClient(BaseRESTClient):
         result = self._send("GET", endpoint, params, version, **kwargs)
         return result
 
+    # Cached history
+
+    def _fetch_history_with_cache(self, endpoint, symbol, interval, limit, from_time, to_time=None,
+                                  sorting=None, version=None, **kwargs):
+        # Closed items are taken from history_cache (missing ones are fetched and cached before),
+        # and items which still can be changed are fetched from platform
+        converter = self.get_or_create_converter(version)
+        time_unit = 1000 if self.use_milliseconds else 1
+        now = time.time() * time_unit
+        if endpoint == Endpoint.CANDLE:
+            # (Candle is closed when the next one is opened)
+            closed_time = now - Interval.seconds_by_interval[interval] * time_unit
+        else:
+            closed_time = now - self.history_cache_delay_sec * time_unit
+        if to_time is None:
+            to_time = now
+        # (Items in seconds and in milliseconds, fixed-point and not, are not mixed in shared cache)
+        key = (self.platform_id, endpoint, symbol, interval, time_unit, converter.is_fixed_point)
+
+        cached_to_time = min(to_time, closed_time)
+        tail_from_time = max(from_time, cached_to_time)
+        if from_time <= cached_to_time:
+            for range_from, range_to in self.history_cache.get_missing_ranges(key, from_time, cached_to_time):
+                if range_to == cached_to_time < to_time:
+                    # (Fetch with not closed tail in one go)
+                    tail_from_time = range_from
+                    break
+                fetched = self._fetch_time_range(endpoint, symbol, interval, range_from, range_to,
+                                                 version, **kwargs)
+                if isinstance(fetched, Error):
+                    return fetched
+                items, is_complete = fetched
+                self.history_cache.add(key, range_from, range_to, items, is_complete)
+
+        tail = []
+        if to_time > cached_to_time:
+            # Not closed tail
+            fetched = self._fetch_time_range(endpoint, symbol, interval, tail_from_time, to_time, version, **kwargs)
+            if isinstance(fetched, Error):
+                return fetched
+            tail, is_complete = fetched
+            if tail_from_time < cached_to_time:
+                closed_items = [item for item in tail if item.timestamp <= cached_to_time]
+                self.history_cache.add(key, tail_from_time, cached_to_time, closed_items, is_complete)
+
+        result = self.history_cache.get_items(key, from_time, cached_to_time) if from_time <= cached_to_time else []
+        if tail:
+            cached_keys = {get_item_key(item) for item in result}
+            result += [item for item in tail if get_item_key(item) not in cached_keys]
+
+        sorting = sorting or (converter.sorting if converter.IS_SORTING_ENABLED else converter.default_sorting)
+        if sorting == Sorting.DESCENDING:
+            result.reverse()
+        return result[:limit] if limit else result
+
+    def _fetch_time_range(self, endpoint, symbol, interval, from_time, to_time, version=None, **kwargs):
+        # All items in [from_time, to_time] page by page -> (items, is_complete) or Error
+        converter = self.get_or_create_converter(version)
+        history_endpoint_lookup = converter.history_endpoint_lookup
+        history_endpoint = history_endpoint_lookup.get(endpoint, endpoint) if history_endpoint_lookup else endpoint
+        max_limit = converter.max_limit_by_endpoint.get(history_endpoint) \
+            if converter.max_limit_by_endpoint else None
+
+        item_by_key = {}
+        for _ in range(self.history_cache_max_pages):
+            if endpoint == Endpoint.CANDLE:
+                params = {
+                    ParamName.SYMBOL: symbol,
+                    ParamName.INTERVAL: interval,
+                    ParamName.LIMIT: None,
+                    ParamName.FROM_TIME: from_time,
+                    ParamName.TO_TIME: to_time,
+                    ParamName.IS_USE_MAX_LIMIT: True,
+                }
+                page = self._send("GET", endpoint, params, version, **kwargs)
+            else:
+                page = self.fetch_history(endpoint, symbol, sorting=Sorting.ASCENDING, is_use_max_limit=True,
+                                          from_time=from_time, to_time=to_time, version=version, **kwargs)
+            if isinstance(page, Error):
+                return page
+            page = [item for item in (page if isinstance(page, list) else [page])
+                    if isinstance(item, ItemObject) and item.timestamp is not None]
+
+            new_count = 0
+            in_range_count = 0
+            for item in page:
+                if not from_time <= item.timestamp <= to_time:
+                    continue
+                in_range_count += 1
+                item_key = get_item_key(item)
+                if item_key not in item_by_key:
+                    item.symbol = item.symbol or symbol
+                    if interval:
+                        item.interval = item.interval or interval
+                    item_by_key[item_key] = item
+                    new_count += 1
+
+            if page and not in_range_count:
+                # (Time range was ignored by platform, so the range can't be marked as complete (and empty))
+                self.logger.warning("No items in range: %s - %s among %s fetched items for endpoint: %s",
+                                    from_time, to_time, len(page), endpoint)
+                return sorted(item_by_key.values(), key=get_item_key), False
+            if not new_count or (max_limit and len(page) < max_limit):
+                return sorted(item_by_key.values(), key=get_item_key), True
+            # (Next page from the last item, as several items can have same timestamp)
+            from_time = max(item.timestamp for item in page)
+
+        self.logger.warning("Not all items are fetched for range: %s - %s (max pages: %s reached)",
+                            from_time, to_time, self.history_cache_max_pages)
+        return sorted(item_by_key.values(), key=get_item_key), False
+
     # Ticker
 
     def fetch_ticker(self, symbol=None, version=None, **kwargs):
@@ -1089,6 +1464,28 @@ class PlatformRESTClient(BaseRESTClient):
 
     def fetch_tickers(self, symbols=None, version=None, **kwargs):
         endpoint = Endpoint.TICKER
+        if symbols:
+            # (Same symbols as in parsed items)
+            registry = self.symbol_registry
+            symbols = [registry.get_symbol(self.platform_id, symbol) if registry else symbol
+                       for symbol in symbols if symbol]
+
+        # From WebSocket
+        if self.ticker_snapshot:
+            result = self.ticker_snapshot.get_tickers(symbols)
+            if result is not None:
+                return result
+
+        # (Request for each symbol if it's cheaper than one request for all symbols)
+        if symbols and self._is_ticker_by_symbol_cheaper(len(symbols), version):
+            result = []
+            for symbol in symbols:
+                item = self.fetch_ticker(symbol, version, **kwargs)
+                if isinstance(item, Error):
+                    return item
+                result.append(item)
+            return result
+
         # (Send None for all symbols)
         # params = {
         #     ParamName.SYMBOLS: None,
@@ -1096,15 +1493,20 @@ class PlatformRESTClient(BaseRESTClient):
 
         result = self._send("GET", endpoint, None, version, **kwargs)
 
-        if symbols:
+        if symbols and isinstance(result, list):
             # Filter result for symbols defined
-            symbols = [
-                symbol.upper() if symbol else symbol for symbol in symbols
-            ]
-            return [item for item in result if item.symbol in symbols]
+            symbols = {symbol.upper() for symbol in symbols}
+            return [item for item in result if item.symbol and item.symbol.upper() in symbols]
 
         return result
 
+    def _is_ticker_by_symbol_cheaper(self, symbol_count, version=None):
+        weight_by_endpoint = self.get_or_create_converter(version).request_weight_by_endpoint
+        if not weight_by_endpoint or Endpoint.TICKER not in weight_by_endpoint or \
+                Endpoint.TICKER_ALL not in weight_by_endpoint:
+            return False
+        return symbol_count * weight_by_endpoint[Endpoint.TICKER] < weight_by_endpoint[Endpoint.TICKER_ALL]
+
     # Order Book
 
     def fetch_order_book(self,
@@ -1130,12 +1532,47 @@ class PlatformRESTClient(BaseRESTClient):
 
 
 class PrivatePlatformRESTClient(PlatformRESTClient):
+    # Settings:
+    # (Threads sending requests of create_orders() and cancel_orders() concurrently
+    # if platform has no batch endpoint; should not exceed pool size of session: 10)
+    max_batch_workers = 10
+
+    # State:
+    _batch_executor = None
+    # (Called with results of create_order() (not test), cancel_order() and check_order(),
+    # including batches: listener(method_name, result), see AccountState)
+    _order_listeners = ()
+
     def __init__(self, api_key=None, api_secret=None, version=None,
                  **kwargs) -> None:
         super().__init__(version=version, **kwargs)
 
-        self._api_key = api_key
-        self._api_secret = api_secret
+        self.set_credentials(api_key, api_secret)
+
+    def close(self):
+        if self._batch_executor:
+            self._batch_executor.shutdown(wait=False)
+            self._batch_executor = None
+        super().close()
+
+    def add_order_listener(self, listener):
+        # (Replaced on change, not modified, so listeners are called without lock)
+        self._order_listeners = self._order_listeners + (listener,)
+
+    def remove_order_listener(self, listener):
+        listeners = list(self._order_listeners)
+        if listener in listeners:
+            listeners.remove(listener)
+        self._order_listeners = tuple(listeners)
+
+    def _notify_order_listeners(self, method_name, result):
+        for listener in self._order_listeners:
+            try:
+                listener(method_name, result)
+            except Exception as exception:
+                # (Result must be returned anyway)
+                self.logger.exception("Error in order listener: %s for result: %s. Error: %s",
+                                      listener, result, exception)
 
     # Trades
 
@@ -1186,6 +1623,8 @@ class PrivatePlatformRESTClient(PlatformRESTClient):
 
         result = self._send(
             "POST", endpoint, params, version=version or "3", **kwargs)
+        if not is_test:
+            self._notify_order_listeners("create_order", result)
         return result
 
     def cancel_order(self, order, symbol=None, version=None, **kwargs):
@@ -1200,8 +1639,67 @@ class PrivatePlatformRESTClient(PlatformRESTClient):
 
         result = self._send("DELETE", endpoint, params, version or "3",
                             **kwargs)
+        self._notify_order_listeners("cancel_order", result)
         return result
 
+    def create_orders(self, orders, is_test=False, version=None, **kwargs):
+        # orders: [{"symbol": "ETHBTC", "order_type": OrderType.LIMIT, "direction": Direction.BUY,
+        #           "price": 0.03, "amount": 1}, ...] (args of create_order())
+        # -> [Order or Error, ...] in the same order as orders
+        result = self._create_orders_batch(orders, is_test, version, **kwargs)
+        if result is not None:
+            if not is_test:
+                for item in result:
+                    self._notify_order_listeners("create_order", item)
+            return result
+
+        def create_order(order_params):
+            return self.create_order(is_test=is_test, version=version, **dict(kwargs, **order_params))
+
+        return self._map_concurrently(create_order, orders)
+
+    def cancel_orders(self, orders, symbol=None, version=None, **kwargs):
+        # orders: [Order or order_id, ...]
+        # -> [Order or Error, ...] in the same order as orders
+        result = self._cancel_orders_batch(orders, symbol, version, **kwargs)
+        if result is not None:
+            for item in result:
+                self._notify_order_listeners("cancel_order", item)
+            return result
+
+        def cancel_order(order):
+            return self.cancel_order(order, symbol, version, **kwargs)
+
+        return self._map_concurrently(cancel_order, orders)
+
+    def _create_orders_batch(self, orders, is_test=False, version=None, **kwargs):
+        # Override for platforms having batch endpoint (None - not supported)
+        return None
+
+    def _cancel_orders_batch(self, orders, symbol=None, version=None, **kwargs):
+        # Override for platforms having batch endpoint (None - not supported)
+        return None
+
+    def _map_concurrently(self, fun, items):
+        # Call fun for each item in pooled threads and return results in the same order
+        if len(items) <= 1 or self.max_batch_workers <= 1:
+            return [self._call_for_item(fun, item) for item in items]
+
+        if not self._batch_executor:
+            self._batch_executor = ThreadPoolExecutor(self.max_batch_workers)
+        return list(self._batch_executor.map(partial(self._call_for_item, fun), items))
+
+    def _call_for_item(self, fun, item):
+        # (Error of one item should not break others)
+        try:
+            return fun(item)
+        except Exception as exception:
+            self.logger.exception("Error while processing: %s", item)
+            result = Error()
+            result.code = ErrorCode.APP_ERROR
+            result.message = ErrorCode.get_message_by_code(ErrorCode.APP_ERROR) + " (%s)" % exception
+            return result
+
     # was fetch_order
     def check_order(self, order, symbol=None, version=None,
                     **kwargs):  # , direction=None
@@ -1214,6 +1712,7 @@ class PrivatePlatformRESTClient(PlatformRESTClient):
         }
 
         result = self._send("GET", endpoint, params, version or "3", **kwargs)
+        self._notify_order_listeners("check_order", result)
         return result
 
     def fetch_orders(self,
@@ -1244,6 +1743,11 @@ class WSConverter(ProtocolConverter):
     # False - Subscribing by connecting URL: BitMEX, Binance.
     # True - Subscribing by command: Bitfinex (v1, v2).
     IS_SUBSCRIPTION_COMMAND_SUPPORTED = True
+    # False - parsing depends on previous messages (as for Bitfinex channel ids),
+    # so messages cannot be parsed in a ParserPool
+    IS_PARSING_STATELESS = True
+    # (None - no limit)
+    MAX_SUBSCRIPTIONS_PER_CONNECTION = None
 
     # supported_endpoints = None
     # symbol_endpoints = None  # In subclass you can call REST API to get symbols
@@ -1285,6 +1789,9 @@ class WSConverter(ProtocolConverter):
             if self.supported_endpoints else set()
 
     def generate_subscriptions(self, endpoints, symbols, **params):
+        if self.symbol_registry and symbols:
+            symbols = [self.symbol_registry.get_platform_symbol(self.platform_id, symbol)
+                       for symbol in symbols]
         result = set()
         for endpoint in endpoints:
             if endpoint in self.symbol_endpoints:
@@ -1310,16 +1817,21 @@ class WSConverter(ProtocolConverter):
 
     def parse(self, endpoint, data):
         # (Get endpoint from event type)
-        if not endpoint and data and isinstance(
-                data, dict) and self.event_type_param:
-            event_type = data.get(self.event_type_param, endpoint)
+        # (List of items can be sent for all symbols, as Binance's "!miniTicker@arr")
+        item_data = data[0] if data and isinstance(data, list) else data
+        if not endpoint and item_data and isinstance(
+                item_data, dict) and self.event_type_param:
+            event_type = item_data.get(self.event_type_param, endpoint)
             endpoint = self.endpoint_by_event_type.get(event_type, event_type) \
                 if self.endpoint_by_event_type else event_type
             # if not endpoint:
             #     self.logger.error("Cannot find event type by name: %s in data: %s", self.event_type_param, data)
             # self.logger.debug("Endpoint: %s by name: %s in data: %s", endpoint, self.event_type_param, data)
 
-        return super().parse(endpoint, data)
+        result = super().parse(endpoint, data)
+        self.convert_to_fixed_point(result)
+        self.convert_to_canonical_symbols(result)
+        return result
 
 
 class WSClient(BaseClient):
@@ -1338,8 +1850,24 @@ class WSClient(BaseClient):
     default_converter_class = WSConverter
 
     is_auto_reconnect = True
+    # (Delay is doubled for each next try up to max_reconnect_delay_sec
+    # and randomly decreased by reconnect_jitter part of it)
     reconnect_delay_sec = 3
+    max_reconnect_delay_sec = 60
+    reconnect_jitter = 0.5
     reconnect_count = 3
+    # Make-before-break: open new connection before closing the previous one
+    # on reconnect (items received by both connections are skipped)
+    is_make_before_break = True
+    # (Close previous connection if no overlapping items received during this time)
+    max_overlap_sec = 10
+    # (Reconnect proactively before platform disconnects by itself)
+    rotation_interval_sec = None
+    # (ParserPool instance to parse messages in separate processes)
+    parser_pool = None
+    # (Message to keep connection alive if platform needs that)
+    heartbeat_message = None
+    heartbeat_interval_sec = 30
 
     on_connect = None
     on_data = None
@@ -1356,6 +1884,8 @@ class WSClient(BaseClient):
     successful_subscriptions = None
     failed_subscriptions = None
     is_subscribed_with_url = False
+    # (Last received trade by symbol to know where data was interrupted)
+    last_trade_by_symbol = None
 
     # Connection
     is_started = False
@@ -1363,6 +1893,12 @@ class WSClient(BaseClient):
     _reconnect_tries = 0
     ws = None
     thread = None
+    # (Previous connection which is still receiving and the next which is connecting)
+    _prev_ws = None
+    _next_ws = None
+    # (Items received while switching connections)
+    _overlap_items = None
+    _heartbeat_thread = None
     _data_buffer = None
 
     @property
@@ -1372,6 +1908,10 @@ class WSClient(BaseClient):
         url, platform_params = self.converter.make_url_and_platform_params()
         return url if self.converter else ""
 
+    def _get_connection_url(self):
+        # Called only when connecting, unlike url, which can be read anytime (e.g. for logging)
+        return self.url
+
     @property
     def is_connected(self):
         return self.ws.sock.connected if self.ws and self.ws.sock else False
@@ -1379,8 +1919,14 @@ class WSClient(BaseClient):
     def __init__(self, api_key=None, api_secret=None, version=None,
                  **kwargs) -> None:
         super().__init__(version, **kwargs)
-        self._api_key = api_key
-        self._api_secret = api_secret
+        self.set_credentials(api_key, api_secret)
+
+        self.current_subscriptions = set()
+        self.pending_subscriptions = set()
+        self.successful_subscriptions = set()
+        self.failed_subscriptions = set()
+        self.last_trade_by_symbol = {}
+        self._lock = RLock()
 
         # (For convenience)
         self.IS_SUBSCRIPTION_COMMAND_SUPPORTED = self.converter.IS_SUBSCRIPTION_COMMAND_SUPPORTED
@@ -1445,8 +1991,7 @@ class WSClient(BaseClient):
 
         self.logger.debug("Subscribe from endpoints: %s and symbols: %s",
                           endpoints, symbols)
-        subscribed = self.pending_subscriptions.union(self.successful_subscriptions or set()) \
-            if self.pending_subscriptions else set()
+        subscribed = self.pending_subscriptions.union(self.successful_subscriptions)
         if not endpoints and not symbols:
             subscriptions = self.current_subscriptions.copy()
 
@@ -1537,30 +2082,30 @@ class WSClient(BaseClient):
             return
 
         # Connect
-        if not self.ws:
-            self.ws = WebSocketApp(
-                self.url,
-                on_open=self._on_open,
-                on_message=self._on_message,
-                on_error=self._on_error,
-                on_close=self._on_close)
-        else:
-            self.ws.url = self.url
-            self.ws.header = self.headers
-
-        # (run_forever() will raise an exception if previous socket is still not closed)
-        self.logger.debug("Start WebSocket with url: %s" % self.ws.url)
         self.is_started = True
+        self._prev_ws = self._next_ws = self._overlap_items = None
+        self.ws = self._start_ws_app()
 
-        self.thread = Thread(target=self.ws.run_forever)
-        self.ws.run_forever()
-        self.thread.daemon = True
-        self.thread.start()
+        if self.heartbeat_message:
+            self._heartbeat_thread = Thread(target=self._send_heartbeats)
+            self._heartbeat_thread.daemon = True
+            self._heartbeat_thread.start()
 
     def reconnect(self):
         self.logger.debug("Reconnect WebSocket")
-        self.close()
-        self.connect()
+        if not self.is_make_before_break or not self.is_started or not self.is_connected:
+            # (Nothing to keep receiving from)
+            self.close()
+            self.connect()
+            return
+
+        # Make-before-break
+        # (Previous connection works until the new one is opened and receives same items)
+        if self._next_ws:
+            # (Reconnect with new subscriptions in URL)
+            self._next_ws.close()
+        self._overlap_items = set()
+        self._next_ws = self._start_ws_app()
 
     def close(self):
         if not self.is_started:
@@ -1570,12 +2115,111 @@ class WSClient(BaseClient):
         self.logger.debug("Close WebSocket")
         # (If called directly or from _on_close())
         self.is_started = False
-        if self.is_connected:
-            # (If called directly)
+        self._is_reconnecting = False
+        for ws in (self._next_ws, self._prev_ws):
+            if ws:
+                ws.close()
+        self._prev_ws = self._next_ws = self._overlap_items = None
+        if self.ws:
+            # (If called directly or still connecting)
             self.ws.close()
 
         super().close()
 
+    def _start_ws_app(self):
+        # (Callbacks get connection as the first argument to distinguish
+        # current connection from the previous and the next ones)
+        url = self._get_connection_url()
+        self.logger.debug("Start WebSocket with url: %s" % url)
+        ws = WebSocketApp(
+            url,
+            header=self.headers,
+            on_open=lambda ws: self._on_ws_open(ws),
+            on_message=lambda ws, message: self._on_ws_message(ws, message),
+            on_error=lambda ws, error: self._on_error(error),
+            on_close=lambda ws, *args: self._on_ws_close(ws))
+
+        self.thread = Thread(target=ws.run_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return ws
+
+    def _on_ws_open(self, ws):
+        if ws is self._next_ws:
+            self.logger.debug("Switch to the new connection")
+            # (New connection is used for sending, previous one - only for receiving until overlap)
+            self._prev_ws, self.ws, self._next_ws = self.ws, ws, None
+            self._start_timer(self.max_overlap_sec, self._close_prev_ws, self._prev_ws)
+        elif ws is not self.ws:
+            # (Closed before opened)
+            return
+
+        if self.rotation_interval_sec:
+            self._start_timer(self.rotation_interval_sec, self._rotate, ws)
+
+        self._on_open()
+
+    def _on_ws_message(self, ws, message):
+        if ws is self.ws or ws is self._prev_ws:
+            self._on_message(message)
+
+    def _on_ws_close(self, ws):
+        if ws is self._next_ws:
+            self.logger.warning("New connection closed before opened. Keep using the previous one.")
+            self._next_ws = self._overlap_items = None
+            if self.is_started:
+                self._schedule_reconnect()
+        elif ws is self.ws:
+            self._on_close()
+
+    def _close_prev_ws(self, ws=None):
+        # (ws - to close only if not closed and replaced already)
+        with self._lock:
+            prev_ws = self._prev_ws
+            if not prev_ws or (ws and ws is not prev_ws):
+                return
+            self.logger.debug("Close previous connection")
+            self._prev_ws = self._overlap_items = None
+        prev_ws.close()
+
+    def _rotate(self, ws):
+        if ws is self.ws and self.is_started:
+            self.logger.info("Rotate connection after %s sec", self.rotation_interval_sec)
+            self.reconnect()
+
+    def _schedule_reconnect(self):
+        # (Not in callback thread to not block it)
+        delay_sec = self._get_reconnect_delay()
+        self.logger.info("Reconnect in %.1f sec (try: %s)", delay_sec, self._reconnect_tries + 1)
+        self._reconnect_tries += 1
+        self._is_reconnecting = True
+        self._start_timer(delay_sec, self._on_reconnect_timer)
+
+    def _get_reconnect_delay(self):
+        if self._reconnect_tries == 0:
+            # Don't wait before the first reconnection try
+            return 0
+        delay_sec = min(self.max_reconnect_delay_sec, self.reconnect_delay_sec * 2 ** (self._reconnect_tries - 1))
+        return delay_sec * (1 - random.random() * self.reconnect_jitter)
+
+    def _on_reconnect_timer(self):
+        # (Skip if closed while waiting)
+        if self._is_reconnecting:
+            self.reconnect()
+
+    def _send_heartbeats(self):
+        # (Stop on close or when replaced by thread of next connect())
+        while self.is_started and current_thread() is self._heartbeat_thread:
+            time.sleep(self.heartbeat_interval_sec)
+            if self.is_connected:
+                self.ws.send(self.heartbeat_message)
+
+    def _start_timer(self, delay_sec, function, *args):
+        timer = Timer(delay_sec, function, args)
+        timer.daemon = True
+        timer.start()
+        return timer
+
     def _on_open(self):
         self.logger.debug(
             "On open. %s", "Connected."
@@ -1590,33 +2234,74 @@ class WSClient(BaseClient):
 
         # Subscribe by command on connect
         if self.IS_SUBSCRIPTION_COMMAND_SUPPORTED and not self.is_subscribed_with_url:
-            self._subscribe(self.subscriptions_data)
+            self._subscribe(self.current_subscriptions)
 
     def _on_message(self, message):
 
         self.logger.debug("On message: %s", message[:200])
+        # (Parse in parser processes if pool is set and converter allows that)
+        if self.parser_pool and self.converter.IS_PARSING_STATELESS:
+            self.parser_pool.submit(self, message)
+            return
+
+        # raw -> items
+        result = self._decode_and_parse(message)
+
+        self._process_result(result)
+
+    def _decode_message(self, message):
         # str -> json
         try:
-            data = json.loads(message)
+            return json.loads(message)
         except json.JSONDecodeError:
             self.logger.error("Wrong JSON is received! Skipped. message: %s",
                               message)
-            return
+            return None
+
+    def _decode_and_parse(self, message):
+        data = self._decode_message(message)
+        if data is None:
+            return None
 
         # json -> items
-        result = self._parse(None, data)
+        return self._parse(None, data)
 
-        # Process items
-        self._data_buffer = []
+    def _process_result(self, result):
+        # (Several connections can receive messages while switching)
+        with self._lock:
+            if self._overlap_items is not None:
+                result = self._skip_overlapping_items(result)
 
-        if result and isinstance(result, list):
-            for item in result:
-                self.on_item_received(item)
-        else:
-            self.on_item_received(result)
+            # Process items
+            self._data_buffer = []
 
-        if self.on_data and self._data_buffer:
-            self.on_data(self._data_buffer)
+            if result and isinstance(result, list):
+                for item in result:
+                    self.on_item_received(item)
+            else:
+                self.on_item_received(result)
+
+            if self.on_data and self._data_buffer:
+                self.on_data(self._data_buffer)
+
+    def _skip_overlapping_items(self, result):
+        # Skip items received by both previous and new connections
+        items = result if isinstance(result, list) else [result]
+        unique_items = []
+        is_overlapped = False
+        for item in items:
+            # (Items without item_id, like candles, can't be identified and are passed as is)
+            if isinstance(item, ItemObject) and item.item_id is not None:
+                if item in self._overlap_items:
+                    is_overlapped = True
+                    continue
+                self._overlap_items.add(item)
+            unique_items.append(item)
+
+        # (New connection receives same items as previous one, so previous is not needed anymore)
+        if is_overlapped and self._prev_ws:
+            self._close_prev_ws()
+        return unique_items
 
     def _parse(self, endpoint, data):
         if data and isinstance(data, list):
@@ -1626,6 +2311,9 @@ class WSClient(BaseClient):
         return self.converter.parse(endpoint, data)
 
     def on_item_received(self, item):
+        if isinstance(item, Trade):
+            self.last_trade_by_symbol[item.symbol] = item
+
         # To skip empty and unparsed data
         if self.on_data_item and isinstance(item, DataObject):
             self.on_data_item(item)
@@ -1644,12 +2332,7 @@ class WSClient(BaseClient):
 
         if self.is_started or (self._is_reconnecting and
                                self._reconnect_tries < self.reconnect_count):
-            self._is_reconnecting = True
-            if self._reconnect_tries == 0:
-                # Don't wait before the first reconnection try
-                time.sleep(self.reconnect_delay_sec)
-            self._reconnect_tries += 1
-            self.reconnect()
+            self._schedule_reconnect()
             return
         self._is_reconnecting = False
 
@@ -0,0 +1,244 @@
+import asyncio
+import json
+
+import websockets
+
+from hyperquant.api import Platform
+from hyperquant.clients import WSClient, DataObject
+from hyperquant.clients.binance import BinanceWSClient
+from hyperquant.clients.bitfinex import BitfinexWSClient
+from hyperquant.clients.bitmex import BitMEXWSClient
+from hyperquant.clients.okex import OkexWSClient
+
+"""
+asyncio WebSocket clients.
+
+Same as WSClient subclasses (same converters, subscribing and parsing), but all
+connections are run as tasks in one event loop instead of a thread per client
+(and a heartbeat thread for OKEx).
+
+    async def main():
+        binance = BinanceAsyncWSClient()
+        okex = OkexAsyncWSClient()
+        binance.subscribe([Endpoint.TRADE], ["ETHBTC", "BNBBTC"])
+        okex.subscribe([Endpoint.TRADE], ["eth_btc"])
+
+        async for item in iterate_items(binance, okex):
+            print(item)
+"""
+
+
+class AsyncWSClientMixin:
+    """
+    Note: Mixin must be the first base class to override connection methods of WSClient.
+    """
+    # Settings:
+    loop = None
+    # (Set on first iteration; can be shared by several clients)
+    items_queue = None
+
+    # State:
+    _ws = None
+    _task = None
+
+    @property
+    def is_connected(self):
+        return bool(self._ws and self._ws.open)
+
+    def __init__(self, api_key=None, api_secret=None, version=None, loop=None, **kwargs) -> None:
+        super().__init__(api_key, api_secret, version, **kwargs)
+
+        self.loop = loop or self.loop or asyncio.get_event_loop()
+
+    # Iterating
+
+    def __aiter__(self):
+        if not self.items_queue:
+            self.items_queue = asyncio.Queue()
+        return self
+
+    async def __anext__(self):
+        item = await self.items_queue.get()
+        if item is None:
+            # Closed
+            raise StopAsyncIteration
+        return item
+
+    # Connection
+
+    def connect(self, version=None):
+        self.logger.debug("connect")
+        # Check ready
+        if not self.current_subscriptions:
+            self.logger.warning("Please subscribe before connect.")
+            return
+
+        # (If the task is still running, it will reconnect by itself)
+        is_running = self._task and not self._task.done()
+        self.is_started = True
+        if is_running:
+            self.logger.debug("WebSocket task is already running.")
+            return
+
+        self._task = self._run_coroutine(self._run())
+
+    def reconnect(self):
+        self.logger.debug("Reconnect WebSocket")
+        if self._task and not self._task.done():
+            # (_run() connects again with current url after connection is closed)
+            self.is_started = True
+            if self._ws:
+                self._run_coroutine(self._ws.close())
+        else:
+            self.connect()
+
+    def close(self):
+        if not self.is_started:
+            # Nothing to close
+            return
+
+        self.logger.debug("Close WebSocket")
+        self.is_started = False
+        if self._ws:
+            self._run_coroutine(self._ws.close())
+
+        # (Skip WSClient.close() which closes WebSocketApp)
+        super(WSClient, self).close()
+
+    async def _run(self):
+        try:
+            while self.is_started:
+                await self._run_connection()
+
+                if self.is_started and not self.is_auto_reconnect:
+                    self.is_started = False
+                if self.is_started:
+                    delay_sec = self._get_reconnect_delay()
+                    self.logger.info("Reconnect in %.1f sec (try: %s)", delay_sec, self._reconnect_tries + 1)
+                    await asyncio.sleep(delay_sec)
+                    self._reconnect_tries += 1
+        finally:
+            # (Iterating ends even if the task is cancelled)
+            self._put_item(None)
+
+    async def _run_connection(self):
+        heartbeat_task = None
+        try:
+            headers = [tuple(header.split(": ", 1)) for header in self.headers]
+            async with websockets.connect(self._get_connection_url(), extra_headers=headers, max_size=None) as ws:
+                self._ws = ws
+                self._on_open()
+                if self.heartbeat_message:
+                    heartbeat_task = self.loop.create_task(self._send_heartbeats(ws))
+
+                async for message in ws:
+                    self._on_message(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            # (Any error, as open timeout, or errors of parsing and callbacks, leads to reconnecting)
+            self._on_error(error)
+        finally:
+            self._ws = None
+            if heartbeat_task:
+                heartbeat_task.cancel()
+
+        self.logger.info("On WebSocket close")
+        if self.on_disconnect:
+            self.on_disconnect()
+
+    async def _send_heartbeats(self, ws):
+        while ws.open:
+            await ws.send(self.heartbeat_message)
+            await asyncio.sleep(self.heartbeat_interval_sec)
+
+    def _on_close(self):
+        # (Reconnection is made in _run())
+        pass
+
+    def _send(self, data):
+        if not data or not self._ws:
+            return
+
+        message = json.dumps(data)
+        self.logger.debug("Send message: %s", message)
+        self._run_coroutine(self._ws.send(message))
+
+    # Processing
+
+    def on_item_received(self, item):
+        super().on_item_received(item)
+
+        if isinstance(item, DataObject):
+            self._put_item(item)
+
+    def _put_item(self, item):
+        if not self.items_queue:
+            return
+
+        if self._is_in_loop_thread():
+            self.items_queue.put_nowait(item)
+        else:
+            # (From ParserPool thread, for example)
+            self.loop.call_soon_threadsafe(self.items_queue.put_nowait, item)
+
+    # Utility
+
+    def _run_coroutine(self, coro):
+        if self._is_in_loop_thread():
+            return self.loop.create_task(coro)
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def _is_in_loop_thread(self):
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+
+class BinanceAsyncWSClient(AsyncWSClientMixin, BinanceWSClient):
+    pass
+
+
+class BitfinexAsyncWSClient(AsyncWSClientMixin, BitfinexWSClient):
+    pass
+
+
+class BitMEXAsyncWSClient(AsyncWSClientMixin, BitMEXWSClient):
+    pass
+
+
+class OkexAsyncWSClient(AsyncWSClientMixin, OkexWSClient):
+    pass
+
+
+_async_ws_client_class_by_platform_id = {
+    Platform.BINANCE: BinanceAsyncWSClient,
+    Platform.BITFINEX: BitfinexAsyncWSClient,
+    Platform.BITMEX: BitMEXAsyncWSClient,
+    Platform.OKEX: OkexAsyncWSClient,
+}
+
+
+def create_async_ws_client(platform_id, is_private=False, version=None, loop=None):
+    # (Import here as clients.utils needs Django settings)
+    from hyperquant.clients.utils import get_credentials_for
+
+    client_class = _async_ws_client_class_by_platform_id.get(platform_id)
+    api_key, api_secret = get_credentials_for(platform_id) if is_private else (None, None)
+    return client_class(api_key, api_secret, version, loop=loop)
+
+
+async def iterate_items(*clients):
+    # Iterate items of all clients in order of receiving (until all clients closed)
+    queue = asyncio.Queue()
+    for client in clients:
+        client.items_queue = queue
+
+    closed_count = 0
+    while closed_count < len(clients):
+        item = await queue.get()
+        if item is None:
+            closed_count += 1
+            continue
+        yield item
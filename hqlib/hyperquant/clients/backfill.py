@@ -0,0 +1,200 @@
+import logging
+import time
+from threading import Thread, RLock
+
+from hyperquant.api import Platform
+from hyperquant.clients import Trade, Error
+
+"""
+Restoring trades missed while WebSocket connection was lost.
+
+    backfiller = TradeBackfiller(ws_client, rest_client)
+    # (Instead of ws_client.on_data_item)
+    backfiller.on_data_item = lambda item: print(item)
+    ws_client.subscribe([Endpoint.TRADE], ["ETHBTC", "BNBBTC"])
+
+On disconnect, the last trade received by ws_client for each symbol is
+remembered, and live trades of these symbols are buffered after reconnecting.
+Missed trades are fetched by REST client starting from the remembered ones
+until the first buffered live trade is reached. Then fetched trades and
+buffered ones are sent to on_data_item in order and without duplicates, and
+the symbol is switched back to live data.
+"""
+
+
+class _Gap:
+    # (Marks disconnection in a buffer of live items)
+
+    def __init__(self, last_trade) -> None:
+        super().__init__()
+        self.last_trade = last_trade
+
+
+class TradeBackfiller:
+    _log_prefix = "TradeBackfiller"
+
+    # Settings:
+    # (Items per request; None means max for platform)
+    limit = None
+    # (To not fetch forever if platform gives no trades after last one)
+    max_pages = 10
+    # (Wait for the first live trade to know where backfilling should stop)
+    max_wait_for_live_sec = 10
+
+    on_data_item = None
+
+    # State:
+    # {symbol: [_Gap or item, ...]} for symbols which are being backfilled
+    _buffer_by_symbol = None
+    _thread = None
+
+    def __init__(self, ws_client, rest_client, **kwargs) -> None:
+        super().__init__()
+        self.ws_client = ws_client
+        self.rest_client = rest_client
+
+        # Set up settings
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+        self._buffer_by_symbol = {}
+        self._lock = RLock()
+
+        # Wrap client's callbacks
+        self._prev_on_connect = ws_client.on_connect
+        self._prev_on_disconnect = ws_client.on_disconnect
+        ws_client.on_connect = self._on_connect
+        ws_client.on_disconnect = self._on_disconnect
+        ws_client.on_data_item = self._on_live_item
+
+        # Create logger
+        platform_name = Platform.get_platform_name_by_id(ws_client.platform_id)
+        self.logger = logging.getLogger("%s.%s" % (self._log_prefix, platform_name))
+
+    @property
+    def is_backfilling(self):
+        return bool(self._buffer_by_symbol)
+
+    # Live data
+
+    def _on_disconnect(self):
+        with self._lock:
+            # (Start buffering all symbols traded before)
+            for symbol, last_trade in self.ws_client.last_trade_by_symbol.items():
+                self._buffer_by_symbol.setdefault(symbol, []).append(_Gap(last_trade))
+
+        if self._prev_on_disconnect:
+            self._prev_on_disconnect()
+
+    def _on_connect(self):
+        with self._lock:
+            if self._buffer_by_symbol and not self._thread:
+                self._thread = Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+
+        if self._prev_on_connect:
+            self._prev_on_connect()
+
+    def _on_live_item(self, item):
+        with self._lock:
+            buffer = self._buffer_by_symbol.get(getattr(item, "symbol", None))
+            if buffer is not None:
+                buffer.append(item)
+                return
+            self._send_item(item)
+
+    def _send_item(self, item):
+        if self.on_data_item:
+            self.on_data_item(item)
+
+    # Backfilling
+
+    def _run(self):
+        while True:
+            with self._lock:
+                symbols = list(self._buffer_by_symbol)
+                if not symbols:
+                    # (Under lock to not miss symbols added in _on_disconnect())
+                    self._thread = None
+                    return
+
+            for symbol in symbols:
+                self._backfill_symbol(symbol)
+
+    def _backfill_symbol(self, symbol):
+        # Restore gaps from the first one until buffer is flushed
+        while True:
+            with self._lock:
+                gap = self._buffer_by_symbol[symbol][0]
+            live_items = self._wait_for_live_items(symbol)
+            history = self._fetch_missed_trades(symbol, gap.last_trade, live_items)
+
+            with self._lock:
+                buffer = self._buffer_by_symbol[symbol]
+                # Send fetched and live items up to the next gap
+                del buffer[0]
+                item_ids = set()
+                for item in history:
+                    item_ids.add(item.item_id)
+                    self._send_item(item)
+                while buffer and not isinstance(buffer[0], _Gap):
+                    item = buffer.pop(0)
+                    if getattr(item, "item_id", None) not in item_ids:
+                        self._send_item(item)
+
+                if not buffer:
+                    # (Switch to live data)
+                    del self._buffer_by_symbol[symbol]
+                    return
+
+    def _wait_for_live_items(self, symbol):
+        # Live items after the first gap
+        start_time = time.time()
+        while True:
+            with self._lock:
+                buffer = self._buffer_by_symbol[symbol]
+                live_items = []
+                for item in buffer[1:]:
+                    if isinstance(item, _Gap):
+                        break
+                    live_items.append(item)
+            if live_items or time.time() - start_time > self.max_wait_for_live_sec:
+                return live_items
+            time.sleep(0.1)
+
+    def _fetch_missed_trades(self, symbol, last_trade, live_items):
+        # Trades after last_trade and before the first of live_items
+        live_item_ids = {item.item_id for item in live_items if isinstance(item, Trade)}
+        from_item = last_trade
+        result = []
+        for _ in range(self.max_pages):
+            trades = self.rest_client.fetch_trades_history(
+                symbol, self.limit, from_item=from_item, is_use_max_limit=not self.limit)
+            if isinstance(trades, Error) or not isinstance(trades, list):
+                self.logger.error("Can't fetch missed trades for symbol: %s after: %s. Error: %s",
+                                  symbol, from_item, trades)
+                break
+            if len(trades) > 1 and trades[0].timestamp > trades[-1].timestamp:
+                trades.reverse()
+
+            new_count = 0
+            for trade in trades:
+                if trade.item_id in live_item_ids:
+                    # Caught up with live data
+                    self.logger.info("Restored %s trades for symbol: %s", len(result), symbol)
+                    return result
+                if trade.item_id == from_item.item_id or \
+                        (result and trade.item_id == result[-1].item_id):
+                    # (from_item can be included)
+                    continue
+                trade.symbol = trade.symbol or symbol
+                result.append(trade)
+                new_count += 1
+
+            if not new_count:
+                break
+            from_item = result[-1]
+
+        self.logger.info("Restored %s trades for symbol: %s (live data not reached)", len(result), symbol)
+        return result
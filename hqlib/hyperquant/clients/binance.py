@@ -1,8 +1,8 @@
-import hashlib
-import hmac
+import itertools
 from operator import itemgetter
 
-from hyperquant.api import Platform, Sorting, Interval, Direction, OrderType
+from hyperquant.api import Platform, Sorting, Interval, Direction, OrderType, DEFAULT_PRECISION, \
+    get_precision_by_step
 from hyperquant.clients import WSClient, Endpoint, Trade, Error, ErrorCode, \
     ParamName, WSConverter, RESTConverter, PrivatePlatformRESTClient, MyTrade, Candle, Ticker, OrderBookItem, Order, \
     OrderBook, Account, Balance
@@ -23,6 +23,7 @@ class BinanceRESTConverterV1(RESTConverter):
         Endpoint.PING: "ping",
         Endpoint.SERVER_TIME: "time",
         Endpoint.SYMBOLS: "exchangeInfo",
+        Endpoint.PRECISIONS: "exchangeInfo",
         Endpoint.TRADE: "trades",
         Endpoint.TRADE_HISTORY: "historicalTrades",
         Endpoint.TRADE_MY: "myTrades",  # Private
@@ -43,6 +44,7 @@ class BinanceRESTConverterV1(RESTConverter):
         ParamName.INTERVAL: "interval",
         ParamName.DIRECTION: "side",
         ParamName.ORDER_TYPE: "type",
+        ParamName.ORDER_ID: "orderId",
 
         ParamName.TIMESTAMP: "timestamp",
         ParamName.FROM_ITEM: "fromId",
@@ -95,6 +97,11 @@ class BinanceRESTConverterV1(RESTConverter):
         Endpoint.ORDER_BOOK: 1000,
         Endpoint.CANDLE: 1000,
     }
+    # (/api/v3/ticker/price: 1 with symbol, 2 without)
+    request_weight_by_endpoint = {
+        Endpoint.TICKER: 1,
+        Endpoint.TICKER_ALL: 2,
+    }
 
     # For parsing
 
@@ -185,13 +192,14 @@ class BinanceRESTConverterV1(RESTConverter):
 
     # For converting time
     is_source_in_milliseconds = True
-
-    # timestamp_platform_names = [ParamName.TIMESTAMP]
+    timestamp_platform_names = ["startTime", "endTime"]
 
     def _process_param_value(self, name, value):
         if name == ParamName.FROM_ITEM or name == ParamName.TO_ITEM:
             if isinstance(value, Trade):  # ItemObject):
                 return value.item_id
+        if name == ParamName.ORDER_ID and isinstance(value, Order):
+            return value.item_id
         return super()._process_param_value(name, value)
 
     def parse(self, endpoint, data):
@@ -204,6 +212,19 @@ class BinanceRESTConverterV1(RESTConverter):
             # symbols = [item[ParamName.SYMBOL] for item in exchange_info if item["status"] == "TRADING"]
             symbols = [item[ParamName.SYMBOL] for item in exchange_info]
             return symbols
+        if endpoint == Endpoint.PRECISIONS and data and ParamName.SYMBOLS in data:
+            # (By tick size of price and step size of amount)
+            result = {}
+            for item in data[ParamName.SYMBOLS]:
+                step_by_filter_type = {f["filterType"]: f.get("tickSize") or f.get("stepSize")
+                                       for f in item.get("filters", [])}
+                price_precision = get_precision_by_step(step_by_filter_type.get("PRICE_FILTER"))
+                amount_precision = get_precision_by_step(step_by_filter_type.get("LOT_SIZE"))
+                result[item[ParamName.SYMBOL]] = (
+                    price_precision if price_precision is not None else item.get("quotePrecision", DEFAULT_PRECISION),
+                    amount_precision if amount_precision is not None else
+                    item.get("baseAssetPrecision", DEFAULT_PRECISION))
+            return result
 
         result = super().parse(endpoint, data)
         return result
@@ -214,33 +235,18 @@ class BinanceRESTConverterV1(RESTConverter):
     #
     #     return super().preprocess_params(endpoint, params)
 
-    def _generate_and_add_signature(self, platform_params, api_key, api_secret):
-        if not api_key or not api_secret:
+    def _generate_and_add_signature(self, platform_params, api_key, signer):
+        if not api_key or not signer:
             self.logger.error("Empty api_key or api_secret. Cannot generate signature.")
             return None
-        ordered_params_list = self._order_params(platform_params)
-        # print("ordered_platform_params:", ordered_params_list)
-        query_string = "&".join(["{}={}".format(d[0], d[1]) for d in ordered_params_list])
-        # print("query_string:", query_string)
-        m = hmac.new(api_secret.encode("utf-8"), query_string.encode("utf-8"), hashlib.sha256)
-        signature = m.hexdigest()
-        # Add
-        # platform_params["signature"] = signature  # no need
-        # if ordered_params_list and ordered_params_list[-1][0] != "signature":
+        # (Sorted list of params with signature as last element)
+        ordered_params_list = sorted([item for item in platform_params.items() if item[0] != "signature"],
+                                     key=itemgetter(0))
+        query_string = "&".join(["%s=%s" % item for item in ordered_params_list])
+        signature = signer.sign(query_string)
         ordered_params_list.append(("signature", signature))
         return ordered_params_list
 
-    def _order_params(self, platform_params):
-        # Convert params to sorted list with signature as last element.
-
-        params_list = [(key, value) for key, value in platform_params.items() if key != "signature"]
-        # Sort parameters by key
-        params_list.sort(key=itemgetter(0))
-        # Append signature to the end if present
-        if "signature" in platform_params:
-            params_list.append(("signature", platform_params["signature"]))
-        return params_list
-
 
 class BinanceRESTClient(PrivatePlatformRESTClient):
     # Settings:
@@ -294,13 +300,17 @@ class BinanceRESTClient(PrivatePlatformRESTClient):
 
     def fetch_tickers(self, symbols=None, version=None, **kwargs):
         items = super().fetch_tickers(symbols, version or "3", **kwargs)
+        if not isinstance(items, list):
+            return items
 
         # (Binance returns timestamp only for /api/v1/ticker/24hr which has weight of 40.
-        # /api/v3/ticker/price - has weight 2.)
-        timestamp = self.get_server_timestamp(version)
+        # /api/v3/ticker/price - has weight 2. Estimated to not make one more request.
+        # Tickers from WebSocket have their own timestamps.)
+        timestamp = self.estimate_server_timestamp()
         for item in items:
-            item.timestamp = timestamp
-            item.use_milliseconds = self.use_milliseconds
+            if item.timestamp is None:
+                item.timestamp = timestamp
+                item.is_milliseconds = self.use_milliseconds
 
         return items
 
@@ -341,7 +351,10 @@ class BinanceWSConverterV1(WSConverter):
     # Main params:
     base_url = "wss://stream.binance.com:9443/"
 
-    IS_SUBSCRIPTION_COMMAND_SUPPORTED = False
+    # (Initial subscriptions are made in URL, further ones - by SUBSCRIBE/UNSUBSCRIBE commands)
+    IS_SUBSCRIPTION_COMMAND_SUPPORTED = True
+    # (Limited by URL length as initial streams are in URL)
+    MAX_SUBSCRIPTIONS_PER_CONNECTION = 200
 
     # supported_endpoints = [Endpoint.TRADE]
     # symbol_endpoints = [Endpoint.TRADE]
@@ -452,6 +465,17 @@ class BinanceWSClient(WSClient):
         "1": BinanceWSConverterV1,
     }
 
+    # Settings:
+    # (Binance closes connections after 24 hours)
+    rotation_interval_sec = 23 * 60 * 60
+
+    # State:
+    # (Subscriptions made in URL of current connection)
+    _url_subscriptions = None
+    # {request_id: (method, subscriptions)} for commands which are not acknowledged yet
+    _command_by_request_id = None
+    _request_id_counter = None
+
     @property
     def url(self):
         # Generate subscriptions
@@ -469,6 +493,13 @@ class BinanceWSClient(WSClient):
         self.is_subscribed_with_url = True
         return super().url + subscriptions
 
+    def __init__(self, api_key=None, api_secret=None, version=None, **kwargs) -> None:
+        super().__init__(api_key, api_secret, version, **kwargs)
+
+        self._url_subscriptions = set()
+        self._command_by_request_id = {}
+        self._request_id_counter = itertools.count(1)
+
     def subscribe(self, endpoints=None, symbols=None, **params):
         self._check_params(endpoints, symbols, **params)
 
@@ -479,6 +510,84 @@ class BinanceWSClient(WSClient):
 
         super().unsubscribe(endpoints, symbols, **params)
 
+    def _send_subscribe(self, subscriptions):
+        # (Skip already subscribed)
+        subscriptions = set(subscriptions).difference(self.pending_subscriptions, self.successful_subscriptions)
+        if not subscriptions or not self.is_connected:
+            # (Not connected yet subscriptions will be sent in _on_open())
+            return
+
+        self.pending_subscriptions.update(subscriptions)
+        self.failed_subscriptions.difference_update(subscriptions)
+        self._send_command("SUBSCRIBE", subscriptions)
+
+    def _send_unsubscribe(self, subscriptions):
+        # (Already removed from current_subscriptions, so won't be in URL on reconnect)
+        if not subscriptions or not self.is_connected:
+            return
+
+        self._send_command("UNSUBSCRIBE", subscriptions)
+
+    def _send_command(self, method, subscriptions):
+        request_id = next(self._request_id_counter)
+        self._command_by_request_id[request_id] = (method, subscriptions)
+        self._send({"method": method, "params": sorted(subscriptions), "id": request_id})
+
+    def _get_connection_url(self):
+        url = super()._get_connection_url()
+        # (Subscriptions made by connecting with this URL)
+        self._url_subscriptions = set(self.current_subscriptions)
+        return url
+
+    def _on_open(self):
+        # Subscriptions in URL are made by connecting
+        self._command_by_request_id.clear()
+        self.successful_subscriptions = self.current_subscriptions.intersection(self._url_subscriptions)
+        self.pending_subscriptions = set()
+
+        super()._on_open()
+
+        # Subscribe to those added while connecting
+        self._send_subscribe(self.current_subscriptions.difference(self._url_subscriptions))
+
+    def _on_message(self, message):
+        # (Command responses change state of this client, so they are not sent to parser_pool)
+        if self.parser_pool and isinstance(message, str) and '"id"' in message and \
+                ('"result"' in message or '"code"' in message):
+            data = self._decode_message(message)
+            if self._is_command_response(data):
+                self._on_command_response(data)
+                return
+        super()._on_message(message)
+
+    def _parse(self, endpoint, data):
+        if self._is_command_response(data):
+            self._on_command_response(data)
+            return None
+        return super()._parse(endpoint, data)
+
+    def _is_command_response(self, data):
+        # Command response: {"result": null, "id": 1} or {"code": 2, "msg": "...", "id": 1}
+        return isinstance(data, dict) and "id" in data and ("result" in data or "code" in data)
+
+    def _on_command_response(self, data):
+        method, subscriptions = self._command_by_request_id.pop(data["id"], (None, None))
+        if not method:
+            self.logger.warning("Response for unknown request: %s", data)
+            return
+
+        if method == "SUBSCRIBE":
+            # (Subscriptions could be unsubscribed while waiting)
+            subscriptions = subscriptions.intersection(self.pending_subscriptions)
+            self.pending_subscriptions.difference_update(subscriptions)
+            if "code" in data:
+                self.logger.error("Failed to subscribe to: %s. Error: %s", subscriptions, data)
+                self.failed_subscriptions.update(subscriptions)
+            else:
+                self.successful_subscriptions.update(subscriptions)
+        elif "code" in data:
+            self.logger.error("Failed to unsubscribe from: %s. Error: %s", subscriptions, data)
+
     def _check_params(self, endpoints=None, symbols=None, **params):
         LEVELS_AVAILABLE = [5, 10, 20]
         if endpoints and Endpoint.ORDER_BOOK in endpoints and ParamName.LEVEL in params and \
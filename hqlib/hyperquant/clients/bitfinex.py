@@ -1,5 +1,4 @@
 import hashlib
-import hmac
 import time
 
 from hyperquant.api import Platform, Sorting, Direction
@@ -105,6 +104,7 @@ class BitfinexRESTConverterV2(RESTConverter):
     # Main params:
     base_url = "https://api.bitfinex.com/v{version}/"
     IS_SORTING_ENABLED = True
+    IS_HISTORY_BY_TIME_SUPPORTED = True
 
     # Settings:
 
@@ -252,6 +252,8 @@ class BitfinexWSConverterV2(WSConverter):
     base_url = "wss://api.bitfinex.com/ws/{version}/"
 
     IS_SUBSCRIPTION_COMMAND_SUPPORTED = True
+    # (Items are bound to symbols by channel_by_id filled from "subscribed" events)
+    IS_PARSING_STATELESS = False
 
     # supported_endpoints = [Endpoint.TRADE]
     # symbol_endpoints = [Endpoint.TRADE]
@@ -372,6 +374,7 @@ class BitfinexWSConverterV2(WSConverter):
                 for item in result:
                     if hasattr(item, ParamName.SYMBOL):
                         item.symbol = channel.symbol
+                self.convert_to_canonical_symbols(result)
                 return result
 
         return super().parse(endpoint, data)
@@ -459,6 +462,7 @@ class BitfinexWSClient(WSClient):
     # Settings:
     platform_id = Platform.BITFINEX
     version = "2"  # Default version
+    signer_digestmod = hashlib.sha384
 
     _converter_class_by_version = {
         "1": BitfinexWSConverterV1,
@@ -669,8 +673,7 @@ class BitfinexWSClient(WSClient):
         auth_nonce = str(int(time.time() * 10000000))
         # Generate signature
         auth_payload = "AUTH" + auth_nonce
-        auth_sig = hmac.new(self._api_secret.encode(), auth_payload.encode(),
-                            hashlib.sha384).hexdigest()
+        auth_sig = self._signer.sign(auth_payload)
 
         payload = {"event": "auth", "apiKey": self._api_key, "authSig": auth_sig,
                    "authPayload": auth_payload, "authNonce": auth_nonce}
@@ -1,5 +1,3 @@
-import hashlib
-import hmac
 import json
 import time
 import urllib
@@ -21,6 +19,7 @@ class BitMEXRESTConverterV1(RESTConverter):
     base_url = "https://www.bitmex.com/api/v{version}"
 
     IS_SORTING_ENABLED = True
+    IS_HISTORY_BY_TIME_SUPPORTED = True
 
     # Settings:
 
@@ -150,7 +149,7 @@ class BitMEXRESTClient(PrivatePlatformRESTClient):
                 self.logger.debug("Ratelimit info. remaining_requests: %s/%s delay: %s",
                                   remaining_requests, ratelimit, self.delay_before_next_request_sec)
             except Exception as error:
-                self.logger.exception("Error while defining delay_before_next_request_sec.", error)
+                self.logger.exception("Error while defining delay_before_next_request_sec: %s", error)
 
     def get_symbols(self, version=None):
         # BitMEX has no get_symbols method in API,
@@ -283,8 +282,8 @@ class BitMEXWSClient(WSClient):
             result += [
                 "api-expires: " + str(expire),
             ]
-            if self._api_key and self._api_secret:
-                signature = generate_signature(self._api_secret, "GET", "/realtime", expire, "")
+            if self._api_key and self._signer:
+                signature = generate_signature(self._signer, "GET", "/realtime", expire, "")
                 result += [
                     "api-signature: " + signature,
                     "api-key: " + self._api_key,
@@ -412,10 +411,11 @@ def generate_nonce():
     return int(round(time.time() + 3600))
 
 
-def generate_signature(secret, method, url, nonce, data):
+def generate_signature(signer, method, url, nonce, data):
     """
     Generates an API signature compatible with BitMEX..
     A signature is HMAC_SHA256(secret, method + path + nonce + data), hex encoded.
+    signer is Signer of the secret (kept by client, see BaseClient.set_credentials()).
     Verb must be uppercased, url is relative, nonce must be an increasing 64-bit integer
     and the data, if present, must be JSON without whitespace between keys.
 
@@ -435,5 +435,5 @@ def generate_signature(secret, method, url, nonce, data):
     # print "Computing HMAC: %s" % verb + path + str(nonce) + data
     message = (method + path + str(nonce) + data).encode('utf-8')
 
-    signature = hmac.new(secret.encode('utf-8'), message, digestmod=hashlib.sha256).hexdigest()
+    signature = signer.sign(message)
     return signature
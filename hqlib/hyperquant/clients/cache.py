@@ -0,0 +1,259 @@
+import hashlib
+import json
+import logging
+import os
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from threading import RLock
+
+"""
+Cache for history items which are not changed anymore: closed candles and
+past trades.
+
+    history_cache = HistoryCache(path="/var/cache/hyperquant")
+    client = BinanceRESTClient(history_cache=history_cache)
+    # (From exchange)
+    candles = client.fetch_candles("ETHBTC", Interval.MIN_1, from_time=from_time, to_time=to_time)
+    # (From cache, and only the last not closed candle is fetched from exchange)
+    candles = client.fetch_candles("ETHBTC", Interval.MIN_1, from_time=from_time)
+
+Items are stored by series: (platform_id, endpoint, symbol, interval). For
+each series the time ranges which were fetched completely are remembered,
+so only missing ranges have to be requested from a platform (see
+PlatformRESTClient._fetch_history_with_cache()).
+
+Items are kept encoded as JSON rows (see pool.encode_item()), so get_items()
+returns new objects each time and callers can change them. Series are kept
+in memory (LRU, evicted by size in bytes) and, if path is set, in JSON Lines
+files, so they survive restarts and evicted series can be loaded again. Each
+add() appends a line to the file, and the file is rewritten (compacted) only
+when it has doubled since the last compaction.
+"""
+
+
+def get_item_key(item):
+    # (Candles have no item_id)
+    return item.timestamp, str(item.item_id) if item.item_id is not None else ""
+
+
+class _Series:
+    # Items of one series sorted by timestamp and time ranges covered by them
+
+    def __init__(self) -> None:
+        super().__init__()
+        # [(from_time, to_time), ...] sorted and not overlapping (including)
+        self.ranges = []
+        self.keys = []
+        # (Encoded items in order of keys)
+        self.rows = []
+        self.is_milliseconds = False
+        # (Bytes of records added since creating or compacting, and of the last compacted record)
+        self.size_bytes = 0
+        self.compacted_size_bytes = 0
+        self.record_count = 0
+
+    def get_missing_ranges(self, from_time, to_time):
+        result = []
+        start = from_time
+        is_start_covered = False
+        for range_from, range_to in self.ranges:
+            if range_to < start:
+                continue
+            if range_from > to_time:
+                break
+            if range_from > start:
+                result.append((start, range_from))
+            start = range_to
+            is_start_covered = True
+        if start < to_time or (start == to_time and not is_start_covered):
+            result.append((start, to_time))
+        return result
+
+    def get_items(self, from_time, to_time):
+        # (Import here as clients.pool imports clients, which imports this module)
+        from hyperquant.clients.pool import decode_item
+
+        start = bisect_left(self.keys, (from_time,))
+        end = bisect_right(self.keys, (to_time, chr(0x10ffff)))
+        return [decode_item(class_name, values, self.is_milliseconds)
+                for class_name, values in self.rows[start:end]]
+
+    def add(self, from_time, to_time, items, is_complete=True):
+        # -> record (JSON line) of the change to append to file
+        from hyperquant.clients.pool import encode_item
+
+        rows = [encode_item(item) for item in items]
+        if items:
+            self.is_milliseconds = items[0].is_milliseconds
+            self._merge([get_item_key(item) for item in items], rows)
+        if is_complete:
+            self._add_range(from_time, to_time)
+
+        record = json.dumps({"ranges": [[from_time, to_time]] if is_complete else [],
+                             "is_milliseconds": self.is_milliseconds, "items": rows})
+        self.size_bytes += len(record) + 1
+        self.record_count += 1
+        return record
+
+    def add_record(self, record):
+        # Apply a line of file
+        from hyperquant.clients.pool import decode_item
+
+        data = json.loads(record)
+        is_milliseconds = data["is_milliseconds"]
+        items = [decode_item(class_name, values, is_milliseconds) for class_name, values in data["items"]]
+        if items:
+            self.is_milliseconds = is_milliseconds
+            self._merge([get_item_key(item) for item in items], data["items"])
+        for from_time, to_time in data["ranges"]:
+            self._add_range(from_time, to_time)
+        self.size_bytes += len(record) + 1
+        self.record_count += 1
+
+    def compact(self):
+        # -> one record with all items and ranges
+        record = json.dumps({"ranges": self.ranges, "is_milliseconds": self.is_milliseconds, "items": self.rows})
+        self.size_bytes = self.compacted_size_bytes = len(record) + 1
+        self.record_count = 1
+        return record
+
+    def _merge(self, keys, rows):
+        pairs = sorted(zip(keys, rows), key=lambda pair: pair[0])
+        if not self.keys or pairs[0][0] > self.keys[-1]:
+            # (Usually items are added after the last one)
+            self.keys.extend(key for key, row in pairs)
+            self.rows.extend(row for key, row in pairs)
+            return
+
+        for key, row in pairs:
+            index = bisect_left(self.keys, key)
+            if index < len(self.keys) and self.keys[index] == key:
+                self.rows[index] = row
+            else:
+                self.keys.insert(index, key)
+                self.rows.insert(index, row)
+
+    def _add_range(self, from_time, to_time):
+        # Merge with overlapping ranges
+        ranges = []
+        for range_from, range_to in self.ranges:
+            if range_to < from_time or range_from > to_time:
+                ranges.append((range_from, range_to))
+            else:
+                from_time, to_time = min(from_time, range_from), max(to_time, range_to)
+        ranges.append((from_time, to_time))
+        self.ranges = sorted(ranges)
+
+
+class HistoryCache:
+    """
+    Thread-safe, can be shared by several clients.
+    """
+    _log_prefix = "HistoryCache"
+
+    # Settings:
+    max_size_bytes = 100 * 1024 * 1024
+    # (Directory for files of series; None - memory only)
+    path = None
+
+    # State:
+    size_bytes = 0
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__()
+
+        # Set up settings
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+        self._series_by_key = OrderedDict()
+        self._size_by_key = {}
+        self._lock = RLock()
+        if self.path:
+            os.makedirs(self.path, exist_ok=True)
+
+        self.logger = logging.getLogger(self._log_prefix)
+
+    def get_missing_ranges(self, key, from_time, to_time):
+        # Ranges in [from_time, to_time] which must be fetched from a platform
+        with self._lock:
+            series = self._get(key)
+            return series.get_missing_ranges(from_time, to_time) if series else [(from_time, to_time)]
+
+    def get_items(self, key, from_time, to_time):
+        # (New item objects on each call)
+        with self._lock:
+            series = self._get(key)
+            return series.get_items(from_time, to_time) if series else []
+
+    def add(self, key, from_time, to_time, items, is_complete=True):
+        # (If not is_complete, items are saved, but the range will be fetched again)
+        with self._lock:
+            series = self._get(key) or _Series()
+            record = series.add(from_time, to_time, items, is_complete)
+            self._put_to_memory(key, series)
+
+            file_path = self._get_file_path(key)
+            if not file_path:
+                return
+            if series.record_count > 1 and series.size_bytes >= 2 * series.compacted_size_bytes:
+                # (Write and rename to not leave broken file)
+                record = series.compact()
+                self._put_to_memory(key, series)
+                tmp_file_path = file_path + ".tmp"
+                with open(tmp_file_path, "w") as file:
+                    file.write(record + "\n")
+                os.replace(tmp_file_path, file_path)
+            else:
+                with open(file_path, "a") as file:
+                    file.write(record + "\n")
+
+    def clear(self):
+        with self._lock:
+            self._series_by_key.clear()
+            self._size_by_key.clear()
+            self.size_bytes = 0
+            if self.path:
+                for name in os.listdir(self.path):
+                    if name.endswith(".jsonl"):
+                        os.remove(os.path.join(self.path, name))
+
+    def _get(self, key):
+        series = self._series_by_key.get(key)
+        if series:
+            self._series_by_key.move_to_end(key)
+            return series
+
+        # Load from disk
+        file_path = self._get_file_path(key)
+        if not file_path or not os.path.exists(file_path):
+            return None
+        series = _Series()
+        try:
+            with open(file_path) as file:
+                for line in file:
+                    series.add_record(line.rstrip("\n"))
+        except Exception as exception:
+            self.logger.error("Can't load series: %s from: %s. Error: %s", key, file_path, exception)
+            return None
+        # (Compact when the file doubles since loading)
+        series.compacted_size_bytes = series.size_bytes
+        self._put_to_memory(key, series)
+        return series
+
+    def _put_to_memory(self, key, series):
+        # (Size of series is counted by bytes of its records)
+        self.size_bytes += series.size_bytes - self._size_by_key.get(key, 0)
+        self._series_by_key[key] = series
+        self._series_by_key.move_to_end(key)
+        self._size_by_key[key] = series.size_bytes
+
+        # Evict least recently used (but not the one just put)
+        while self.size_bytes > self.max_size_bytes and len(self._series_by_key) > 1:
+            evicted_key, _ = self._series_by_key.popitem(last=False)
+            self.size_bytes -= self._size_by_key.pop(evicted_key)
+
+    def _get_file_path(self, key):
+        if not self.path:
+            return None
+        return os.path.join(self.path, hashlib.sha1(repr(key).encode()).hexdigest() + ".jsonl")
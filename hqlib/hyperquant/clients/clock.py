@@ -0,0 +1,140 @@
+import logging
+import time
+from threading import Thread, Event, RLock, current_thread
+
+from hyperquant.api import Platform
+from hyperquant.clients import Error
+
+"""
+Keeping offset between local and platform's time up to date in background,
+so signing private requests doesn't wait for an extra request to the server.
+
+    client = BinanceRESTClient(api_key, api_secret)
+    clock = ServerClock(client, sync_interval_sec=60)
+    clock.start()
+    # (Uses the clock after the first sync)
+    client.fetch_account_info()
+    ...
+    clock.close()
+
+Each sync requests server time several times and takes the sample with the
+smallest round-trip time (RTT). Server time is supposed to be taken at the
+middle of the round trip (as in NTP), so the error of offset is not greater
+than RTT / 2. Offsets of syncs are smoothed by exponential moving average
+to not jump because of network jitter.
+"""
+
+
+class ServerClock:
+    _log_prefix = "ServerClock"
+
+    # Settings:
+    sync_interval_sec = 60
+    # (Requests per sync)
+    sample_count = 3
+    # (Weight of a new offset in the average: 1 - no smoothing)
+    smoothing = 0.3
+    # (Samples with greater RTT are skipped as too inaccurate)
+    max_rtt_sec = 5
+
+    # State:
+    # (server_time - local_time)
+    offset_sec = None
+    rtt_sec = None
+    last_sync_time = None
+    sync_count = 0
+    _thread = None
+
+    @property
+    def is_synced(self):
+        return self.offset_sec is not None
+
+    def __init__(self, client, **kwargs) -> None:
+        super().__init__()
+        self.client = client
+
+        # Set up settings
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+        self._stop_event = Event()
+        self._lock = RLock()
+        # (Make client use the clock)
+        client.server_clock = self
+
+        # Create logger
+        platform_name = Platform.get_platform_name_by_id(client.platform_id)
+        self.logger = logging.getLogger("%s.%s" % (self._log_prefix, platform_name))
+
+    def time(self):
+        # Current server time in seconds (local time if not synced yet)
+        return time.time() + (self.offset_sec or 0)
+
+    def start(self):
+        if self._thread:
+            return
+        self._stop_event.clear()
+        self._thread = Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def close(self):
+        if not self._thread:
+            return
+        self._stop_event.set()
+        if self._thread is not current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def sync(self):
+        # Update offset (returns False if failed)
+        best_offset_sec, best_rtt_sec = None, None
+        for _ in range(self.sample_count):
+            sample = self._measure()
+            if sample and (best_rtt_sec is None or sample[1] < best_rtt_sec):
+                best_offset_sec, best_rtt_sec = sample
+        if best_offset_sec is None:
+            return False
+
+        with self._lock:
+            if self.offset_sec is None:
+                self.offset_sec = best_offset_sec
+            else:
+                self.offset_sec += self.smoothing * (best_offset_sec - self.offset_sec)
+            self.rtt_sec = best_rtt_sec
+            self.last_sync_time = time.time()
+            self.sync_count += 1
+        self.logger.debug("Synced. Offset: %.4f sec (sample: %.4f sec) RTT: %.4f sec",
+                          self.offset_sec, best_offset_sec, best_rtt_sec)
+        return True
+
+    def _measure(self):
+        # -> (offset_sec, rtt_sec) or None
+        time_before = time.time()
+        result = self.client.get_server_timestamp(force_from_server=True)
+        time_after = time.time()
+        if isinstance(result, Error) or result is None:
+            self.logger.warning("Can't get server time. Error: %s", result)
+            return None
+        rtt_sec = time_after - time_before
+        if rtt_sec > self.max_rtt_sec:
+            self.logger.debug("Skip server time sample with RTT: %.4f sec", rtt_sec)
+            return None
+        server_time = result / 1000 if self.client.use_milliseconds else result
+        return server_time - (time_before + time_after) / 2, rtt_sec
+
+    def _run(self):
+        while True:
+            try:
+                self.sync()
+            except Exception as exception:
+                self.logger.exception("Error while syncing server time: %s", exception)
+            if self._stop_event.wait(self.sync_interval_sec):
+                return
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,279 @@
+import logging
+from collections import defaultdict
+from functools import partial
+from threading import RLock
+
+from hyperquant.api import Endpoint, Platform, ParamName
+from hyperquant.clients import Trade, Candle, Ticker, OrderBook
+from hyperquant.clients.utils import create_ws_client
+
+"""
+One set of WebSocket connections for all consumers of market data in a process.
+
+    hub = MarketDataHub()
+    subscription = hub.subscribe(Platform.BINANCE, [Endpoint.TRADE], ["ETHBTC"], on_trade)
+    hub.subscribe(Platform.BINANCE, [Endpoint.TRADE, Endpoint.TICKER], ["ETHBTC", "BNBBTC"], on_item)
+    hub.subscribe(Platform.BINANCE, [Endpoint.CANDLE], ["ETHBTC"], on_candle, interval=Interval.MIN_1)
+    ...
+    # (Platform is unsubscribed only when the last consumer unsubscribes)
+    hub.unsubscribe(subscription)
+    hub.close()
+
+One client is created for each platform by client_factory (create_ws_client()
+by default; return ShardedWSClient to spread subscriptions over connections).
+Subscriptions of consumers are reference-counted by (platform_id, endpoint,
+symbol, interval), and each parsed item is passed only to callbacks of its
+route, found by one dict lookup for each endpoint of the item's class.
+
+Symbols are routed in canonical form if the client has symbol_registry
+(so "ETH/BTC" and "ethbtc" are the same route, see SymbolRegistry.get_symbol()).
+Subscribing to symbol endpoints without symbols means all symbols: the client
+is subscribed to each of its converter's supported_symbols or symbols of its
+symbol_registry.
+"""
+
+
+class Subscription:
+    # Returned by MarketDataHub.subscribe() to unsubscribe later
+
+    def __init__(self, platform_id, route_keys, channel_keys, callback) -> None:
+        super().__init__()
+        self.platform_id = platform_id
+        # [(platform_id, endpoint, SYMBOL or None, interval or None), ...]
+        self.route_keys = route_keys
+        # (Same as route keys, but symbols are set for all-symbols routes)
+        self.channel_keys = channel_keys
+        self.callback = callback
+
+    def __repr__(self) -> str:
+        return "[Subscription-%s %s]" % (Platform.get_platform_name_by_id(self.platform_id),
+                                         [key[1:] for key in self.route_keys])
+
+
+class MarketDataHub:
+    """
+    Thread-safe. Callbacks are called in threads of clients.
+    """
+    _log_prefix = "MarketDataHub"
+
+    # Settings:
+    # (platform_id -> WSClient or ShardedWSClient)
+    client_factory = None
+    # (Endpoints to route items by; is_by_symbol=False - for items of all symbols)
+    # {item_class: [(endpoint, is_by_symbol), ...]}
+    endpoints_by_item_class = {
+        Trade: [(Endpoint.TRADE, True)],
+        Candle: [(Endpoint.CANDLE, True)],
+        Ticker: [(Endpoint.TICKER, True), (Endpoint.TICKER_ALL, False)],
+        OrderBook: [(Endpoint.ORDER_BOOK, True)],
+    }
+    # (Endpoints subscribed and routed by interval)
+    interval_endpoints = {Endpoint.CANDLE}
+
+    # State:
+    # (Items passed to at least one callback)
+    dispatched_count = 0
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__()
+
+        # Set up settings
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+        # {platform_id: client}
+        self._client_by_platform = {}
+        # {(platform_id, endpoint, SYMBOL or None, interval): (callback, ...)} (replaced on change, not modified)
+        self._callbacks_by_key = {}
+        # {(platform_id, endpoint, SYMBOL or None, interval): count}
+        self._count_by_key = defaultdict(int)
+        # (Subscriptions of clients: routes for all symbols are counted for each symbol)
+        # {(platform_id, endpoint, SYMBOL or None, interval): count}
+        self._count_by_channel_key = defaultdict(int)
+        # {(platform_id, endpoint, SYMBOL or None, interval): symbol as it was subscribed}
+        self._symbol_by_channel_key = {}
+        self._lock = RLock()
+
+        self.logger = logging.getLogger(self._log_prefix)
+
+    def get_client(self, platform_id):
+        return self._client_by_platform.get(platform_id)
+
+    def get_subscriber_count(self, platform_id, endpoint, symbol=None, interval=None):
+        symbol = self._get_route_symbol(self._client_by_platform.get(platform_id), symbol)
+        return self._count_by_key.get((platform_id, endpoint, symbol, interval), 0)
+
+    # Subscription
+
+    def subscribe(self, platform_id, endpoints, symbols=None, callback=None, interval=None):
+        # callback(item) is called for items of given endpoints and symbols only
+        # (interval - for candles)
+        if not interval and self.interval_endpoints.intersection(endpoints):
+            raise Exception("Interval must be set to subscribe to endpoints: %s" %
+                            self.interval_endpoints.intersection(endpoints))
+
+        with self._lock:
+            client = self._get_or_create_client(platform_id)
+            symbol_endpoints = client.converter.symbol_endpoints
+            # (Before counting, as it can raise)
+            all_symbols = self._get_all_symbols(client) \
+                if not symbols and symbol_endpoints and set(symbol_endpoints).intersection(endpoints) else None
+            route_keys = []
+            channel_keys = []
+            new_endpoints_by_symbol_and_interval = defaultdict(set)
+            for endpoint in endpoints:
+                key_interval = interval if endpoint in self.interval_endpoints else None
+                if endpoint not in symbol_endpoints:
+                    route_symbols = channel_symbols = [None]
+                elif symbols:
+                    route_symbols = channel_symbols = symbols
+                else:
+                    route_symbols, channel_symbols = [None], all_symbols
+
+                for symbol in route_symbols:
+                    key = (platform_id, endpoint, self._get_route_symbol(client, symbol), key_interval)
+                    route_keys.append(key)
+                    if callback:
+                        self._callbacks_by_key[key] = self._callbacks_by_key.get(key, ()) + (callback,)
+                    self._count_by_key[key] += 1
+
+                for symbol in channel_symbols:
+                    key = (platform_id, endpoint, self._get_route_symbol(client, symbol), key_interval)
+                    channel_keys.append(key)
+                    self._count_by_channel_key[key] += 1
+                    if self._count_by_channel_key[key] == 1:
+                        self._symbol_by_channel_key[key] = symbol
+                        new_endpoints_by_symbol_and_interval[(symbol, key_interval)].add(endpoint)
+
+            # (One call for symbols with same endpoints, as subscribing may cause reconnecting)
+            for (endpoints, interval), symbols in self._group_symbols_by_endpoints(
+                    new_endpoints_by_symbol_and_interval).items():
+                client.subscribe(endpoints, symbols, **self._get_params(interval))
+            return Subscription(platform_id, route_keys, channel_keys, callback)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            platform_id = subscription.platform_id
+            client = self._client_by_platform.get(platform_id)
+            for key in subscription.route_keys:
+                if self._count_by_key.get(key, 0) <= 0:
+                    continue
+                if subscription.callback:
+                    callbacks = list(self._callbacks_by_key.get(key, ()))
+                    if subscription.callback in callbacks:
+                        callbacks.remove(subscription.callback)
+                    if callbacks:
+                        self._callbacks_by_key[key] = tuple(callbacks)
+                    else:
+                        self._callbacks_by_key.pop(key, None)
+                self._count_by_key[key] -= 1
+                if self._count_by_key[key] <= 0:
+                    del self._count_by_key[key]
+
+            removed_endpoints_by_symbol_and_interval = defaultdict(set)
+            for key in subscription.channel_keys:
+                if self._count_by_channel_key.get(key, 0) <= 0:
+                    continue
+                self._count_by_channel_key[key] -= 1
+                if self._count_by_channel_key[key] <= 0:
+                    del self._count_by_channel_key[key]
+                    symbol = self._symbol_by_channel_key.pop(key)
+                    removed_endpoints_by_symbol_and_interval[(symbol, key[3])].add(key[1])
+            subscription.route_keys = []
+            subscription.channel_keys = []
+
+            if not client:
+                return
+            for (endpoints, interval), symbols in self._group_symbols_by_endpoints(
+                    removed_endpoints_by_symbol_and_interval).items():
+                client.unsubscribe(endpoints, symbols, **self._get_params(interval))
+            if not any(key[0] == platform_id for key in self._count_by_key):
+                # (No consumers left)
+                client.close()
+                del self._client_by_platform[platform_id]
+
+    def close(self):
+        with self._lock:
+            for client in self._client_by_platform.values():
+                client.close()
+            self._client_by_platform.clear()
+            self._callbacks_by_key.clear()
+            self._count_by_key.clear()
+            self._count_by_channel_key.clear()
+            self._symbol_by_channel_key.clear()
+
+    # Clients
+
+    def _get_or_create_client(self, platform_id):
+        client = self._client_by_platform.get(platform_id)
+        if client:
+            return client
+        client = self.client_factory(platform_id) if self.client_factory else create_ws_client(platform_id)
+        client.on_data_item = partial(self._dispatch, platform_id)
+        self._client_by_platform[platform_id] = client
+        return client
+
+    def _dispatch(self, platform_id, item):
+        # (Without lock: routing tables are replaced, not modified)
+        endpoints = self.endpoints_by_item_class.get(type(item))
+        if not endpoints:
+            return
+        symbol = self._get_route_symbol(self._client_by_platform.get(platform_id), item.symbol)
+        is_dispatched = False
+        for endpoint, is_by_symbol in endpoints:
+            interval = item.interval if endpoint in self.interval_endpoints else None
+            # (Subscribed without symbols - for all symbols)
+            for key_symbol in (symbol, None) if is_by_symbol and symbol else (None,):
+                callbacks = self._callbacks_by_key.get((platform_id, endpoint, key_symbol, interval))
+                if not callbacks:
+                    continue
+                is_dispatched = True
+                for callback in callbacks:
+                    try:
+                        callback(item)
+                    except Exception as exception:
+                        # (One consumer must not break others)
+                        self.logger.exception("Error in callback: %s for item: %s. Error: %s",
+                                              callback, item, exception)
+        if is_dispatched:
+            self.dispatched_count += 1
+
+    # Utility
+
+    def _get_route_symbol(self, client, symbol):
+        # "eth_btc", "ETH/BTC", ("ETH", "BTC") -> "ETH/BTC" with client's symbol_registry (without: "eth_btc" -> "ETH_BTC")
+        if not symbol:
+            return None
+        registry = getattr(client, "symbol_registry", None)
+        if registry:
+            symbol = registry.get_symbol(client.converter.platform_id, registry.get_platform_symbol(
+                client.converter.platform_id, symbol))
+        return symbol.upper() if isinstance(symbol, str) else symbol
+
+    def _get_all_symbols(self, client):
+        # (WSClient.subscribe() without symbols uses only symbols subscribed before, so all are set explicitly)
+        platform_id = client.converter.platform_id
+        registry = getattr(client, "symbol_registry", None)
+        symbols = client.converter.supported_symbols or (registry.get_symbols(platform_id) if registry else None)
+        if not symbols:
+            raise Exception("Symbols must be set for platform: %s as there are no supported symbols to subscribe "
+                            "for all symbols (load them to client's symbol_registry)" %
+                            Platform.get_platform_name_by_id(platform_id))
+        return list(symbols)
+
+    def _get_params(self, interval):
+        return {ParamName.INTERVAL: interval} if interval else {}
+
+    def _group_symbols_by_endpoints(self, endpoints_by_symbol_and_interval):
+        # {(symbol, interval): {endpoint, ...}} -> {(frozenset(endpoints), interval): [symbol, ...] or None}
+        symbols_by_endpoints = defaultdict(list)
+        for (symbol, interval), endpoints in endpoints_by_symbol_and_interval.items():
+            symbols_by_endpoints[(frozenset(endpoints), interval)].append(symbol)
+        return {endpoints_and_interval: [symbol for symbol in symbols if symbol] or None
+                for endpoints_and_interval, symbols in symbols_by_endpoints.items()}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,602 @@
+import json
+import logging
+import math
+import time
+import zlib
+from collections import deque
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from threading import Thread, Lock
+from urllib.parse import urlsplit, parse_qsl
+
+from dateutil import parser
+
+from hyperquant.api import Platform, Interval
+
+"""
+Local HTTP server which imitates REST API of platforms to test and load-test
+REST clients offline.
+
+    with MockExchangeServer(latency_sec=0.01, rate_limit=100) as server:
+        client = BinanceRESTClient()
+        server.set_up_client(client)
+        trades = client.fetch_trades_history("ETHBTC", from_item=0)
+
+Trades are generated: trade N of any symbol has item_id N and timestamp
+start_timestamp_ms + N * trade_interval_ms (up to trade_count trades).
+Recorded responses can be set with set_response() instead of generated ones.
+
+Paths are prefixed with platform name: /binance/api/v1/trades, /okex/api/v1/trades.do, ...
+Trades, candles, ticker and order book are served for all platforms in their
+formats, even if a client has no such endpoint in endpoint_lookup yet.
+Private endpoints (orders, account) are served only for Binance.
+
+WebSocket messages of platforms can be generated by make_*_message() (for
+ReplayServer, tests and benchmarks).
+"""
+
+
+# WebSocket messages
+
+def make_binance_trade_message(item_id, symbol="ETHBTC"):
+    return json.dumps({"stream": symbol.lower() + "@trade", "data": {
+        "e": "trade", "E": 1540000000123, "s": symbol, "t": item_id,
+        "p": "0.03140000", "q": "1.50000000", "T": 1540000000100 + item_id, "m": True}})
+
+
+def make_okex_trade_message(item_id, symbol="eth_btc"):
+    # (OKEx sends deflated bytes)
+    message = '[{"channel":"ok_sub_spot_%s_deals","data":[["%s","0.0314","1.5","10:00:00","bid"]]}]' % (
+        symbol, item_id)
+    compress = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    return compress.compress(message.encode()) + compress.flush()
+
+
+class MockExchangeServer:
+    # Settings:
+    host = "127.0.0.1"
+    port = 0  # (Any free port)
+    # (Delay before each response)
+    latency_sec = 0
+    # (Requests per rate_limit_period_sec, None - no limit; 429 with Retry-After for others)
+    rate_limit = None
+    rate_limit_period_sec = 1
+    # (IP ban (418) after such number of 429 responses in a row, as Binance does)
+    ban_after_rate_limit_count = None
+    ban_sec = 60
+
+    symbols = ["ETHBTC", "BNBBTC", "EOSETH", "XBTUSD"]
+    trade_count = 10000
+    start_timestamp_ms = 1540000000000
+    trade_interval_ms = 1000
+    # (Difference of server time with local one)
+    time_offset_sec = 0
+    # (Free amounts of account, {"BTC": "1.0", ...})
+    balances = None
+
+    # State:
+    request_count = 0
+    _thread = None
+    _server = None
+
+    @property
+    def url(self):
+        return "http://%s:%s/" % (self.host, self._server.server_address[1])
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__()
+
+        # Set up settings
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+        self.request_log = deque(maxlen=1000)
+        self._response_by_path = {}
+        self._injected_errors = deque()
+        self._window_start_time = 0
+        self._window_request_count = 0
+        self._rate_limit_in_row_count = 0
+        self._banned_until = 0
+        self._order_by_id = {}
+        self._closed_order_by_id = {}
+        self._last_order_id = 0
+        self._lock = Lock()
+        self.logger = logging.getLogger("MockExchangeServer")
+
+        self._handler_by_platform = {
+            "binance": self._handle_binance,
+            "bitfinex": self._handle_bitfinex,
+            "bitmex": self._handle_bitmex,
+            "okex": self._handle_okex,
+        }
+
+    def start(self):
+        if self._thread:
+            return
+        server = self
+
+        class RequestHandler(_RequestHandler):
+            mock_server = server
+
+        self._server = ThreadingHTTPServer((self.host, self.port), RequestHandler)
+        self._server.daemon_threads = True
+        self._thread = Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        self.logger.debug("Mock exchange server started on: %s", self.url)
+
+    def close(self):
+        if not self._thread:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread = None
+
+    def set_up_client(self, client):
+        # Direct all converters of REST client to this server
+        platform_name = Platform.get_platform_name_by_id(client.platform_id).lower()
+        for version in client._converter_class_by_version or [client.version]:
+            converter = client.get_or_create_converter(version)
+            path = urlsplit(converter.base_url).path
+            converter.base_url = self.url + platform_name + path
+
+    def get_base_url(self, platform_id):
+        return self.url + Platform.get_platform_name_by_id(platform_id).lower() + "/"
+
+    # Setting up responses
+
+    def set_response(self, path, data, status=200, headers=None):
+        # Recorded response for path (without host and params), for example: "/binance/api/v1/trades"
+        self._response_by_path[path] = (status, data, headers)
+
+    def inject_error(self, status=429, count=1, retry_after_sec=None, data=None):
+        # Next count requests will be responded with error
+        for _ in range(count):
+            headers = {"Retry-After": str(retry_after_sec)} if retry_after_sec is not None else None
+            self._injected_errors.append((status, data or {"code": status, "msg": "Injected error."}, headers))
+
+    def fill_order(self, order_id):
+        # Execute order created by client (it's not open anymore)
+        with self._lock:
+            order = self._order_by_id.pop(str(order_id))
+            order.update(status="FILLED", executedQty=order["origQty"])
+            self._closed_order_by_id[str(order_id)] = order
+
+    # Handling
+
+    def handle(self, method, path, params):
+        # -> (status, data, headers)
+        platform_name, _, resource = path.strip("/").partition("/")
+        with self._lock:
+            self.request_count += 1
+            self.request_log.append((method, path, params))
+            limit_status, retry_after_sec = self._check_rate_limit()
+            headers = self._get_rate_limit_headers()
+        if self.latency_sec:
+            time.sleep(self.latency_sec)
+        if limit_status:
+            return limit_status, self._make_rate_limit_error(platform_name, limit_status), \
+                {"Retry-After": str(retry_after_sec)}
+        if self._injected_errors:
+            try:
+                return self._injected_errors.popleft()
+            except IndexError:
+                pass
+
+        if path in self._response_by_path:
+            return self._response_by_path[path]
+
+        handler = self._handler_by_platform.get(platform_name)
+        status, data = handler(method, resource, params) if handler else (404, {"error": "Not found"})
+        return status, data, headers
+
+    def _check_rate_limit(self):
+        # -> (error_status, retry_after_sec)
+        now = time.time()
+        if self._banned_until > now:
+            return 418, math.ceil(self._banned_until - now)
+        if not self.rate_limit:
+            return None, None
+
+        if now - self._window_start_time >= self.rate_limit_period_sec:
+            self._window_start_time = now
+            self._window_request_count = 0
+        self._window_request_count += 1
+        if self._window_request_count <= self.rate_limit:
+            self._rate_limit_in_row_count = 0
+            return None, None
+
+        self._rate_limit_in_row_count += 1
+        if self.ban_after_rate_limit_count and self._rate_limit_in_row_count > self.ban_after_rate_limit_count:
+            self._banned_until = now + self.ban_sec
+            return self._check_rate_limit()
+        return 429, math.ceil(self._window_start_time + self.rate_limit_period_sec - now)
+
+    def _make_rate_limit_error(self, platform_name, status):
+        message = "IP banned." if status == 418 else "Too many requests."
+        if platform_name == "bitmex":
+            return {"error": {"message": message, "name": "RateLimitError"}}
+        if platform_name == "bitfinex":
+            return {"error": "ERR_RATE_LIMIT"}
+        return {"code": -1003, "msg": message}
+
+    def _get_rate_limit_headers(self):
+        # (As BitMEX sends)
+        if not self.rate_limit:
+            # (Unlimited)
+            return {"x-ratelimit-limit": "300", "x-ratelimit-remaining": "300",
+                    "x-ratelimit-reset": str(int(time.time()))}
+        return {
+            "x-ratelimit-limit": str(self.rate_limit),
+            "x-ratelimit-remaining": str(max(0, self.rate_limit - self._window_request_count)),
+            "x-ratelimit-reset": str(int(self._window_start_time + self.rate_limit_period_sec)),
+        }
+
+    # Generating data
+
+    def _get_trade_ids(self, limit, from_id=None, from_ms=None, to_ms=None, is_descending=False):
+        # Ids of trades for params (from and to are including)
+        first_id = 0 if from_id is None else max(0, int(from_id))
+        if from_ms is not None:
+            first_id = max(first_id, math.ceil((from_ms - self.start_timestamp_ms) / self.trade_interval_ms))
+        last_id = self.trade_count - 1
+        if to_ms is not None:
+            last_id = min(last_id, (to_ms - self.start_timestamp_ms) // self.trade_interval_ms)
+        if is_descending or (from_id is None and from_ms is None):
+            # (Latest trades)
+            ids = range(last_id, max(first_id, last_id - limit + 1) - 1, -1)
+            return ids if is_descending else reversed(ids)
+        return range(first_id, min(last_id + 1, first_id + limit))
+
+    def _get_trade_values(self, trade_id):
+        # -> (timestamp_ms, price, amount, is_buy)
+        return (self.start_timestamp_ms + trade_id * self.trade_interval_ms,
+                "%.8f" % (0.03 + (trade_id % 100) / 100000), "%.8f" % (1 + trade_id % 7), bool(trade_id % 2))
+
+    def _get_candles(self, interval_ms, limit, from_ms=None, to_ms=None):
+        # Candles of generated trades with open time in [from_ms, to_ms]
+        # -> [(open_ms, open, high, low, close, amount, trades_count), ...]
+        end_ms = self.start_timestamp_ms + self.trade_count * self.trade_interval_ms
+        first_ms = self.start_timestamp_ms // interval_ms * interval_ms
+        if from_ms is not None:
+            first_ms = max(first_ms, math.ceil(from_ms / interval_ms) * interval_ms)
+        last_ms = min(end_ms - 1, to_ms if to_ms is not None else end_ms) // interval_ms * interval_ms
+        open_times = range(first_ms, last_ms + 1, interval_ms)
+        open_times = open_times[:limit] if from_ms is not None else open_times[-limit:]
+
+        result = []
+        for open_ms in open_times:
+            trade_ids = self._get_trade_ids(1000000, None, open_ms, open_ms + interval_ms - 1)
+            values = [self._get_trade_values(trade_id) for trade_id in trade_ids]
+            prices = [price for timestamp_ms, price, amount, is_buy in values]
+            if prices:
+                amount = sum(float(amount) for timestamp_ms, price, amount, is_buy in values)
+                result.append((open_ms, prices[0], max(prices), min(prices), prices[-1], "%.8f" % amount,
+                               len(prices)))
+        return result
+
+    def _get_last_price(self):
+        return self._get_trade_values(self.trade_count - 1)[1]
+
+    def _get_order_book(self, limit):
+        # -> ([(price, amount), ...] of bids, same of asks), best prices first
+        price = float(self._get_last_price())
+        return ([("%.8f" % (price - i * 0.00001), "1.00000000") for i in range(1, limit + 1)],
+                [("%.8f" % (price + i * 0.00001), "1.00000000") for i in range(1, limit + 1)])
+
+    def _check_symbol(self, symbol):
+        return symbol and symbol.upper() in self.symbols
+
+    # Platforms
+
+    def _handle_binance(self, method, resource, params):
+        resource = resource.split("/", 2)[-1]  # api/v1/trades -> trades
+        if resource == "ping":
+            return 200, {}
+        if resource == "time":
+            return 200, {"serverTime": int((time.time() + self.time_offset_sec) * 1000)}
+        if resource == "exchangeInfo":
+            return 200, {"symbols": [{"symbol": symbol, "status": "TRADING", "baseAssetPrecision": 8,
+                                      "quotePrecision": 8, "filters": [
+                                          {"filterType": "PRICE_FILTER", "tickSize": "0.00000100"},
+                                          {"filterType": "LOT_SIZE", "stepSize": "0.00100000"}]}
+                                     for symbol in self.symbols]}
+        if resource in ("order", "openOrders", "account"):
+            return self._handle_binance_private(method, resource, params)
+        if resource == "ticker/price" and not params.get("symbol"):
+            price = self._get_last_price()
+            return 200, [{"symbol": symbol, "price": price} for symbol in self.symbols]
+
+        symbol = params.get("symbol")
+        if not self._check_symbol(symbol):
+            return 400, {"code": -1121, "msg": "Invalid symbol."}
+        limit = int(params.get("limit", 500))
+        if limit > 1000:
+            return 400, {"code": -1100, "msg": "Illegal characters found in parameter 'limit'"}
+
+        if resource in ("trades", "historicalTrades"):
+            return 200, [{"id": trade_id, "price": price, "qty": amount, "time": timestamp_ms,
+                          "isBuyerMaker": not is_buy, "isBestMatch": True}
+                         for trade_id in self._get_trade_ids(limit, params.get("fromId"))
+                         for timestamp_ms, price, amount, is_buy in [self._get_trade_values(trade_id)]]
+        if resource == "klines":
+            interval_ms = Interval.seconds_by_interval.get(params.get("interval"), 0) * 1000
+            if not interval_ms:
+                return 400, {"code": -1120, "msg": "Invalid interval."}
+            candles = self._get_candles(interval_ms, limit, self._parse_time(params.get("startTime")),
+                                        self._parse_time(params.get("endTime")))
+            return 200, [[open_ms, price_open, high, low, close, amount, open_ms + interval_ms - 1, "0",
+                          trades_count, "0", "0", "0"]
+                         for open_ms, price_open, high, low, close, amount, trades_count in candles]
+        if resource == "ticker/price":
+            return 200, {"symbol": symbol, "price": self._get_last_price()}
+        if resource == "depth":
+            bids, asks = self._get_order_book(limit)
+            return 200, {"lastUpdateId": self.trade_count,
+                         "bids": [[price, amount, []] for price, amount in bids],
+                         "asks": [[price, amount, []] for price, amount in asks]}
+        return 404, {"code": -1, "msg": "Unknown endpoint."}
+
+    def _handle_binance_private(self, method, resource, params):
+        if not params.get("signature"):
+            return 400, {"code": -1102, "msg": "Mandatory parameter 'signature' was not sent."}
+        if resource == "account":
+            return 200, {"updateTime": int(time.time() * 1000), "balances": [
+                {"asset": asset, "free": amount, "locked": "0.00000000"}
+                for asset, amount in (self.balances or {}).items()]}
+        if resource == "openOrders":
+            with self._lock:
+                return 200, [order for order in self._order_by_id.values()
+                             if not params.get("symbol") or order["symbol"] == params["symbol"]]
+        if method == "GET":
+            with self._lock:
+                order_id = params.get("orderId")
+                order = self._order_by_id.get(order_id) or self._closed_order_by_id.get(order_id)
+            if not order:
+                return 400, {"code": -2013, "msg": "Order does not exist."}
+            return 200, order
+        if method == "DELETE":
+            with self._lock:
+                order = self._order_by_id.pop(params.get("orderId"), None)
+                if order:
+                    order = self._closed_order_by_id[str(order["orderId"])] = dict(order, status="CANCELED")
+            if not order:
+                return 400, {"code": -2011, "msg": "Unknown order sent."}
+            return 200, order
+
+        if not self._check_symbol(params.get("symbol")):
+            return 400, {"code": -1121, "msg": "Invalid symbol."}
+        with self._lock:
+            self._last_order_id += 1
+            order = {"symbol": params["symbol"], "orderId": self._last_order_id,
+                     "clientOrderId": "mock%s" % self._last_order_id, "transactTime": int(time.time() * 1000),
+                     "price": params.get("price", "0"), "origQty": params.get("quantity"), "executedQty": "0",
+                     "status": "NEW", "type": params.get("type"), "side": params.get("side")}
+            self._order_by_id[str(self._last_order_id)] = order
+        return 200, order
+
+    def _handle_okex(self, method, resource, params):
+        resource = resource.split("/", 2)[-1]
+        symbol = params.get("symbol")
+        if not self._check_symbol((symbol or "").replace("_", "")):
+            return 200, {"error_code": 1024, "result": False}
+
+        if resource == "trades.do":
+            limit = int(params.get("size", 600))
+            return 200, [{"date": timestamp_ms // 1000, "date_ms": timestamp_ms, "price": price,
+                          "amount": amount, "tid": trade_id, "type": "buy" if is_buy else "sell"}
+                         for trade_id in self._get_trade_ids(limit, params.get("fromId") or params.get("since"))
+                         for timestamp_ms, price, amount, is_buy in [self._get_trade_values(trade_id)]]
+        if resource == "kline.do":
+            interval_ms = self._get_interval_ms(params.get("type", "").replace("min", "m").replace("our", "")
+                                                .replace("day", "d").replace("week", "w"))
+            if not interval_ms:
+                return 200, {"error_code": 1008, "result": False}
+            candles = self._get_candles(interval_ms, int(params.get("size", 1000)),
+                                        self._parse_time(params.get("since") or params.get("startTime")))
+            return 200, [[open_ms, price_open, high, low, close, amount]
+                         for open_ms, price_open, high, low, close, amount, trades_count in candles]
+        if resource == "ticker.do":
+            price = self._get_last_price()
+            return 200, {"date": str(int(time.time())), "ticker": {
+                "buy": price, "sell": price, "last": price, "high": price, "low": price, "vol": "0"}}
+        if resource == "depth.do":
+            bids, asks = self._get_order_book(int(params.get("size", 200)))
+            # (Asks are sorted by price descending)
+            return 200, {"bids": [[float(price), float(amount)] for price, amount in bids],
+                         "asks": [[float(price), float(amount)] for price, amount in reversed(asks)]}
+        return 404, {"error_code": 1002, "result": False}
+
+    def _handle_bitmex(self, method, resource, params):
+        resource = resource.split("/", 2)[-1]
+        if resource not in ("trade", "trade/bucketed", "instrument", "orderBook/L2"):
+            return 404, {"error": {"message": "Not Found", "name": "HTTPError"}}
+        symbol = params.get("symbol")
+        if symbol and not self._check_symbol(symbol):
+            return 400, {"error": {"message": "Unknown symbol", "name": "HTTPError"}}
+        limit = int(params.get("count", 100))
+        if limit > 500:
+            return 400, {"error": {"message": "Maximum result count is 500", "name": "ValidationError"}}
+
+        symbols = [symbol] if symbol else self.symbols
+        is_descending = params.get("reverse") in ("true", "True", "1")
+        if resource == "trade/bucketed":
+            # (Timestamp of BitMEX candle is its close time)
+            interval_ms = self._get_interval_ms(params.get("binSize"))
+            if not interval_ms:
+                return 400, {"error": {"message": "Invalid binSize", "name": "ValidationError"}}
+            candles = self._get_candles(interval_ms, limit, self._parse_time(params.get("startTime")),
+                                        self._parse_time(params.get("endTime")))
+            return 200, [{"timestamp": self._format_bitmex_time(open_ms + interval_ms), "symbol": symbol,
+                          "open": float(price_open), "high": float(high), "low": float(low), "close": float(close),
+                          "trades": trades_count, "volume": int(float(amount))}
+                         for open_ms, price_open, high, low, close, amount, trades_count in
+                         (reversed(candles) if is_descending else candles) for symbol in symbols][:limit]
+        if resource == "instrument":
+            return 200, [{"symbol": symbol, "state": "Open", "lastPrice": float(self._get_last_price()),
+                          "timestamp": self._format_bitmex_time(int(time.time() * 1000))} for symbol in symbols]
+        if resource == "orderBook/L2":
+            if not symbol:
+                return 400, {"error": {"message": "'symbol' is required", "name": "ValidationError"}}
+            bids, asks = self._get_order_book(int(params.get("depth", 25)))
+            # (Sorted by price descending)
+            return 200, [{"symbol": symbol, "id": index, "side": side, "size": int(float(amount)),
+                          "price": float(price)}
+                         for index, (side, price, amount) in enumerate(
+                             [("Sell", price, amount) for price, amount in reversed(asks)] +
+                             [("Buy", price, amount) for price, amount in bids])]
+
+        trade_ids = self._get_trade_ids(limit, None, self._parse_time(params.get("startTime")),
+                                        self._parse_time(params.get("endTime")), is_descending)
+        return 200, [{"timestamp": self._format_bitmex_time(timestamp_ms), "symbol": symbol, "side": "Buy" if is_buy else "Sell", "size": int(float(amount)),
+                      "price": float(price), "trdMatchID": "%s-%08d" % (symbol, trade_id)}
+                     for trade_id in trade_ids for symbol in symbols
+                     for timestamp_ms, price, amount, is_buy in [self._get_trade_values(trade_id)]][:limit]
+
+    def _handle_bitfinex(self, method, resource, params):
+        # v1: trades/{symbol}, pubticker/{symbol}, book/{symbol}
+        # v2: trades/t{symbol}/hist, candles/trade:1m:t{symbol}/hist, ticker/t{symbol}, book/t{symbol}/P0
+        version, _, resource = resource.partition("/")
+        parts = resource.split("/")
+        if len(parts) < 2 or parts[0] not in (("trades", "candles", "ticker", "book") if version == "v2" else
+                                              ("trades", "pubticker", "book")):
+            return 404, {"error": "Not found"}
+        if parts[0] == "candles":
+            _, timeframe, symbol = (parts[1].split(":") + ["", ""])[:3]
+        else:
+            symbol = parts[1]
+        symbol = symbol[1:] if version == "v2" else symbol
+        if not self._check_symbol(symbol):
+            return 400, ["error", 10020, "symbol: invalid"] if version == "v2" else {"message": "Unknown symbol"}
+
+        price = self._get_last_price()
+        if parts[0] == "candles":
+            interval_ms = self._get_interval_ms(timeframe.replace("D", "d").replace("W", "w"))
+            if not interval_ms:
+                return 400, ["error", 10020, "timeframe: invalid"]
+            candles = self._get_candles(interval_ms, int(params.get("limit", 120)),
+                                        self._parse_time(params.get("start")), self._parse_time(params.get("end")))
+            return 200, [[open_ms, float(price_open), float(close), float(high), float(low), float(amount)]
+                         for open_ms, price_open, high, low, close, amount, trades_count in
+                         (candles if params.get("sort") == "1" else reversed(candles))]
+        if parts[0] == "pubticker":
+            return 200, {"mid": price, "bid": price, "ask": price, "last_price": price, "low": price,
+                         "high": price, "volume": "0", "timestamp": "%.6f" % time.time()}
+        if parts[0] == "ticker":
+            return 200, [float(price), 1.0, float(price), 1.0, 0.0, 0.0, float(price), 0.0, float(price),
+                         float(price)]
+        if parts[0] == "book":
+            bids, asks = self._get_order_book(int(params.get("len" if version == "v2" else "limit_bids", 25)))
+            if version == "v2":
+                # (Amount of asks is negative)
+                return 200, [[float(price), 1, float(amount)] for price, amount in bids] + \
+                            [[float(price), 1, -float(amount)] for price, amount in asks]
+            timestamp = "%.1f" % time.time()
+            return 200, {"bids": [{"price": price, "amount": amount, "timestamp": timestamp} for price, amount in bids],
+                         "asks": [{"price": price, "amount": amount, "timestamp": timestamp} for price, amount in asks]}
+
+        if version == "v2":
+            limit = int(params.get("limit", 120))
+            if limit > 1000:
+                return 400, ["error", 10020, "limit: invalid"]
+            is_descending = params.get("sort") != "1"
+            trade_ids = self._get_trade_ids(limit, None, self._parse_time(params.get("start")),
+                                            self._parse_time(params.get("end")), is_descending)
+            return 200, [[trade_id, timestamp_ms, float(amount) if is_buy else -float(amount), float(price)]
+                         for trade_id in trade_ids
+                         for timestamp_ms, price, amount, is_buy in [self._get_trade_values(trade_id)]]
+
+        limit = int(params.get("limit_trades", 50))
+        from_ms = float(params["timestamp"]) * 1000 if params.get("timestamp") else None
+        trade_ids = self._get_trade_ids(limit, None, from_ms, None, True)
+        return 200, [{"timestamp": timestamp_ms // 1000, "tid": trade_id, "price": price, "amount": amount,
+                      "exchange": "bitfinex", "type": "buy" if is_buy else "sell"}
+                     for trade_id in trade_ids
+                     for timestamp_ms, price, amount, is_buy in [self._get_trade_values(trade_id)]]
+
+    def _get_interval_ms(self, interval):
+        # "1m" -> 60000 (0 for unknown)
+        return Interval.seconds_by_interval.get(interval, 0) * 1000
+
+    def _format_bitmex_time(self, timestamp_ms):
+        return datetime.utcfromtimestamp(timestamp_ms / 1000).isoformat()[:23] + "Z"
+
+    def _parse_time(self, value):
+        # Milliseconds or time string -> milliseconds
+        if not value:
+            return None
+        try:
+            return int(float(value))
+        except ValueError:
+            dt = parser.parse(value)
+            # (Time strings without timezone are in UTC)
+            if not dt.tzinfo:
+                dt = dt.replace(tzinfo=timezone.utc)
+            return int(dt.timestamp() * 1000)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    # (Keep-alive to reuse connections by requests.Session)
+    protocol_version = "HTTP/1.1"
+    # (Headers and body are written separately, so don't wait for ACK between them)
+    disable_nagle_algorithm = True
+    mock_server = None
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle()
+
+    def do_DELETE(self):
+        self._handle()
+
+    def _handle(self):
+        url = urlsplit(self.path)
+        params = dict(parse_qsl(url.query))
+        content_length = int(self.headers.get("Content-Length") or 0)
+        if content_length:
+            params.update(parse_qsl(self.rfile.read(content_length).decode()))
+
+        status, data, headers = self.mock_server.handle(self.command, url.path, params)
+
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    # Run in a separate process for load testing (to not share GIL with clients):
+    #   python -m hyperquant.clients.mock --port 8000 --latency_sec 0.005 --rate_limit 1000
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description="Mock exchange server")
+    arg_parser.add_argument("--host", default=MockExchangeServer.host)
+    arg_parser.add_argument("--port", type=int, default=8000)
+    arg_parser.add_argument("--latency_sec", type=float, default=0)
+    arg_parser.add_argument("--rate_limit", type=int, default=None)
+    arg_parser.add_argument("--ban_after_rate_limit_count", type=int, default=None)
+    args = arg_parser.parse_args()
+
+    mock_server = MockExchangeServer(**vars(args))
+    mock_server.start()
+    print("Mock exchange server started on: %s" % mock_server.url)
+    try:
+        mock_server._thread.join()
+    except KeyboardInterrupt:
+        mock_server.close()
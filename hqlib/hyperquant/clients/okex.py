@@ -3,7 +3,6 @@ import zlib
 import re
 import hmac
 import time
-from threading import Thread
 from operator import itemgetter
 
 from hyperquant.api import Platform, Sorting, Interval, Direction, OrderType
@@ -11,7 +10,6 @@ from hyperquant.clients import WSClient, Endpoint, Trade, Error, ErrorCode, \
     ParamName, WSConverter, RESTConverter, PrivatePlatformRESTClient,\
     MyTrade, Candle, Ticker, OrderBookItem, Order, \
     OrderBook, Account, Balance
-from websocket import WebSocketApp
 
 # REST
 
@@ -317,8 +315,11 @@ class OkexWSConverterV1(WSConverter):
             symbol_regexp = None
             if 'deals' in channel:
                 symbol_regexp = re.search('ok_sub_spot_(.+?)_deals', channel)
+                # (Endpoint is not known when parsed in a ParserPool process)
+                endpoint = endpoint or Endpoint.TRADE
             if 'kline' in channel:
                 symbol_regexp = re.search('ok_sub_spot_(.+?)_kline_*', channel)
+                endpoint = endpoint or Endpoint.CANDLE
             symbol = None
             if symbol_regexp:
                 symbol = symbol_regexp.group(1)
@@ -341,16 +342,18 @@ class OkexWSClient(WSClient):
     IS_SUBSCRIPTION_COMMAND_SUPPORTED = True
     _channel_to_endpoint = {}
 
+    heartbeat_message = '{"event":"ping"}'
+
     def _subscribe(self, subscriptions):
         self.subscriptions_data = subscriptions
 
         return super()._subscribe(subscriptions)
 
-    def _on_message(self, message):
+    def _decode_message(self, message):
         decompress = zlib.decompressobj(-zlib.MAX_WBITS)
         inflated = decompress.decompress(message)
         inflated += decompress.flush()
-        return super()._on_message(inflated.decode('utf-8'))
+        return super()._decode_message(inflated.decode('utf-8'))
 
     def _send_subscribe(self, subscriptions):
         self.logger.debug('_send_subscribe')
@@ -362,53 +365,13 @@ class OkexWSClient(WSClient):
             self._send(event_data)
 
     def _parse(self, endpoint, data):
+        # (Events like {"event":"pong"} come as dicts)
+        if isinstance(data, dict):
+            data = [data]
         batch_data = []
         for i in data:
-            current_endpoint = self._channel_to_endpoint.get(i['channel'])
-            batch_data += super()._parse(current_endpoint, i)
+            current_endpoint = self._channel_to_endpoint.get(i.get('channel'))
+            result = super()._parse(current_endpoint, i)
+            if isinstance(result, list):
+                batch_data += result
         return batch_data
-
-    def connect(self, version=None):
-        self.logger.debug("connect")
-        # Check ready
-        if not self.current_subscriptions:
-            self.logger.warning("Please subscribe before connect.")
-            return
-
-        # Do nothing if was called before
-        if self.ws and self.is_started:
-            self.logger.warning("WebSocket is already started.")
-            return
-
-        # Connect
-        if not self.ws:
-            self.ws = WebSocketApp(
-                self.url,
-                on_open=self._on_open,
-                on_message=self._on_message,
-                on_error=self._on_error,
-                on_close=self._on_close)
-        else:
-            self.ws.url = self.url
-            self.ws.header = self.headers
-
-        # (run_forever() will raise an exception if previous socket is still not closed)
-        self.logger.debug("Start WebSocket with url: %s" % self.ws.url)
-        self.is_started = True
-
-        def send_heart_beat(ws):
-            ping = '{"event":"ping"}'
-            while (True):
-                sent = False
-                while (sent is False):
-                    try:
-                        ws.send(ping)
-                        sent = True
-                    except Exception as e:
-                        raise e
-                time.sleep(30)
-
-        self.thread = Thread(target=send_heart_beat, args=(self.ws, ))
-        self.ws.run_forever()
-        self.thread.daemon = True
-        self.thread.start()
@@ -0,0 +1,276 @@
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from threading import Thread, Condition, Lock
+
+from hyperquant.api import ParamName
+from hyperquant.clients import DataObject, ItemObject, Trade, MyTrade, Candle, Ticker, OrderBook, OrderBookItem, \
+    Order, Account, Balance
+from hyperquant.clients.symbols import SymbolRegistry
+
+"""
+Parsing of WebSocket messages in a pool of processes.
+
+Parsing (json + converter) is bound by GIL, so with many platforms and symbols
+subscribed all WS threads share one core. With pool set:
+
+    pool = ParserPool(processes=4)
+    client = create_ws_client(Platform.BINANCE)
+    client.parser_pool = pool
+    client.subscribe(...)
+
+raw messages are sent to pool processes, each of them running a client
+(and so the WSConverter) of the same platform and version. Messages of a
+client are sent in batches: all messages received while the previous batch
+was parsed (up to max_batch_size), so IPC costs are paid once per batch.
+Parsed items are sent back as JSON rows and passed to on_data_item() in the
+same order as messages were received (with symbols converted to canonical
+ones by client's symbol_registry). Clients with is_fixed_point send the
+precisions of their symbol_registry along with messages, so prices and
+amounts are the same ints as in-process ones. Only one batch of a client is parsed
+at a time, so the ordering for each client (and symbol) is preserved, while
+a slow client doesn't delay others.
+"""
+
+# Item classes which can be sent between processes
+_item_class_by_name = {item_class.__name__: item_class for item_class in (
+    Trade, MyTrade, Candle, Ticker, OrderBook, OrderBookItem, Order, Account, Balance)}
+# (Items of other classes are sent as dicts)
+_item_format_by_class = {
+    Trade: [
+        ParamName.PLATFORM_ID, ParamName.SYMBOL, ParamName.TIMESTAMP,
+        ParamName.ITEM_ID, ParamName.PRICE, ParamName.AMOUNT,
+        ParamName.DIRECTION
+    ],
+    Candle: [
+        ParamName.PLATFORM_ID, ParamName.SYMBOL, ParamName.TIMESTAMP,
+        ParamName.INTERVAL, ParamName.PRICE_OPEN, ParamName.PRICE_CLOSE,
+        ParamName.PRICE_HIGH, ParamName.PRICE_LOW, ParamName.AMOUNT,
+        ParamName.TRADES_COUNT
+    ],
+    Ticker: [
+        ParamName.PLATFORM_ID, ParamName.SYMBOL, ParamName.TIMESTAMP,
+        ParamName.PRICE
+    ],
+}
+
+# Clients created in a pool process: {(platform_id, version, use_milliseconds, precisions): client}
+_client_by_key = {}
+
+
+# Pool process side
+
+def parse_message(platform_id, version, use_milliseconds, message, precisions=None):
+    # Raw message -> JSON string of encoded items
+    # (precisions - for fixed-point: ((native_symbol, (price_precision, amount_precision)), ...), see get_precisions())
+    client = _get_client(platform_id, version, use_milliseconds, precisions)
+    return json.dumps(_encode_result(client._decode_and_parse(message)))
+
+
+def parse_messages(platform_id, version, use_milliseconds, messages, precisions=None):
+    # [raw message, ...] -> JSON string of encoded items for each message
+    client = _get_client(platform_id, version, use_milliseconds, precisions)
+    return json.dumps([_encode_result(client._decode_and_parse(message)) for message in messages])
+
+
+def _get_client(platform_id, version, use_milliseconds, precisions=None):
+    key = (platform_id, version, use_milliseconds, precisions)
+    client = _client_by_key.get(key)
+    if not client:
+        # (Import here as clients.utils imports all platforms)
+        from hyperquant.clients.utils import _ws_client_class_by_platform_id
+
+        client_class = _ws_client_class_by_platform_id[platform_id]
+        _client_by_key[key] = client = client_class(version=version)
+        client.use_milliseconds = use_milliseconds
+        if precisions is not None:
+            # (Only precisions: symbols are converted to canonical ones by ParserPool)
+            symbol_registry = SymbolRegistry()
+            symbol_registry.set_precisions(platform_id, dict(precisions))
+            client.symbol_registry = symbol_registry
+            client.is_fixed_point = True
+    return client
+
+
+def get_precisions(client):
+    # Client -> precisions for parse_messages() (None if not is_fixed_point)
+    if not client.is_fixed_point:
+        return None
+    symbol_registry = client.symbol_registry
+    return tuple(sorted(symbol_registry.get_precisions(client.platform_id).items())) if symbol_registry else ()
+
+
+def _encode_result(result):
+    items = result if isinstance(result, list) else [result]
+    return [encode_item(item) for item in items if isinstance(item, DataObject)]
+
+
+def encode_item(item):
+    # Item -> [class name, row or dict] (JSON-compatible, also used by HistoryCache)
+    item_format = _item_format_by_class.get(type(item))
+    if item_format:
+        return [type(item).__name__, [getattr(item, name, None) for name in item_format]]
+    return [type(item).__name__, {name: _encode_value(value) for name, value in vars(item).items()}]
+
+
+def _encode_value(value):
+    if isinstance(value, list):
+        return [_encode_value(element) for element in value]
+    if type(value) in _item_class_by_name.values():
+        return encode_item(value)
+    return value
+
+
+# Client side
+
+def decode_items(encoded, is_milliseconds=False):
+    # JSON string of encoded items -> items
+    return _decode_items(json.loads(encoded), is_milliseconds)
+
+
+def decode_batch(encoded, is_milliseconds=False):
+    # JSON string of parse_messages() -> [items of each message, ...]
+    return [_decode_items(encoded_items, is_milliseconds) for encoded_items in json.loads(encoded)]
+
+
+def _decode_items(encoded_items, is_milliseconds=False):
+    return [decode_item(class_name, values, is_milliseconds) for class_name, values in encoded_items]
+
+
+def decode_item(class_name, values, is_milliseconds=False):
+    # Result of encode_item() -> new item
+    item_class = _item_class_by_name[class_name]
+    item = item_class()
+    if isinstance(values, list):
+        for name, value in zip(_item_format_by_class[item_class], values):
+            setattr(item, name, value)
+        if isinstance(item, ItemObject):
+            item.is_milliseconds = is_milliseconds
+    else:
+        for name, value in values.items():
+            setattr(item, name, _decode_value(value, is_milliseconds))
+    return item
+
+
+def _decode_value(value, is_milliseconds=False):
+    if isinstance(value, list):
+        if len(value) == 2 and value[0] in _item_class_by_name and isinstance(value[1], (list, dict)):
+            return decode_item(value[0], value[1], is_milliseconds)
+        return [_decode_value(element, is_milliseconds) for element in value]
+    return value
+
+
+class ParserPool:
+    """
+    Parses messages of any number of WSClients in a pool of processes.
+
+    Items are returned to each client in the same order as its messages were submitted.
+    """
+    # Settings:
+    processes = None  # None - number of CPUs
+    # (Max count of messages sent to a process at once)
+    max_batch_size = 100
+
+    # State:
+    _executor = None
+    _batcher_by_client = None
+
+    def __init__(self, processes=None, **kwargs) -> None:
+        super().__init__()
+        if processes is not None:
+            self.processes = processes
+
+        # Set up settings
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+        self.logger = logging.getLogger("ParserPool")
+
+        self._executor = ProcessPoolExecutor(self.processes)
+        self._batcher_by_client = {}
+        self._lock = Lock()
+
+    def submit(self, client, message):
+        batcher = self._batcher_by_client.get(client)
+        if not batcher:
+            with self._lock:
+                if not self._executor:
+                    return
+                batcher = self._batcher_by_client.get(client)
+                if not batcher:
+                    self._batcher_by_client[client] = batcher = _ClientBatcher(self, client)
+        batcher.put(message)
+
+    def close(self):
+        with self._lock:
+            if not self._executor:
+                return
+            batchers = list(self._batcher_by_client.values())
+            self._batcher_by_client.clear()
+            executor, self._executor = self._executor, None
+
+        # (Parse all submitted messages before shutdown)
+        for batcher in batchers:
+            batcher.close()
+        executor.shutdown()
+
+    def _parse_batch(self, client, messages):
+        try:
+            future = self._executor.submit(parse_messages, client.platform_id, client.version,
+                                           client.use_milliseconds, messages, get_precisions(client))
+            results = decode_batch(future.result(), client.use_milliseconds)
+        except Exception as error:
+            self.logger.exception("Error while parsing messages in pool for client: %s error: %s",
+                                  client, error)
+            return
+        for items in results:
+            # (Pool processes have no symbol_registry, so symbols are converted here)
+            client.converter.convert_to_canonical_symbols(items)
+            client._process_result(items)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class _ClientBatcher:
+    # Messages of one client waiting for parsing. Parsed by a thread of the
+    # client, one batch at a time, so the order of items is preserved
+
+    def __init__(self, pool, client) -> None:
+        super().__init__()
+        self.pool = pool
+        self.client = client
+
+        self._messages = []
+        self._is_closed = False
+        self._condition = Condition()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def put(self, message):
+        with self._condition:
+            self._messages.append(message)
+            self._condition.notify()
+
+    def close(self):
+        with self._condition:
+            self._is_closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def _run(self):
+        max_batch_size = self.pool.max_batch_size
+        while True:
+            with self._condition:
+                while not self._messages and not self._is_closed:
+                    self._condition.wait()
+                if not self._messages:
+                    # Closed
+                    return
+                messages = self._messages[:max_batch_size]
+                del self._messages[:max_batch_size]
+
+            self.pool._parse_batch(self.client, messages)
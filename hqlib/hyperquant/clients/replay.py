@@ -0,0 +1,219 @@
+import asyncio
+import base64
+import json
+import logging
+import time
+from threading import Thread, Event
+
+import websockets
+
+"""
+Recording and replaying raw WebSocket frames to test and benchmark
+WSClient subclasses offline.
+
+    # Record
+    with FrameRecorder(client, "binance_trades.jsonl"):
+        client.subscribe([Endpoint.TRADE], ["ETHBTC"])
+        time.sleep(60)
+
+    # Replay (speed: 1 - original, 10 - 10 times faster, None - as fast as possible)
+    frames = load_frames("binance_trades.jsonl")
+    with ReplayServer(frames, speed=None) as server:
+        client = BinanceWSClient()
+        client.converter.base_url = server.url
+        client.subscribe([Endpoint.TRADE], ["ETHBTC"])
+        server.wait_until_replayed()
+
+    # Parse without network
+    items_per_sec = measure_parsing(BinanceWSClient(), frames)
+
+Each frame is stored as a JSON line: [receive_timestamp, text] or
+[receive_timestamp, base64_of_bytes, true] for binary frames (OKEx).
+"""
+
+
+# Frames
+
+def encode_frame(timestamp, message):
+    if isinstance(message, bytes):
+        return json.dumps([timestamp, base64.b64encode(message).decode("ascii"), True])
+    return json.dumps([timestamp, message])
+
+
+def decode_frame(line):
+    timestamp, message, *is_binary = json.loads(line)
+    if is_binary and is_binary[0]:
+        message = base64.b64decode(message)
+    return timestamp, message
+
+
+def load_frames(path):
+    # -> [(timestamp, message), ...]
+    with open(path) as file:
+        return [decode_frame(line) for line in file if line.strip()]
+
+
+class FrameRecorder:
+    """
+    Writes all raw messages received by WSClient (before decoding) to a file.
+    """
+
+    # State:
+    _file = None
+    _prev_on_message = None
+
+    def __init__(self, client, path) -> None:
+        super().__init__()
+        self.client = client
+        self.path = path
+        self.frame_count = 0
+
+    def start(self):
+        if self._file:
+            return
+        self._file = open(self.path, "a")
+        # (Wrap instance method to record in receiving thread before parsing)
+        self._prev_on_message = self.client._on_message
+        self.client._on_message = self._on_message
+
+    def stop(self):
+        if not self._file:
+            return
+        self.client._on_message = self._prev_on_message
+        self._file.close()
+        self._file = None
+
+    def _on_message(self, message):
+        self._file.write(encode_frame(time.time(), message) + "\n")
+        self.frame_count += 1
+        self._prev_on_message(message)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+# Replay
+
+class ReplayServer:
+    """
+    Local WebSocket server which sends recorded frames to each connected client
+    with original intervals divided by speed (or without delays if speed is None).
+    Messages from clients (subscription commands, pings) are ignored.
+    """
+    # Settings:
+    host = "127.0.0.1"
+    port = 0  # (Any free port)
+
+    # State:
+    loop = None
+    server = None
+    _thread = None
+
+    @property
+    def url(self):
+        return "ws://%s:%s/" % (self.host, self.server.sockets[0].getsockname()[1])
+
+    def __init__(self, frames, speed=1, **kwargs) -> None:
+        super().__init__()
+        self.frames = frames
+        self.speed = speed
+
+        # Set up settings
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+        self.connection_count = 0
+        self._replayed_event = Event()
+        self.logger = logging.getLogger("ReplayServer")
+
+    def start(self):
+        if self._thread:
+            return
+        self.loop = asyncio.new_event_loop()
+        self._thread = Thread(target=self.loop.run_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        self.server = asyncio.run_coroutine_threadsafe(self._start_server(), self.loop).result()
+        self.logger.debug("Replay server started on: %s", self.url)
+
+    def close(self):
+        if not self._thread:
+            return
+        asyncio.run_coroutine_threadsafe(self._stop_server(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+        self._thread = None
+
+    def wait_until_replayed(self, timeout_sec=None):
+        # Wait until all frames are sent to a client
+        return self._replayed_event.wait(timeout_sec)
+
+    async def _start_server(self):
+        return await websockets.serve(self._serve, self.host, self.port, max_size=None)
+
+    async def _stop_server(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _serve(self, ws, path):
+        self.connection_count += 1
+        self.logger.debug("Replay frames for connection: %s path: %s", self.connection_count, path)
+        # (Skip incoming messages to not block the connection)
+        reading_task = self.loop.create_task(self._skip_incoming(ws))
+        try:
+            await self._replay(ws)
+            self._replayed_event.set()
+            await ws.wait_closed()
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            reading_task.cancel()
+
+    async def _replay(self, ws):
+        if not self.frames:
+            return
+        first_timestamp = self.frames[0][0]
+        start_time = time.time()
+        for timestamp, message in self.frames:
+            if self.speed:
+                delay_sec = (timestamp - first_timestamp) / self.speed - (time.time() - start_time)
+                if delay_sec > 0:
+                    await asyncio.sleep(delay_sec)
+            await ws.send(message)
+
+    async def _skip_incoming(self, ws):
+        async for _ in ws:
+            pass
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def measure_parsing(client, frames, repeat=1):
+    # Parse frames as received by client without network and return items per second
+    item_count = 0
+    prev_on_data_item = client.on_data_item
+
+    def on_data_item(item):
+        nonlocal item_count
+        item_count += 1
+
+    client.on_data_item = on_data_item
+    try:
+        start_time = time.perf_counter()
+        for _ in range(repeat):
+            for _, message in frames:
+                client._on_message(message)
+        elapsed_sec = time.perf_counter() - start_time
+    finally:
+        client.on_data_item = prev_on_data_item
+    return item_count / elapsed_sec if elapsed_sec else 0
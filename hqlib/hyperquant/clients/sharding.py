@@ -0,0 +1,318 @@
+import logging
+import time
+from collections import defaultdict
+from threading import RLock
+
+from hyperquant.api import Endpoint, Platform
+
+"""
+Spreading subscriptions of one platform over several WebSocket connections.
+
+Platforms limit the number of streams per connection (and Binance puts all
+of them in URL), and one connection can become a bottleneck, so:
+
+    client = ShardedWSClient(BinanceWSClient)
+    client.on_data_item = lambda item: print(item)
+    client.subscribe([Endpoint.TRADE, Endpoint.ORDER_BOOK_DIFF], symbols)
+
+All subscriptions of a symbol are always made in the same connection (shard),
+so the items of each symbol come in the same order as they were sent by platform.
+"""
+
+
+class ShardedWSClient:
+    """
+    Has the same interface for subscribing as WSClient, but creates as many
+    WSClient instances (shards) as needed to keep the number of subscriptions
+    and estimated message rate of each connection within limits.
+    """
+    _log_prefix = "ShardedWSClient"
+
+    # Settings:
+    # (Minimal number of connections)
+    shard_count = 1
+    # (Used if not defined by converter's MAX_SUBSCRIPTIONS_PER_CONNECTION)
+    max_subscriptions_per_connection = 100
+    # (Items per second)
+    max_message_rate_per_connection = 200
+    # Rebalance if the most loaded shard has more than rebalance_ratio * average load
+    rebalance_ratio = 1.5
+    # (Measured rates are used only after this time passed since counting started)
+    min_measuring_time_sec = 60
+    # Estimated items per second for a subscription of each endpoint
+    message_rate_by_endpoint = {
+        Endpoint.TRADE: 1,
+        Endpoint.CANDLE: 0.5,
+        Endpoint.TICKER: 1,
+        Endpoint.TICKER_ALL: 10,
+        Endpoint.ORDER_BOOK: 1,
+        Endpoint.ORDER_BOOK_DIFF: 10,
+    }
+
+    on_data_item = None
+    on_data = None
+
+    # State:
+    shards = None
+    _shard_by_symbol = None
+    # (Running totals of symbols placed in each shard: {shard: value})
+    _symbol_count_by_shard = None
+    _subscription_count_by_shard = None
+    _load_by_shard = None
+    # (Values added to totals for each symbol: {symbol: (subscription_count, load)})
+    _counted_by_symbol = None
+    # {symbol: {endpoint: params}} (symbol is None for generic endpoints)
+    _params_by_endpoint_by_symbol = None
+    _item_count_by_symbol = None
+    _counting_start_time = None
+
+    @property
+    def converter(self):
+        return self.shards[0].converter
+
+    @property
+    def is_connected(self):
+        return any(shard.is_connected for shard in self.shards if shard.current_subscriptions)
+
+    @property
+    def current_subscriptions(self):
+        result = set()
+        for shard in self.shards:
+            result.update(shard.current_subscriptions or set())
+        return result
+
+    def __init__(self, client_class, api_key=None, api_secret=None, version=None, **kwargs) -> None:
+        super().__init__()
+        self.client_class = client_class
+        self._api_key = api_key
+        self._api_secret = api_secret
+        self.version = version
+
+        # Set up settings
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+        self.shards = []
+        self._shard_by_symbol = {}
+        self._symbol_count_by_shard = defaultdict(int)
+        self._subscription_count_by_shard = defaultdict(int)
+        self._load_by_shard = defaultdict(float)
+        self._counted_by_symbol = {}
+        self._params_by_endpoint_by_symbol = {}
+        self._item_count_by_symbol = defaultdict(int)
+        self._counting_start_time = time.time()
+        self._lock = RLock()
+
+        for _ in range(self.shard_count):
+            self._create_shard()
+
+        # Create logger
+        platform_name = Platform.get_platform_name_by_id(self.converter.platform_id)
+        self.logger = logging.getLogger("%s.%s" % (self._log_prefix, platform_name))
+
+    # Subscription
+
+    def subscribe(self, endpoints=None, symbols=None, **params):
+        # None means: all previously subscribed or (if none) all supported
+        converter = self.converter
+        endpoints = set(endpoints).intersection(converter.supported_endpoints) if endpoints else \
+            (self._get_subscribed_endpoints() or set(converter.supported_endpoints))
+        symbols = set(symbols) if symbols else self._get_subscribed_symbols()
+
+        with self._lock:
+            endpoints_by_symbol = defaultdict(set)
+            for endpoint in endpoints:
+                for symbol in (symbols or [None]) if endpoint in converter.symbol_endpoints else [None]:
+                    self._params_by_endpoint_by_symbol.setdefault(symbol, {})[endpoint] = params
+                    endpoints_by_symbol[symbol].add(endpoint)
+
+            # Find shards for symbols (heaviest first)
+            symbols_by_shard_and_endpoints = defaultdict(list)
+            for symbol in sorted(endpoints_by_symbol, key=self._get_symbol_load, reverse=True):
+                shard = self._shard_by_symbol.get(symbol)
+                if not shard or not self._has_capacity(shard, symbol):
+                    new_shard = self._find_shard_for(symbol)
+                    if shard:
+                        # (Subscribes all endpoints of the symbol including new ones)
+                        self._move_symbol(symbol, new_shard)
+                        continue
+                    shard = new_shard
+                # (Count new endpoints)
+                self._place_symbol(symbol, shard)
+                key = (shard, frozenset(endpoints_by_symbol[symbol]))
+                symbols_by_shard_and_endpoints[key].append(symbol)
+
+            # Subscribe (one call for each shard as it may cause reconnecting)
+            for (shard, shard_endpoints), shard_symbols in symbols_by_shard_and_endpoints.items():
+                shard_symbols = [symbol for symbol in shard_symbols if symbol]
+                shard.subscribe(shard_endpoints, shard_symbols or None, **params)
+
+            self.rebalance()
+
+    def unsubscribe(self, endpoints=None, symbols=None, **params):
+        # None means "all"
+        with self._lock:
+            for symbol in list(symbols or self._params_by_endpoint_by_symbol):
+                params_by_endpoint = self._params_by_endpoint_by_symbol.get(symbol)
+                if not params_by_endpoint:
+                    continue
+                symbol_endpoints = set(endpoints or params_by_endpoint).intersection(params_by_endpoint)
+                if not symbol_endpoints:
+                    continue
+
+                shard = self._shard_by_symbol[symbol]
+                shard.unsubscribe(symbol_endpoints, [symbol] if symbol else None, **params)
+                for endpoint in symbol_endpoints:
+                    del params_by_endpoint[endpoint]
+                if not params_by_endpoint:
+                    self._remove_symbol(symbol)
+                    del self._params_by_endpoint_by_symbol[symbol]
+                else:
+                    self._place_symbol(symbol, shard)
+                if not shard.current_subscriptions:
+                    shard.close()
+
+    def rebalance(self):
+        # Move symbols from the most loaded shards to the least loaded ones
+        # (only when load differs significantly, as moving a symbol needs resubscribing)
+        with self._lock:
+            # (Measured loads change with time)
+            for symbol, shard in list(self._shard_by_symbol.items()):
+                self._place_symbol(symbol, shard)
+
+            shards = [shard for shard in self.shards]
+            for _ in range(len(self._shard_by_symbol)):
+                load_by_shard = {shard: self._get_shard_load(shard) for shard in shards}
+                average_load = sum(load_by_shard.values()) / len(shards)
+                max_shard = max(shards, key=load_by_shard.get)
+                min_shard = min(shards, key=load_by_shard.get)
+                if max_shard is min_shard or load_by_shard[max_shard] <= average_load * self.rebalance_ratio:
+                    return
+
+                # (The heaviest symbol which makes loads closer after moving)
+                load_diff = load_by_shard[max_shard] - load_by_shard[min_shard]
+                symbols = [symbol for symbol, shard in self._shard_by_symbol.items()
+                           if shard is max_shard and self._get_symbol_load(symbol) < load_diff and
+                           self._has_capacity(min_shard, symbol)]
+                if not symbols:
+                    return
+                self._move_symbol(max(symbols, key=self._get_symbol_load), min_shard)
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+
+    # Shards
+
+    def _create_shard(self):
+        shard = self.client_class(self._api_key, self._api_secret, self.version)
+        shard.on_data_item = self._on_shard_item
+        shard.on_data = self._on_shard_data
+        self.shards.append(shard)
+        return shard
+
+    def _find_shard_for(self, symbol):
+        # The least loaded shard with enough capacity or a new one
+        shards = [shard for shard in self.shards if self._has_capacity(shard, symbol)]
+        if not shards:
+            return self._create_shard()
+        return min(shards, key=self._get_shard_load)
+
+    def _has_capacity(self, shard, symbol):
+        # Check whether symbol's subscriptions can be (or remain) in the shard
+        max_subscriptions = self.converter.MAX_SUBSCRIPTIONS_PER_CONNECTION or \
+            self.max_subscriptions_per_connection
+        other_symbol_count = self._symbol_count_by_shard[shard]
+        subscription_count = self._subscription_count_by_shard[shard]
+        load = self._load_by_shard[shard]
+        if self._shard_by_symbol.get(symbol) is shard:
+            # (Exclude the values counted for the symbol before)
+            counted_subscription_count, counted_load = self._counted_by_symbol[symbol]
+            other_symbol_count -= 1
+            subscription_count -= counted_subscription_count
+            load -= counted_load
+        subscription_count += len(self._params_by_endpoint_by_symbol[symbol])
+        load += self._get_symbol_load(symbol)
+        # (Any symbol can be placed in an empty shard)
+        return not other_symbol_count or \
+            subscription_count <= max_subscriptions and load <= self.max_message_rate_per_connection
+
+    def _place_symbol(self, symbol, shard):
+        # Set symbol's shard and (re)count its subscriptions and load in totals
+        self._remove_symbol(symbol)
+        subscription_count = len(self._params_by_endpoint_by_symbol[symbol])
+        load = self._get_symbol_load(symbol)
+        self._shard_by_symbol[symbol] = shard
+        self._counted_by_symbol[symbol] = (subscription_count, load)
+        self._symbol_count_by_shard[shard] += 1
+        self._subscription_count_by_shard[shard] += subscription_count
+        self._load_by_shard[shard] += load
+
+    def _remove_symbol(self, symbol):
+        shard = self._shard_by_symbol.pop(symbol, None)
+        if not shard:
+            return
+        subscription_count, load = self._counted_by_symbol.pop(symbol)
+        self._symbol_count_by_shard[shard] -= 1
+        self._subscription_count_by_shard[shard] -= subscription_count
+        self._load_by_shard[shard] -= load
+
+    def _move_symbol(self, symbol, shard):
+        prev_shard = self._shard_by_symbol[symbol]
+        self.logger.debug("Move symbol: %s from shard: %s to: %s", symbol,
+                          self.shards.index(prev_shard), self.shards.index(shard))
+        params_by_endpoint = self._params_by_endpoint_by_symbol[symbol]
+        symbols = [symbol] if symbol else None
+
+        prev_shard.unsubscribe(set(params_by_endpoint), symbols)
+        if not prev_shard.current_subscriptions:
+            prev_shard.close()
+        self._place_symbol(symbol, shard)
+        for endpoint, params in params_by_endpoint.items():
+            shard.subscribe([endpoint], symbols, **params)
+
+    # Load
+
+    def _get_shard_load(self, shard):
+        # (Updated on each rebalance() for measured loads)
+        return self._load_by_shard[shard]
+
+    def _get_symbol_load(self, symbol):
+        # Measured items per second (if measured long enough) or estimated by endpoints
+        measuring_time_sec = time.time() - self._counting_start_time
+        count_key = symbol.upper() if symbol else symbol
+        if measuring_time_sec >= self.min_measuring_time_sec and count_key in self._item_count_by_symbol:
+            return self._item_count_by_symbol[count_key] / measuring_time_sec
+        params_by_endpoint = self._params_by_endpoint_by_symbol.get(symbol) or {}
+        return sum(self.message_rate_by_endpoint.get(endpoint, 1) for endpoint in params_by_endpoint)
+
+    # Processing
+
+    def _on_shard_item(self, item):
+        # (Merge items of all shards into one stream)
+        with self._lock:
+            symbol = getattr(item, "symbol", None)
+            self._item_count_by_symbol[symbol.upper() if symbol else symbol] += 1
+
+            if self.on_data_item:
+                self.on_data_item(item)
+
+    def _on_shard_data(self, items):
+        with self._lock:
+            if self.on_data:
+                self.on_data(items)
+
+    # Utility
+
+    def _get_subscribed_endpoints(self):
+        return {endpoint for params_by_endpoint in self._params_by_endpoint_by_symbol.values()
+                for endpoint in params_by_endpoint}
+
+    def _get_subscribed_symbols(self):
+        return {symbol for symbol in self._params_by_endpoint_by_symbol if symbol}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,222 @@
+import logging
+import time
+from threading import Thread, Event, RLock, current_thread
+
+from hyperquant.api import Platform, OrderStatus
+from hyperquant.clients import Order, Account, Balance, Error
+
+"""
+Local copy of open orders and balances of an account, so strategies can read
+them without requests to a platform.
+
+    client = BinanceRESTClient(api_key, api_secret)
+    state = AccountState(client, symbols=["ETHBTC"], reconcile_interval_sec=30)
+    state.start()
+    # (Updates state on success)
+    order = client.create_order("ETHBTC", OrderType.LIMIT, Direction.BUY, 0.03, 1)
+    state.get_open_orders("ETHBTC")
+    state.get_balance("BTC")
+    ...
+    state.close()
+
+State is seeded by fetch_orders(is_open=True) and fetch_account_info() and
+then updated by results of client's create_order(), cancel_order() and
+check_order() (also of create_orders() and cancel_orders()), got as the
+client's order listener until close(). Items
+of private WebSocket streams can be passed to on_data_item(). As not all
+changes can be seen locally (filled orders, deposits), state is reconciled
+with the platform every reconcile_interval_sec.
+"""
+
+# (Binance returns statuses as is)
+_closed_order_statuses = {
+    OrderStatus.CLOSED, OrderStatus.FILLED, OrderStatus.CANCELED, OrderStatus.REJECTED, OrderStatus.EXPIRED,
+    "FILLED", "CANCELED", "REJECTED", "EXPIRED",
+}
+
+
+def is_order_open(order):
+    return order.order_status not in _closed_order_statuses
+
+
+class AccountState:
+    """
+    Thread-safe.
+    """
+    _log_prefix = "AccountState"
+
+    # Settings:
+    # (Symbols to fetch open orders for; None - all at once, if supported by platform)
+    symbols = None
+    reconcile_interval_sec = 30
+
+    # State:
+    last_reconcile_time = None
+    reconcile_count = 0
+    _thread = None
+
+    def __init__(self, client, **kwargs) -> None:
+        super().__init__()
+        self.client = client
+
+        # Set up settings
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+        # {order_id: Order}
+        self._order_by_id = {}
+        # {symbol: {order_id: Order}}
+        self._orders_by_symbol = {}
+        # {symbol: Balance}
+        self._balance_by_symbol = {}
+        # {order_id: Order or None} changed locally while reconciling (None - removed)
+        self._changed_order_by_id = None
+        self._lock = RLock()
+        self._stop_event = Event()
+
+        # (Removed in close())
+        client.add_order_listener(self._on_order_result)
+
+        # Create logger
+        platform_name = Platform.get_platform_name_by_id(client.platform_id)
+        self.logger = logging.getLogger("%s.%s" % (self._log_prefix, platform_name))
+
+    # Reading
+
+    def get_order(self, order_id):
+        return self._order_by_id.get(str(order_id))
+
+    def get_open_orders(self, symbol=None):
+        with self._lock:
+            if symbol:
+                return list(self._orders_by_symbol.get(symbol, {}).values())
+            return list(self._order_by_id.values())
+
+    def get_balance(self, symbol):
+        return self._balance_by_symbol.get(symbol)
+
+    def get_balances(self):
+        with self._lock:
+            return list(self._balance_by_symbol.values())
+
+    # Updating
+
+    def update_order(self, order):
+        if not isinstance(order, Order) or order.item_id is None:
+            return
+        order_id = str(order.item_id)
+        with self._lock:
+            prev_order = self._order_by_id.pop(order_id, None)
+            if prev_order:
+                self._orders_by_symbol.get(prev_order.symbol, {}).pop(order_id, None)
+                # (Cancel and check responses may not contain all fields)
+                for name, value in vars(prev_order).items():
+                    if getattr(order, name, None) is None:
+                        setattr(order, name, value)
+
+            is_open = is_order_open(order)
+            if is_open:
+                self._order_by_id[order_id] = order
+                self._orders_by_symbol.setdefault(order.symbol, {})[order_id] = order
+            if self._changed_order_by_id is not None:
+                self._changed_order_by_id[order_id] = order if is_open else None
+
+    def update_account(self, account):
+        if not isinstance(account, Account) or account.balances is None:
+            return
+        with self._lock:
+            self._balance_by_symbol = {balance.symbol: balance for balance in account.balances}
+
+    def update_balance(self, balance):
+        if isinstance(balance, Balance):
+            with self._lock:
+                self._balance_by_symbol[balance.symbol] = balance
+
+    def on_data_item(self, item):
+        # For items of private WebSocket streams
+        if isinstance(item, Order):
+            self.update_order(item)
+        elif isinstance(item, Account):
+            self.update_account(item)
+        elif isinstance(item, Balance):
+            self.update_balance(item)
+
+    def reconcile(self):
+        # Replace local state with fetched from platform (returns False if failed)
+        with self._lock:
+            self._changed_order_by_id = {}
+        try:
+            orders = []
+            for symbol in self.symbols or [None]:
+                result = self.client.fetch_orders(symbol, is_open=True)
+                if isinstance(result, Error) or not isinstance(result, list):
+                    self.logger.error("Can't fetch open orders for symbol: %s. Error: %s", symbol, result)
+                    return False
+                orders += result
+            account = self.client.fetch_account_info()
+            if isinstance(account, Error):
+                self.logger.error("Can't fetch account info. Error: %s", account)
+                return False
+
+            with self._lock:
+                # (Keep changes made while fetching)
+                order_by_id = {str(order.item_id): order for order in orders if is_order_open(order)}
+                for order_id, order in self._changed_order_by_id.items():
+                    if order:
+                        order_by_id[order_id] = order
+                    else:
+                        order_by_id.pop(order_id, None)
+                self._order_by_id = order_by_id
+                self._orders_by_symbol = {}
+                for order_id, order in order_by_id.items():
+                    self._orders_by_symbol.setdefault(order.symbol, {})[order_id] = order
+                self.update_account(account)
+                self.last_reconcile_time = time.time()
+                self.reconcile_count += 1
+        finally:
+            with self._lock:
+                self._changed_order_by_id = None
+        self.logger.debug("Reconciled. Open orders: %s", len(self._order_by_id))
+        return True
+
+    def start(self):
+        if self._thread:
+            return
+        self._stop_event.clear()
+        self._thread = Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def close(self):
+        self.client.remove_order_listener(self._on_order_result)
+        if not self._thread:
+            return
+        self._stop_event.set()
+        if self._thread is not current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while True:
+            try:
+                self.reconcile()
+            except Exception as exception:
+                self.logger.exception("Error while reconciling state: %s", exception)
+            if self._stop_event.wait(self.reconcile_interval_sec):
+                return
+
+    # Client's orders
+
+    def _on_order_result(self, method_name, result):
+        # (See PrivatePlatformRESTClient.add_order_listener())
+        if method_name == "cancel_order" and isinstance(result, Order) and result.order_status is None:
+            # (Some platforms return only ids of canceled order)
+            result.order_status = OrderStatus.CANCELED
+        self.update_order(result)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
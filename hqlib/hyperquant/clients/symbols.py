@@ -0,0 +1,240 @@
+import json
+import logging
+import os
+import time
+from threading import RLock
+
+from hyperquant.api import Platform, DEFAULT_PRECISION
+from hyperquant.clients import Error
+
+"""
+Mapping between platforms' native symbols and canonical (base, quote) pairs.
+
+    registry = SymbolRegistry(path="/var/cache/hyperquant")
+    registry.load(binance_client)
+    registry.load(okex_client)
+    registry.get_pair(Platform.OKEX, "eth_btc")  # ("ETH", "BTC")
+    registry.get_platform_symbol(Platform.OKEX, ("ETH", "BTC"))  # "eth_btc"
+    registry.get_platform_symbol(Platform.OKEX, "ETHBTC")  # "eth_btc"
+    registry.get_platform_symbol(Platform.BINANCE, "eth/btc")  # "ETHBTC"
+    registry.get_symbol(Platform.OKEX, "eth_btc")  # "ETH/BTC"
+    registry.load_precisions(binance_client)
+    registry.get_precision(Platform.BINANCE, "ETH/BTC")  # (6, 3)
+
+    # (Converters of clients will convert symbols in params and subscriptions,
+    # and symbols of parsed items to canonical ones)
+    client = OkexRESTClient(symbol_registry=registry)
+    client.fetch_trades("ETHBTC")  # [Trade(symbol="ETH/BTC"), ...]
+
+Symbols of a platform are taken once from client.get_symbols() and saved to
+a file in path (if set), so next time they are loaded without requests until
+max_age_sec passes. Pairs are made by splitting native symbols by separator
+("eth_btc") or by known quote assets ("ETHBTC"). Precisions (decimal places
+of prices and amounts) are used by converters for fixed-point values.
+"""
+
+# (Longer first to split "ETHUSDT" as ETH/USDT, not ETHU/SDT)
+QUOTE_ASSETS = sorted(["BTC", "ETH", "BNB", "XRP", "OKB", "USDT", "USDC", "TUSD", "PAX", "USDS", "USD",
+                       "EUR", "GBP", "JPY"], key=len, reverse=True)
+# (Platform's asset names to canonical ones)
+ASSET_ALIASES = {"XBT": "BTC"}
+
+
+def split_symbol(symbol, quote_assets=QUOTE_ASSETS, asset_aliases=ASSET_ALIASES):
+    # "eth_btc", "ETHBTC", "XBTUSD", "tBTCUSD" -> ("ETH", "BTC"), ("ETH", "BTC"), ("BTC", "USD"),
+    # ("BTC", "USD"); None if unknown
+    if not symbol:
+        return None
+    if len(symbol) > 1 and symbol[0] == "t" and symbol[1:].isupper():
+        # (Bitfinex's trading pair prefix: "tBTCUSD")
+        symbol = symbol[1:]
+    symbol = symbol.upper()
+    for separator in ("_", "-", "/"):
+        if separator in symbol:
+            base, _, quote = symbol.partition(separator)
+            break
+    else:
+        # (Prefer bases of 3+ letters: "XBTUSD" is XBT/USD, not XB/TUSD)
+        quotes = [quote for quote in quote_assets if symbol.endswith(quote) and len(symbol) - len(quote) >= 2]
+        if not quotes:
+            return None
+        quote = next((quote for quote in quotes if len(symbol) - len(quote) >= 3), quotes[0])
+        base = symbol[:-len(quote)]
+    if not base or not quote:
+        return None
+    return asset_aliases.get(base, base), asset_aliases.get(quote, quote)
+
+
+class SymbolRegistry:
+    """
+    Thread-safe, can be shared by several clients.
+    """
+    _log_prefix = "SymbolRegistry"
+
+    # Settings:
+    # (Directory for files of symbols; None - memory only)
+    path = None
+    max_age_sec = 24 * 60 * 60
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__()
+
+        # Set up settings
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+        # {platform_id: {native_symbol: (base, quote)}}
+        self._pair_by_symbol_by_platform = {}
+        # {platform_id: {(base, quote) or "BASE/QUOTE" or "BASEQUOTE" or native_symbol.upper(): native_symbol}}
+        self._symbol_by_key_by_platform = {}
+        # {platform_id: {native_symbol: (price_precision, amount_precision)}}
+        self._precision_by_symbol_by_platform = {}
+        self._lock = RLock()
+        if self.path:
+            os.makedirs(self.path, exist_ok=True)
+
+        self.logger = logging.getLogger(self._log_prefix)
+
+    def load(self, client, is_refresh=False):
+        # Load symbols from file or from platform (returns False if failed)
+        platform_id = client.platform_id
+        if not is_refresh and self._load_file(platform_id):
+            return True
+
+        symbols = client.get_symbols()
+        if isinstance(symbols, Error) or not symbols:
+            self.logger.warning("Can't get symbols for platform: %s. Result: %s",
+                                Platform.get_platform_name_by_id(platform_id), symbols)
+            return False
+        self.set_symbols(platform_id, [(symbol, split_symbol(symbol)) for symbol in symbols])
+        self._save_file(platform_id)
+        return True
+
+    def load_precisions(self, client, is_refresh=False):
+        # Load precisions of symbols from platform if not loaded yet (returns False if failed)
+        platform_id = client.platform_id
+        if not is_refresh:
+            if not self._precision_by_symbol_by_platform.get(platform_id):
+                self._load_file(platform_id)
+            if self._precision_by_symbol_by_platform.get(platform_id):
+                return True
+
+        precision_by_symbol = client.get_precisions()
+        if isinstance(precision_by_symbol, Error) or not precision_by_symbol:
+            self.logger.warning("Can't get precisions for platform: %s. Result: %s",
+                                Platform.get_platform_name_by_id(platform_id), precision_by_symbol)
+            return False
+        self.set_precisions(platform_id, precision_by_symbol)
+        self._save_file(platform_id)
+        return True
+
+    def set_symbols(self, platform_id, symbols_and_pairs):
+        # symbols_and_pairs: [(native_symbol, (base, quote) or None), ...]
+        pair_by_symbol = {}
+        symbol_by_key = {}
+        for symbol, pair in symbols_and_pairs:
+            pair = tuple(pair) if pair else None
+            pair_by_symbol[symbol] = pair
+            symbol_by_key[symbol.upper()] = symbol
+        # (Native symbols have priority over pairs)
+        for symbol, pair in pair_by_symbol.items():
+            if pair:
+                for key in (pair, "%s/%s" % pair, "%s%s" % pair):
+                    symbol_by_key.setdefault(key, symbol)
+        with self._lock:
+            self._pair_by_symbol_by_platform[platform_id] = pair_by_symbol
+            self._symbol_by_key_by_platform[platform_id] = symbol_by_key
+
+    def set_precisions(self, platform_id, precision_by_symbol):
+        # precision_by_symbol: {native_symbol: (price_precision, amount_precision)}
+        with self._lock:
+            self._precision_by_symbol_by_platform[platform_id] = {
+                symbol: tuple(precisions) for symbol, precisions in precision_by_symbol.items()}
+
+    def add(self, platform_id, symbol, pair=None):
+        with self._lock:
+            symbols_and_pairs = list(self._pair_by_symbol_by_platform.get(platform_id, {}).items())
+            symbols_and_pairs.append((symbol, pair or split_symbol(symbol)))
+            self.set_symbols(platform_id, symbols_and_pairs)
+
+    def get_symbols(self, platform_id):
+        return list(self._pair_by_symbol_by_platform.get(platform_id, ()))
+
+    def get_precisions(self, platform_id):
+        # {native_symbol: (price_precision, amount_precision)}
+        return dict(self._precision_by_symbol_by_platform.get(platform_id, {}))
+
+    def get_pair(self, platform_id, symbol):
+        # Native symbol (any case) -> (base, quote) or None
+        pair_by_symbol = self._pair_by_symbol_by_platform.get(platform_id)
+        if not pair_by_symbol or not symbol:
+            return None
+        if symbol not in pair_by_symbol:
+            symbol = self._symbol_by_key_by_platform[platform_id].get(symbol.upper(), symbol)
+        return pair_by_symbol.get(symbol)
+
+    def get_platform_symbol(self, platform_id, symbol):
+        # (base, quote), "BASE/QUOTE", "BASEQUOTE" or native symbol (any case) -> native symbol
+        # (Unknown symbols are returned as is)
+        symbol_by_key = self._symbol_by_key_by_platform.get(platform_id)
+        if not symbol_by_key or not symbol:
+            return symbol
+        if isinstance(symbol, str):
+            return symbol_by_key.get(symbol.upper(), symbol)
+        return symbol_by_key.get(tuple(symbol), symbol)
+
+    def get_symbol(self, platform_id, symbol):
+        # Any symbol (see get_platform_symbol()) -> canonical "BASE/QUOTE"
+        # (Unknown symbols and symbols without pair are returned as is)
+        pair = self.get_pair(platform_id, symbol)
+        return "%s/%s" % pair if pair else symbol
+
+    def get_precision(self, platform_id, symbol, default=(DEFAULT_PRECISION, DEFAULT_PRECISION)):
+        # Any symbol (see get_platform_symbol()) -> (price_precision, amount_precision)
+        precision_by_symbol = self._precision_by_symbol_by_platform.get(platform_id)
+        if not precision_by_symbol or not symbol:
+            return default
+        result = precision_by_symbol.get(symbol)
+        if result is None:
+            result = precision_by_symbol.get(self.get_platform_symbol(platform_id, symbol), default)
+        return result
+
+    # File
+
+    def _get_file_path(self, platform_id):
+        if not self.path:
+            return None
+        return os.path.join(self.path, "symbols_%s.json" % Platform.get_platform_name_by_id(platform_id).lower())
+
+    def _load_file(self, platform_id):
+        file_path = self._get_file_path(platform_id)
+        if not file_path or not os.path.exists(file_path):
+            return False
+        try:
+            with open(file_path) as file:
+                data = json.load(file)
+        except Exception as exception:
+            self.logger.error("Can't load symbols from: %s. Error: %s", file_path, exception)
+            return False
+        if time.time() - data["time"] > self.max_age_sec:
+            return False
+        if data.get("precisions"):
+            self.set_precisions(platform_id, data["precisions"])
+        if not data["symbols"]:
+            # (Only precisions were saved)
+            return False
+        self.set_symbols(platform_id, data["symbols"])
+        return True
+
+    def _save_file(self, platform_id):
+        file_path = self._get_file_path(platform_id)
+        if not file_path:
+            return
+        data = {"time": time.time(),
+                "symbols": list(self._pair_by_symbol_by_platform.get(platform_id, {}).items()),
+                "precisions": self._precision_by_symbol_by_platform.get(platform_id)}
+        # (Write and rename to not leave broken file)
+        tmp_file_path = file_path + ".tmp"
+        with open(tmp_file_path, "w") as file:
+            json.dump(data, file)
+        os.replace(tmp_file_path, file_path)
@@ -0,0 +1,106 @@
+import asyncio
+from unittest import TestCase
+
+import websockets
+
+from hyperquant.api import Endpoint
+from hyperquant.clients import Trade
+from hyperquant.clients.aio import BinanceAsyncWSClient, iterate_items
+from hyperquant.clients.mock import make_binance_trade_message
+
+
+class TestAsyncWSClient(TestCase):
+    message_count = 5
+
+    def setUp(self):
+        super().setUp()
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.paths = []
+
+    def tearDown(self):
+        self.loop.close()
+        super().tearDown()
+
+    async def _serve(self, ws, path):
+        self.paths.append(path)
+        for i in range(self.message_count):
+            await ws.send(make_binance_trade_message(i, path.split("/")[-1].split("@")[0].upper()))
+        await ws.wait_closed()
+
+    def _create_client(self, port):
+        client = BinanceAsyncWSClient(loop=self.loop)
+        client.converter.base_url = "ws://127.0.0.1:%s/" % port
+        return client
+
+    def test_iterate_items(self):
+        async def run():
+            server = await websockets.serve(self._serve, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            client1 = self._create_client(port)
+            client2 = self._create_client(port)
+            client1.subscribe([Endpoint.TRADE], ["ETHBTC"])
+            client2.subscribe([Endpoint.TRADE], ["BNBBTC"])
+
+            items = []
+            async for item in iterate_items(client1, client2):
+                items.append(item)
+                if len(items) == self.message_count * 2:
+                    client1.close()
+                    client2.close()
+
+            server.close()
+            await server.wait_closed()
+            return items
+
+        items = self.loop.run_until_complete(asyncio.wait_for(run(), 10))
+
+        self.assertEqual(len(items), self.message_count * 2)
+        self.assertTrue(all(isinstance(item, Trade) for item in items))
+        self.assertEqual({item.symbol for item in items}, {"ETHBTC", "BNBBTC"})
+        self.assertEqual(sorted(self.paths), ["/ws/bnbbtc@trade", "/ws/ethbtc@trade"])
+        # (Ordering for each client is kept)
+        for symbol in ("ETHBTC", "BNBBTC"):
+            self.assertEqual([int(item.item_id) for item in items if item.symbol == symbol],
+                             list(range(self.message_count)))
+
+    def _run_with_failing_callback(self, is_auto_reconnect):
+        async def run():
+            server = await websockets.serve(self._serve, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            client = self._create_client(port)
+            client.is_auto_reconnect = is_auto_reconnect
+            errors = []
+
+            def on_data_item(item):
+                if not errors:
+                    errors.append(item)
+                    raise Exception("Test error")
+
+            client.on_data_item = on_data_item
+            client.subscribe([Endpoint.TRADE], ["ETHBTC"])
+
+            items = []
+            async for item in iterate_items(client):
+                items.append(item)
+                if len(items) == self.message_count:
+                    client.close()
+
+            server.close()
+            await server.wait_closed()
+            return items
+
+        return self.loop.run_until_complete(asyncio.wait_for(run(), 10))
+
+    def test_reconnect_on_any_error(self):
+        items = self._run_with_failing_callback(True)
+
+        # (Items of the second connection)
+        self.assertEqual(len(self.paths), 2)
+        self.assertEqual([int(item.item_id) for item in items], list(range(self.message_count)))
+
+    def test_iterating_ends_on_error(self):
+        items = self._run_with_failing_callback(False)
+
+        self.assertEqual(len(self.paths), 1)
+        self.assertEqual(items, [])
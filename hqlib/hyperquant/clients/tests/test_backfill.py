@@ -0,0 +1,64 @@
+from unittest import TestCase
+
+from hyperquant.api import Platform
+from hyperquant.clients import Trade
+from hyperquant.clients.backfill import TradeBackfiller
+from hyperquant.clients.binance import BinanceWSClient
+from hyperquant.clients.tests.utils import wait_for
+
+
+def make_trade(item_id, symbol="ETHBTC"):
+    return Trade(Platform.BINANCE, symbol, 1540000000 + item_id, str(item_id), 0.03, 1)
+
+
+class HistoryRESTClient:
+    # (Fake REST client with trades 0..99; from_item is included as for Binance)
+    page_size = 10
+
+    def __init__(self):
+        self.requests = []
+
+    def fetch_trades_history(self, symbol, limit=None, from_item=None, **kwargs):
+        self.requests.append(from_item.item_id)
+        from_id = int(from_item.item_id)
+        return [make_trade(item_id, symbol) for item_id in range(from_id, min(from_id + self.page_size, 100))]
+
+
+class TestTradeBackfiller(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ws_client = BinanceWSClient()
+        self.rest_client = HistoryRESTClient()
+        self.backfiller = TradeBackfiller(self.ws_client, self.rest_client, max_wait_for_live_sec=1)
+        self.received = []
+        self.backfiller.on_data_item = self.received.append
+
+    def _receive(self, item_ids):
+        for item_id in item_ids:
+            self.ws_client._process_result([make_trade(item_id)])
+
+    def test_backfill(self):
+        self._receive(range(5))
+        self.ws_client.on_disconnect()
+        self.ws_client.on_connect()
+        # (Live data after reconnecting overlaps with fetched history)
+        self._receive(range(33, 40))
+
+        wait_for(lambda: not self.backfiller.is_backfilling)
+        self._receive(range(40, 45))
+
+        self.assertEqual([int(item.item_id) for item in self.received], list(range(45)))
+        self.assertEqual(self.rest_client.requests, ["4", "13", "22", "31"])
+
+    def test_several_gaps(self):
+        self._receive(range(5))
+        self.ws_client.on_disconnect()
+        self._receive(range(20, 25))
+        self.ws_client.on_disconnect()
+        self._receive(range(30, 35))
+        self.ws_client.on_connect()
+
+        wait_for(lambda: not self.backfiller.is_backfilling)
+
+        self.assertEqual([int(item.item_id) for item in self.received], list(range(35)))
@@ -0,0 +1,81 @@
+import time
+from unittest import TestCase
+
+from hyperquant.api import OrderType, Direction, ErrorCode
+from hyperquant.clients import Error, Order
+from hyperquant.clients.binance import BinanceRESTClient
+from hyperquant.clients.mock import MockExchangeServer
+
+
+class TestBatchOrders(TestCase):
+    order_count = 20
+
+    def setUp(self):
+        super().setUp()
+        self.server = MockExchangeServer(latency_sec=0.05)
+        self.server.start()
+        self.client = BinanceRESTClient("key", "secret")
+        self.server.set_up_client(self.client)
+        # (To not request server time in the middle)
+        self.client.get_server_timestamp()
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+        super().tearDown()
+
+    def _make_orders(self, count):
+        return [{"symbol": "ETHBTC", "order_type": OrderType.LIMIT, "direction": Direction.BUY,
+                 "price": "%.5f" % (0.03 + i / 100000), "amount": 1} for i in range(count)]
+
+    def test_create_and_cancel_orders(self):
+        orders = self._make_orders(self.order_count)
+        orders[3]["symbol"] = "XXXYYY"
+
+        start_time = time.time()
+        result = self.client.create_orders(orders)
+
+        # (Concurrent requests)
+        self.assertLess(time.time() - start_time, self.order_count * self.server.latency_sec / 2)
+        self.assertEqual(len(result), self.order_count)
+        self.assertIsInstance(result[3], Error)
+        self.assertEqual(result[3].code, ErrorCode.WRONG_SYMBOL)
+        created = result[:3] + result[4:]
+        self.assertTrue(all(isinstance(order, Order) for order in created))
+        # (In input order)
+        self.assertEqual([order.price for order in created], [order["price"] for order in orders[:3] + orders[4:]])
+        self.assertEqual(len({order.item_id for order in created}), self.order_count - 1)
+
+        result = self.client.cancel_orders(created + ["100500"])
+
+        self.assertEqual([order.item_id for order in result[:-1]], [order.item_id for order in created])
+        self.assertTrue(all(order.order_status == "CANCELED" for order in result[:-1]))
+        self.assertIsInstance(result[-1], Error)
+
+    def test_sequential(self):
+        self.client.max_batch_workers = 1
+
+        result = self.client.create_orders(self._make_orders(3))
+
+        self.assertEqual([int(order.item_id) for order in result], [1, 2, 3])
+        self.assertIsNone(self.client._batch_executor)
+        self.assertEqual(self.client.create_orders([]), [])
+
+    def test_exception_in_request(self):
+        create_order = self.client.create_order
+
+        def create_order_or_raise(**kwargs):
+            if kwargs["price"] is None:
+                raise ValueError("No price")
+            return create_order(**kwargs)
+
+        self.client.create_order = create_order_or_raise
+        orders = self._make_orders(3)
+        orders[1]["price"] = None
+
+        result = self.client.create_orders(orders)
+
+        self.assertIsInstance(result[0], Order)
+        self.assertIsInstance(result[1], Error)
+        self.assertEqual(result[1].code, ErrorCode.APP_ERROR)
+        self.assertIsInstance(result[2], Order)
@@ -1,7 +1,13 @@
-from hyperquant.api import Platform
-from hyperquant.clients import Error, ErrorCode
+import json
+from unittest import TestCase
+
+from hyperquant.api import Platform, Endpoint
+from hyperquant.clients import Error, ErrorCode, Signer
 from hyperquant.clients.binance import BinanceRESTClient, BinanceRESTConverterV1, BinanceWSClient, BinanceWSConverterV1
+from hyperquant.clients.mock import make_binance_trade_message
+from hyperquant.clients.pool import ParserPool
 from hyperquant.clients.tests.test_init import TestRESTClient, TestWSClient, TestConverter, TestRESTClientHistory
+from hyperquant.clients.tests.utils import wait_for
 
 
 # REST
@@ -9,6 +15,20 @@ from hyperquant.clients.tests.test_init import TestRESTClient, TestWSClient, Tes
 class TestBinanceRESTConverterV1(TestConverter):
     converter_class = BinanceRESTConverterV1
 
+    def test_generate_and_add_signature(self):
+        converter = self.converter_class()
+        platform_params = {"timestamp": 1499827319559, "symbol": "LTCBTC", "quantity": 1, "price": 0.1}
+        signer = Signer("secret")
+
+        result = converter.process_secured(Endpoint.ORDER, platform_params, "key", signer)
+
+        # (Sorted by key, signature of "price=0.1&quantity=1&symbol=LTCBTC&timestamp=1499827319559")
+        self.assertEqual(result, [
+            ("price", 0.1), ("quantity", 1), ("symbol", "LTCBTC"), ("timestamp", 1499827319559),
+            ("signature", "d24097017a76307be8e79eb2db354ff9886098c61a370e1b99accdfdd2a3219f")])
+        self.assertIsNone(converter.process_secured(Endpoint.ORDER, platform_params, None, signer))
+        self.assertIs(converter.process_secured(Endpoint.TRADE, platform_params, "key", signer), platform_params)
+
 
 class TestBinanceRESTClientV1(TestRESTClient):
     platform_id = Platform.BINANCE
@@ -51,3 +71,96 @@ class TestBinanceWSConverterV1(TestConverter):
 class TestBinanceWSClientV1(TestWSClient):
     platform_id = Platform.BINANCE
     # version = "1"
+
+
+class NotConnectingBinanceWSClient(BinanceWSClient):
+    # (To test subscription commands without connecting)
+    is_connected = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sent = []
+
+    def connect(self, version=None):
+        # (Makes subscriptions in URL)
+        self._get_connection_url()
+        self.is_started = True
+        self._on_open()
+
+    def close(self):
+        self.is_started = False
+
+    def _send(self, data):
+        self.sent.append(data)
+
+
+class TestBinanceWSClientSubscriptionV1(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = NotConnectingBinanceWSClient()
+
+    def test_subscribe_with_commands(self):
+        client = self.client
+        client.subscribe([Endpoint.TRADE], ["ETHBTC"])
+
+        # (Initial subscriptions are in URL)
+        self.assertEqual(client.sent, [])
+        self.assertEqual(client.successful_subscriptions, {"ethbtc@trade"})
+
+        client.subscribe([Endpoint.TRADE], ["BNBBTC"])
+
+        self.assertEqual(client.sent, [{"method": "SUBSCRIBE", "params": ["bnbbtc@trade"], "id": 1}])
+        self.assertEqual(client.pending_subscriptions, {"bnbbtc@trade"})
+
+        client._on_message(json.dumps({"result": None, "id": 1}))
+
+        self.assertEqual(client.pending_subscriptions, set())
+        self.assertEqual(client.successful_subscriptions, {"ethbtc@trade", "bnbbtc@trade"})
+
+        client.unsubscribe(symbols=["ETHBTC"])
+
+        self.assertEqual(client.sent[-1], {"method": "UNSUBSCRIBE", "params": ["ethbtc@trade"], "id": 2})
+        self.assertEqual(client.current_subscriptions, {"bnbbtc@trade"})
+        self.assertEqual(client.successful_subscriptions, {"bnbbtc@trade"})
+
+    def test_reading_url(self):
+        client = self.client
+        client.subscribe([Endpoint.TRADE], ["ETHBTC"])
+        client.subscribe([Endpoint.TRADE], ["BNBBTC"])
+
+        # (Doesn't change subscriptions made by connecting)
+        self.assertIn("bnbbtc@trade", client.url)
+        self.assertEqual(client._url_subscriptions, {"ethbtc@trade"})
+
+    def test_subscribe_error(self):
+        client = self.client
+        client.subscribe([Endpoint.TRADE], ["ETHBTC"])
+        client.subscribe([Endpoint.TRADE], ["WRONG"])
+
+        client._on_message(json.dumps({"code": 2, "msg": "Invalid request", "id": 1}))
+
+        self.assertEqual(client.pending_subscriptions, set())
+        self.assertEqual(client.failed_subscriptions, {"wrong@trade"})
+        self.assertEqual(client.successful_subscriptions, {"ethbtc@trade"})
+
+    def test_command_responses_with_parser_pool(self):
+        client = self.client
+        received = []
+        client.on_data_item = received.append
+        client.subscribe([Endpoint.TRADE], ["ETHBTC"])
+        client.subscribe([Endpoint.TRADE], ["BNBBTC"])
+        client.subscribe([Endpoint.TRADE], ["WRONG"])
+
+        with ParserPool(processes=1) as pool:
+            client.parser_pool = pool
+            client._on_message(json.dumps({"result": None, "id": 1}))
+            client._on_message(json.dumps({"code": 2, "msg": "Invalid request", "id": 2}))
+            client._on_message(make_binance_trade_message(1, "BNBBTC"))
+            wait_for(received, 1)
+
+        # (Acknowledged in this client, not in pool's one)
+        self.assertEqual(client.pending_subscriptions, set())
+        self.assertEqual(client.successful_subscriptions, {"ethbtc@trade", "bnbbtc@trade"})
+        self.assertEqual(client.failed_subscriptions, {"wrong@trade"})
+        self.assertEqual([item.symbol for item in received], ["BNBBTC"])
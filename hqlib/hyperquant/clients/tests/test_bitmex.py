@@ -1,5 +1,7 @@
 from hyperquant.api import Platform
-from hyperquant.clients.bitmex import BitMEXRESTConverterV1, BitMEXRESTClient, BitMEXWSClient, BitMEXWSConverterV1
+from hyperquant.clients import Signer
+from hyperquant.clients.bitmex import BitMEXRESTConverterV1, BitMEXRESTClient, BitMEXWSClient, BitMEXWSConverterV1, \
+    generate_signature
 from hyperquant.clients.tests.test_init import TestRESTClient, TestWSClient, TestConverter, TestRESTClientHistory
 
 
@@ -11,6 +13,13 @@ from hyperquant.clients.tests.test_init import TestRESTClient, TestWSClient, Tes
 class TestBitMEXRESTConverterV1(TestConverter):
     converter_class = BitMEXRESTConverterV1
 
+    def test_generate_signature(self):
+        # (Example from BitMEX API docs)
+        signature = generate_signature(Signer("chNOOS4KvNXR_Xq4k4c9qsfoKWvnDecLATCRlcBwyKDYnWgO"),
+                                       "GET", "/api/v1/instrument", 1518064236, "")
+
+        self.assertEqual(signature, "c7682d435d0cfe87c16098df34ef2eb5a549d4c5a3c2b1f0f77b8af73423bf00")
+
 
 class TestBitMEXRESTClientV1(TestRESTClient):
     platform_id = Platform.BITMEX
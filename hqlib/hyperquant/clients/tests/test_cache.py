@@ -0,0 +1,194 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+
+from hyperquant.api import Interval, Sorting
+from hyperquant.clients.binance import BinanceRESTClient
+from hyperquant.clients.bitfinex import BitfinexRESTClient
+from hyperquant.clients.cache import HistoryCache, _Series
+from hyperquant.clients.mock import MockExchangeServer
+from hyperquant.clients.tests.test_backfill import make_trade
+
+
+class TestHistoryCache(TestCase):
+
+    def test_get_missing_ranges(self):
+        series = _Series()
+        self.assertEqual(series.get_missing_ranges(10, 20), [(10, 20)])
+        self.assertEqual(series.get_missing_ranges(10, 10), [(10, 10)])
+
+        series.add(10, 20, [])
+        series.add(30, 40, [])
+        series.add(35, 50, [])
+
+        self.assertEqual(series.ranges, [(10, 20), (30, 50)])
+        self.assertEqual(series.get_missing_ranges(10, 10), [])
+        self.assertEqual(series.get_missing_ranges(12, 18), [])
+        self.assertEqual(series.get_missing_ranges(0, 100), [(0, 10), (20, 30), (50, 100)])
+        self.assertEqual(series.get_missing_ranges(15, 35), [(20, 30)])
+
+    def test_add_and_get_items(self):
+        cache = HistoryCache()
+
+        cache.add("key", 0, 5, [make_trade(i) for i in range(6)])
+        # (Overlapping items are not duplicated; incomplete range is not covered)
+        cache.add("key", 5, 10, [make_trade(i) for i in range(5, 9)], is_complete=False)
+
+        items = cache.get_items("key", make_trade(2).timestamp, make_trade(7).timestamp)
+        self.assertEqual([int(item.item_id) for item in items], list(range(2, 8)))
+        self.assertEqual(cache.get_missing_ranges("key", 0, 10), [(5, 10)])
+        self.assertEqual(cache.get_items("other", 0, 10), [])
+
+    def test_eviction_and_disk(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        cache = HistoryCache(path=path)
+        cache.add("key1", 0, 100, [make_trade(i) for i in range(100)])
+        series_size_bytes = cache.size_bytes
+        cache.max_size_bytes = series_size_bytes * 2
+
+        cache.add("key2", 0, 100, [make_trade(i) for i in range(100)])
+        cache.add("key3", 0, 100, [make_trade(i) for i in range(100)])
+
+        self.assertEqual(list(cache._series_by_key), ["key2", "key3"])
+        self.assertEqual(cache.size_bytes, series_size_bytes * 2)
+        # (Loaded from disk)
+        self.assertEqual(len(cache.get_items("key1", 0, 2000000000)), 100)
+        self.assertEqual(list(cache._series_by_key), ["key3", "key1"])
+        self.assertEqual(HistoryCache(path=path).get_missing_ranges("key2", 0, 100), [])
+
+    def test_items_are_copies(self):
+        cache = HistoryCache()
+        cache.add("key", 0, 5, [make_trade(i) for i in range(3)])
+
+        items = cache.get_items("key", 0, 2000000000)
+        items[0].symbol = "CHANGED"
+        items.reverse()
+
+        self.assertEqual([item.symbol for item in cache.get_items("key", 0, 2000000000)], ["ETHBTC"] * 3)
+        self.assertEqual(cache.get_items("key", 0, 2000000000)[0].item_id, "0")
+
+    def test_appending_to_file(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        cache = HistoryCache(path=path)
+        sizes = []
+
+        for i in range(0, 100, 10):
+            cache.add("key", i, i + 10, [make_trade(j) for j in range(i, i + 10)])
+            sizes.append(cache.size_bytes)
+
+        # (Size is counted by added records, and file is compacted only when doubled)
+        file_path = cache._get_file_path("key")
+        with open(file_path) as file:
+            lines = file.readlines()
+        self.assertLess(len(lines), 10)
+        self.assertEqual(os.path.getsize(file_path), sizes[-1])
+        self.assertTrue(all(json.loads(line) for line in lines))
+        loaded_cache = HistoryCache(path=path)
+        self.assertEqual(loaded_cache.get_items("key", 0, 2000000000), cache.get_items("key", 0, 2000000000))
+        self.assertEqual(loaded_cache.get_missing_ranges("key", 0, 100), [])
+
+    def test_broken_file(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        cache = HistoryCache(path=path)
+        with open(cache._get_file_path("key"), "w") as file:
+            file.write("not json")
+
+        self.assertEqual(cache.get_items("key", 0, 10), [])
+
+
+class TestCachedHistory(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.server = MockExchangeServer(trade_count=5000)
+        self.server.start()
+
+    def tearDown(self):
+        self.server.close()
+        super().tearDown()
+
+    def _create_client(self, client_class, **kwargs):
+        client = client_class(history_cache=HistoryCache(), **kwargs)
+        self.server.set_up_client(client)
+        return client
+
+    def test_fetch_candles(self):
+        client = self._create_client(BinanceRESTClient)
+        # (Candles start at 1540000020)
+        from_time, to_time = 1540000020 + 600, 1540000020 + 1800
+
+        candles1 = client.fetch_candles("ETHBTC", Interval.MIN_1, from_time=from_time, to_time=to_time)
+        candles2 = client.fetch_candles("ETHBTC", Interval.MIN_1, from_time=from_time, to_time=to_time)
+        self.assertEqual(self.server.request_count, 1)
+        # Only missing ranges are fetched
+        candles3 = client.fetch_candles("ETHBTC", Interval.MIN_1, limit=30,
+                                        from_time=from_time - 600, to_time=to_time + 600)
+
+        self.assertEqual(self.server.request_count, 3)
+        self.assertEqual([item.timestamp for item in candles1], list(range(from_time, to_time + 1, 60)))
+        self.assertEqual(candles1, candles2)
+        self.assertEqual([item.timestamp for item in candles3], list(range(from_time - 600, to_time + 600, 60))[:30])
+        self.assertEqual(candles3[0].interval, Interval.MIN_1)
+
+        # (Fixed-point items are cached separately)
+        fixed_point_client = BinanceRESTClient(history_cache=client.history_cache, is_fixed_point=True)
+        self.server.set_up_client(fixed_point_client)
+        candles4 = fixed_point_client.fetch_candles("ETHBTC", Interval.MIN_1, from_time=from_time, to_time=to_time)
+        self.assertEqual(self.server.request_count, 4)
+        self.assertIsInstance(candles4[0].price_open, int)
+        self.assertIsInstance(client.fetch_candles("ETHBTC", Interval.MIN_1, from_time=from_time,
+                                                   to_time=to_time)[0].price_open, str)
+
+    def test_fetch_trades_history_by_pages(self):
+        client = self._create_client(BitfinexRESTClient)
+        from_time, to_time = 1540000000 + 100, 1540000000 + 2600
+
+        trades = client.fetch_trades_history("ETHBTC", from_time=from_time, to_time=to_time,
+                                             sorting=Sorting.ASCENDING)
+        request_count = self.server.request_count
+        cached_trades = client.fetch_trades_history("ETHBTC", from_time=from_time, to_time=to_time,
+                                                    sorting=Sorting.ASCENDING)
+
+        self.assertGreater(request_count, 2)
+        self.assertEqual(self.server.request_count, request_count)
+        self.assertEqual([item.timestamp for item in trades], list(range(from_time, to_time + 1)))
+        self.assertEqual(cached_trades, trades)
+
+    def test_not_closed_tail(self):
+        # (Last trade is 1 sec ago)
+        self.server.start_timestamp_ms = int(time.time() - 5000) * 1000
+        client = self._create_client(BitfinexRESTClient, history_cache_delay_sec=60)
+        from_time = self.server.start_timestamp_ms // 1000 + 4500
+
+        trades1 = client.fetch_trades_history("ETHBTC", from_time=from_time, sorting=Sorting.ASCENDING)
+        request_count = self.server.request_count
+        trades2 = client.fetch_trades_history("ETHBTC", from_time=from_time, sorting=Sorting.ASCENDING)
+
+        # (Only the tail is fetched again)
+        self.assertEqual(self.server.request_count, request_count + 1)
+        self.assertEqual(trades1, trades2)
+        self.assertEqual([item.timestamp for item in trades2], list(range(from_time, from_time + 500)))
+
+    def test_time_range_ignored_by_platform(self):
+        # (Binance fetches trades history only by ids, so it's not cached by time)
+        client = self._create_client(BinanceRESTClient)
+        from_time, to_time = 1540000000 + 100, 1540000000 + 200
+        client.fetch_trades_history("ETHBTC", limit=10, from_time=from_time, to_time=to_time)
+        self.assertEqual(client.history_cache.size_bytes, 0)
+
+        # (Only the newest trades are returned, none of them in the range)
+        client = self._create_client(BitfinexRESTClient)
+        self.server.set_response("/bitfinex/v2/trades/tETHBTC/hist", [
+            [2, 1540009000000, 1.5, 0.0314], [1, 1540008000000, -0.5, 0.0313]])
+
+        trades = client.fetch_trades_history("ETHBTC", from_time=from_time, to_time=to_time)
+
+        self.assertEqual(trades, [])
+        key = list(client.history_cache._series_by_key)[0]
+        self.assertEqual(client.history_cache.get_missing_ranges(key, from_time, to_time), [(from_time, to_time)])
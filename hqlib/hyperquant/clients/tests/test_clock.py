@@ -0,0 +1,79 @@
+import time
+from unittest import TestCase
+
+from hyperquant.clients.binance import BinanceRESTClient
+from hyperquant.clients.clock import ServerClock
+from hyperquant.clients.mock import MockExchangeServer
+from hyperquant.clients.tests.utils import wait_for
+
+
+class TestServerClock(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.server = MockExchangeServer(time_offset_sec=100, latency_sec=0.02)
+        self.server.start()
+        self.client = BinanceRESTClient()
+        self.server.set_up_client(self.client)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+        super().tearDown()
+
+    def test_sync(self):
+        clock = ServerClock(self.client, sample_count=2)
+
+        self.assertFalse(clock.is_synced)
+        self.assertTrue(clock.sync())
+
+        self.assertEqual(self.server.request_count, 2)
+        self.assertTrue(clock.is_synced)
+        # (Error is not greater than RTT / 2 and timestamp rounding)
+        self.assertAlmostEqual(clock.offset_sec, 100, delta=clock.rtt_sec / 2 + 0.002)
+        self.assertGreaterEqual(clock.rtt_sec, 0.02)
+        self.assertAlmostEqual(clock.time(), time.time() + 100, delta=0.05)
+
+    def test_smoothing(self):
+        clock = ServerClock(self.client, sample_count=1, smoothing=0.5)
+        clock.sync()
+
+        self.server.time_offset_sec = 110
+        clock.sync()
+
+        self.assertAlmostEqual(clock.offset_sec, 105, delta=0.05)
+
+    def test_failed_sync(self):
+        self.server.inject_error(500, count=2)
+        clock = ServerClock(self.client, sample_count=2)
+
+        self.assertFalse(clock.sync())
+        self.assertFalse(clock.is_synced)
+        self.assertIsNone(clock.offset_sec)
+
+    def test_background_sync_used_by_client(self):
+        clock = ServerClock(self.client, sync_interval_sec=0.1, sample_count=1)
+        with clock:
+            wait_for(lambda: clock.sync_count >= 2, timeout_sec=3)
+            request_count = self.server.request_count
+
+            timestamp = self.client.get_server_timestamp()
+
+            # (No request to server)
+            self.assertEqual(self.server.request_count, request_count)
+            self.assertAlmostEqual(timestamp, time.time() + 100, delta=0.05)
+
+        self.assertIsNone(clock._thread)
+        request_count = self.server.request_count
+        time.sleep(0.2)
+        self.assertEqual(self.server.request_count, request_count)
+
+    def test_get_server_timestamp_without_clock(self):
+        timestamp = self.client.get_server_timestamp()
+
+        self.assertEqual(self.server.request_count, 1)
+        self.assertAlmostEqual(timestamp, time.time() + 100, delta=0.05)
+        # (Midpoint of request is used)
+        self.assertAlmostEqual(self.client._server_time_diff_s, 100, delta=0.02)
+        self.client.get_server_timestamp()
+        self.assertEqual(self.server.request_count, 1)
@@ -0,0 +1,127 @@
+import time
+from threading import Thread
+from unittest import TestCase
+
+from hyperquant.api import Endpoint
+from hyperquant.clients import Error
+from hyperquant.clients.binance import BinanceRESTClient
+from hyperquant.clients.mock import MockExchangeServer
+
+
+class TestRESTClientCoalescing(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.server = MockExchangeServer(trade_count=100, latency_sec=0.1)
+        self.server.start()
+
+    def tearDown(self):
+        self.server.close()
+        super().tearDown()
+
+    def _create_client(self, is_coalescing_enabled=True, **kwargs):
+        client = BinanceRESTClient(is_coalescing_enabled=is_coalescing_enabled, **kwargs)
+        self.server.set_up_client(client)
+        return client
+
+    def _fetch_concurrently(self, client, params_list):
+        results = [None] * len(params_list)
+
+        def fetch(index, params):
+            results[index] = client.fetch_trades("ETHBTC", **params)
+
+        threads = [Thread(target=fetch, args=(i, params)) for i, params in enumerate(params_list)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_identical_requests(self):
+        client = self._create_client()
+
+        results = self._fetch_concurrently(client, [{"limit": 3}] * 5 + [{"limit": 4}])
+
+        # (One request for limit=3 and one for limit=4)
+        self.assertEqual(self.server.request_count, 2)
+        self.assertEqual(client.coalesced_count, 4)
+        for result in results[:5]:
+            self.assertEqual(result, results[0])
+        self.assertEqual(len(results[0]), 3)
+        # (Own copy for each caller)
+        self.assertEqual(len({id(result) for result in results}), 6)
+        self.assertIsNot(results[0][0], results[1][0])
+        self.assertEqual(len(results[5]), 4)
+
+    def test_disabled(self):
+        # (By default)
+        client = BinanceRESTClient()
+        self.server.set_up_client(client)
+
+        self._fetch_concurrently(client, [{"limit": 3}] * 3)
+
+        self.assertEqual(self.server.request_count, 3)
+        self.assertEqual(client.coalesced_count, 0)
+
+    def test_not_coalesced_endpoints(self):
+        client = self._create_client(ttl_sec_by_endpoint={Endpoint.SERVER_TIME: 10, Endpoint.ACCOUNT: 10})
+        client.set_credentials("key", "secret")
+
+        for _ in range(2):
+            client._send("GET", Endpoint.SERVER_TIME)
+            client.fetch_account_info()
+
+        paths = [path for method, path, params in self.server.request_log]
+        self.assertEqual(paths.count("/binance/api/v3/account"), 2)
+        self.assertGreaterEqual(paths.count("/binance/api/v1/time"), 2)
+        self.assertEqual(client.coalesced_count, 0)
+
+    def test_error_shared_but_not_cached(self):
+        self.server.inject_error(500)
+        client = self._create_client(ttl_sec_by_endpoint={Endpoint.TRADE: 10})
+
+        results = self._fetch_concurrently(client, [{"limit": 3}] * 3)
+
+        self.assertEqual(self.server.request_count, 1)
+        self.assertTrue(all(isinstance(result, Error) for result in results))
+        self.assertIsInstance(client.fetch_trades("ETHBTC", limit=3), list)
+        self.assertEqual(self.server.request_count, 2)
+
+    def test_ttl(self):
+        self.server.latency_sec = 0
+        client = self._create_client(ttl_sec_by_endpoint={Endpoint.TRADE: 0.2})
+
+        trades = client.fetch_trades("ETHBTC", limit=3)
+        trades.reverse()
+        trades[0].symbol = "CHANGED"
+        cached_trades = client.fetch_trades("ETHBTC", limit=3)
+        self.assertEqual([item.item_id for item in cached_trades], [item.item_id for item in reversed(trades)])
+        self.assertEqual(cached_trades[-1].symbol, "ETHBTC")
+        self.assertEqual(self.server.request_count, 1)
+        # (Other params)
+        client.fetch_trades("ETHBTC", limit=4)
+        self.assertEqual(self.server.request_count, 2)
+
+        time.sleep(0.25)
+        client.fetch_trades("ETHBTC", limit=3)
+        self.assertEqual(self.server.request_count, 3)
+        # (Not cached endpoints)
+        client.fetch_candles("ETHBTC", "1m", limit=3)
+        client.fetch_candles("ETHBTC", "1m", limit=3)
+        self.assertEqual(self.server.request_count, 5)
+
+    def test_cached_results_removed(self):
+        self.server.latency_sec = 0
+        client = self._create_client(ttl_sec_by_endpoint={Endpoint.TRADE: 0.2}, max_cached_result_count=3)
+
+        for limit in range(1, 6):
+            client.fetch_trades("ETHBTC", limit=limit)
+        # (The oldest over max count)
+        self.assertEqual(len(client._cached_result_by_key), 3)
+        client.fetch_trades("ETHBTC", limit=5)
+        self.assertEqual(self.server.request_count, 5)
+
+        # (Expired)
+        time.sleep(0.25)
+        client.fetch_trades("ETHBTC", limit=10)
+        self.assertEqual(len(client._cached_result_by_key), 1)
@@ -0,0 +1,175 @@
+import json
+from unittest import TestCase
+
+from hyperquant.api import Endpoint, Platform, Interval
+from hyperquant.clients import Trade, Ticker, Candle
+from hyperquant.clients.hub import MarketDataHub
+from hyperquant.clients.symbols import SymbolRegistry
+from hyperquant.clients.tests.test_sharding import NotConnectingBinanceWSClient
+
+
+class TestMarketDataHub(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.created_clients = []
+        self.symbol_registry = None
+        self.hub = MarketDataHub(client_factory=self._create_client)
+
+    def tearDown(self):
+        self.hub.close()
+        super().tearDown()
+
+    def _create_client(self, platform_id):
+        client = NotConnectingBinanceWSClient(symbol_registry=self.symbol_registry)
+        self.created_clients.append(client)
+        return client
+
+    def _send_trade(self, symbol, trade_id=1):
+        self.hub.get_client(Platform.BINANCE)._on_message(json.dumps({
+            "e": "trade", "E": 1530448496789, "s": symbol, "t": trade_id, "p": "0.03", "q": "1",
+            "T": 1530448496789, "m": True}))
+
+    def _send_candle(self, symbol, interval):
+        self.hub.get_client(Platform.BINANCE)._on_message(json.dumps({
+            "e": "kline", "E": 1530448496789, "s": symbol, "k": {
+                "t": 1530448440000, "s": symbol, "i": interval, "o": "0.03", "c": "0.031", "h": "0.032",
+                "l": "0.029", "v": "10", "n": 5}}))
+
+    def _send_tickers(self, *symbols):
+        self.hub.get_client(Platform.BINANCE)._on_message(json.dumps({"stream": "!miniTicker@arr", "data": [
+            {"e": "24hrMiniTicker", "E": 1530448496789, "s": symbol, "c": "0.03"} for symbol in symbols]}))
+
+    def test_reference_counting(self):
+        subscription1 = self.hub.subscribe(Platform.BINANCE, [Endpoint.TRADE], ["ETHBTC"], lambda item: None)
+        subscription2 = self.hub.subscribe(Platform.BINANCE, [Endpoint.TRADE], ["ethbtc", "BNBBTC"],
+                                           lambda item: None)
+        client = self.hub.get_client(Platform.BINANCE)
+
+        # (One client for all consumers)
+        self.assertEqual(len(self.created_clients), 1)
+        self.assertEqual(len(client.current_subscriptions), 2)
+        self.assertEqual(self.hub.get_subscriber_count(Platform.BINANCE, Endpoint.TRADE, "ETHBTC"), 2)
+
+        self.hub.unsubscribe(subscription2)
+        self.assertEqual(len(client.current_subscriptions), 1)
+        self.assertEqual(self.hub.get_subscriber_count(Platform.BINANCE, Endpoint.TRADE, "ETHBTC"), 1)
+        self.assertEqual(self.hub.get_subscriber_count(Platform.BINANCE, Endpoint.TRADE, "BNBBTC"), 0)
+
+        # (Last consumer)
+        self.hub.unsubscribe(subscription1)
+        self.assertFalse(client.current_subscriptions)
+        self.assertIsNone(self.hub.get_client(Platform.BINANCE))
+        # (Repeated)
+        self.hub.unsubscribe(subscription1)
+
+    def test_fan_out(self):
+        received1, received2 = [], []
+        self.hub.subscribe(Platform.BINANCE, [Endpoint.TRADE], ["ETHBTC"], received1.append)
+        self.hub.subscribe(Platform.BINANCE, [Endpoint.TRADE, Endpoint.TICKER], ["ETHBTC", "BNBBTC"],
+                           received2.append)
+
+        self._send_trade("ETHBTC")
+        self._send_trade("BNBBTC", 2)
+        self._send_trade("EOSETH", 3)
+
+        self.assertEqual(len(received1), 1)
+        self.assertIsInstance(received1[0], Trade)
+        self.assertEqual([item.symbol for item in received2], ["ETHBTC", "BNBBTC"])
+        # (Same item object for all consumers, parsed once)
+        self.assertIs(received1[0], received2[0])
+        self.assertEqual(self.hub.dispatched_count, 2)
+
+    def test_routing_by_endpoint(self):
+        trades, tickers, all_tickers = [], [], []
+        self.hub.subscribe(Platform.BINANCE, [Endpoint.TRADE], ["ETHBTC"], trades.append)
+        self.hub.subscribe(Platform.BINANCE, [Endpoint.TICKER], ["ETHBTC"], tickers.append)
+        self.hub.subscribe(Platform.BINANCE, [Endpoint.TICKER_ALL], None, all_tickers.append)
+
+        self._send_tickers("ETHBTC", "BNBBTC")
+        self._send_trade("ETHBTC")
+
+        self.assertEqual(len(trades), 1)
+        self.assertEqual([item.symbol for item in tickers], ["ETHBTC"])
+        self.assertEqual([item.symbol for item in all_tickers], ["ETHBTC", "BNBBTC"])
+        self.assertTrue(all(isinstance(item, Ticker) for item in tickers + all_tickers))
+
+    def test_all_symbols(self):
+        # (Binance has no supported_symbols, so all symbols are taken from registry)
+        with self.assertRaises(Exception):
+            self.hub.subscribe(Platform.BINANCE, [Endpoint.TRADE], None, lambda item: None)
+        self.hub.close()
+        self.symbol_registry = SymbolRegistry()
+        self.symbol_registry.set_symbols(Platform.BINANCE, [("ETHBTC", ("ETH", "BTC")), ("BNBBTC", ("BNB", "BTC"))])
+        received_all, received = [], []
+
+        subscription = self.hub.subscribe(Platform.BINANCE, [Endpoint.TRADE], None, received_all.append)
+        self.hub.subscribe(Platform.BINANCE, [Endpoint.TRADE], ["ETHBTC"], received.append)
+        client = self.hub.get_client(Platform.BINANCE)
+        self.assertEqual(client.current_subscriptions, {"ethbtc@trade", "bnbbtc@trade"})
+        self._send_trade("BNBBTC")
+        self._send_trade("ETHBTC", 2)
+        self.assertEqual([item.symbol for item in received_all], ["BNB/BTC", "ETH/BTC"])
+        self.assertEqual([item.symbol for item in received], ["ETH/BTC"])
+
+        # (Symbols subscribed by others are kept)
+        self.hub.unsubscribe(subscription)
+        self.assertEqual(client.current_subscriptions, {"ethbtc@trade"})
+
+    def test_canonical_symbols(self):
+        self.symbol_registry = SymbolRegistry()
+        self.symbol_registry.set_symbols(Platform.BINANCE, [("ETHBTC", ("ETH", "BTC"))])
+        received1, received2 = [], []
+
+        self.hub.subscribe(Platform.BINANCE, [Endpoint.TRADE], ["ETH/BTC"], received1.append)
+        self.hub.subscribe(Platform.BINANCE, [Endpoint.TRADE], [("ETH", "BTC"), "ethbtc"], received2.append)
+        self._send_trade("ETHBTC")
+
+        self.assertEqual(len(self.hub.get_client(Platform.BINANCE).current_subscriptions), 1)
+        self.assertEqual(self.hub.get_subscriber_count(Platform.BINANCE, Endpoint.TRADE, "eth/btc"), 3)
+        self.assertEqual(len(received1), 1)
+        self.assertEqual(len(received2), 2)
+
+    def test_candles_by_interval(self):
+        received1, received5 = [], []
+        with self.assertRaises(Exception):
+            self.hub.subscribe(Platform.BINANCE, [Endpoint.CANDLE], ["ETHBTC"], received1.append)
+
+        self.hub.subscribe(Platform.BINANCE, [Endpoint.CANDLE], ["ETHBTC"], received1.append,
+                           interval=Interval.MIN_1)
+        subscription = self.hub.subscribe(Platform.BINANCE, [Endpoint.CANDLE], ["ETHBTC"], received5.append,
+                                          interval=Interval.MIN_5)
+        client = self.hub.get_client(Platform.BINANCE)
+        self._send_candle("ETHBTC", Interval.MIN_1)
+        self._send_candle("ETHBTC", Interval.MIN_5)
+
+        self.assertEqual(client.current_subscriptions, {"ethbtc@kline_1m", "ethbtc@kline_5m"})
+        self.assertEqual([item.interval for item in received1], [Interval.MIN_1])
+        self.assertEqual([item.interval for item in received5], [Interval.MIN_5])
+        self.assertIsInstance(received1[0], Candle)
+        self.hub.unsubscribe(subscription)
+        self.assertEqual(client.current_subscriptions, {"ethbtc@kline_1m"})
+
+    def test_unsubscribe_callback(self):
+        received1, received2 = [], []
+        subscription = self.hub.subscribe(Platform.BINANCE, [Endpoint.TRADE], ["ETHBTC"], received1.append)
+        self.hub.subscribe(Platform.BINANCE, [Endpoint.TRADE], ["ETHBTC"], received2.append)
+
+        self.hub.unsubscribe(subscription)
+        self._send_trade("ETHBTC")
+
+        self.assertEqual(len(received1), 0)
+        self.assertEqual(len(received2), 1)
+
+    def test_callback_error(self):
+        received = []
+
+        def fail(item):
+            raise Exception("Test error")
+
+        self.hub.subscribe(Platform.BINANCE, [Endpoint.TRADE], ["ETHBTC"], fail)
+        self.hub.subscribe(Platform.BINANCE, [Endpoint.TRADE], ["ETHBTC"], received.append)
+
+        self._send_trade("ETHBTC")
+
+        self.assertEqual(len(received), 1)
@@ -1,13 +1,19 @@
+import asyncio
+import hashlib
 import logging
 import time
 from datetime import datetime
+from threading import Thread
 from unittest import TestCase
 
+import websockets
+
 from hyperquant.api import Sorting, Interval, OrderType, Direction
 from hyperquant.clients import Error, ErrorCode, ParamName, ProtocolConverter, \
-    Endpoint, DataObject, Order, OrderBook
+    Endpoint, DataObject, Order, OrderBook, Signer
 from hyperquant.clients.tests.utils import wait_for, AssertUtil, set_up_logging
 from hyperquant.clients.utils import create_ws_client, create_rest_client
+from hyperquant.clients.binance import BinanceWSClient
 
 set_up_logging()
 
@@ -24,6 +30,39 @@ class TestConverter(TestCase):
     #     pass
 
 
+class TestSigner(TestCase):
+    # (Example from Binance API docs)
+    secret = "NhqPtmdSJYdKjVHjA7PZj4Mge3R5YNiP1e3UZjInClVN65XAbvqqM6A7H5fATj0j"
+    message = "symbol=LTCBTC&side=BUY&type=LIMIT&timeInForce=GTC&quantity=1&price=0.1&" \
+              "recvWindow=5000&timestamp=1499827319559"
+    signature = "c8db56825ae71d6d79447849e617115f4a920fa2acdcab2b053c4b2838bd6b71"
+
+    def test_sign(self):
+        signer = Signer(self.secret)
+
+        # (Keyed state is not changed by signing)
+        self.assertEqual(signer.sign(self.message), self.signature)
+        self.assertEqual(signer.sign(self.message.encode()), self.signature)
+        self.assertNotEqual(signer.sign("other"), self.signature)
+        self.assertEqual(signer.sign(self.message), self.signature)
+        self.assertEqual(len(Signer(self.secret, hashlib.sha384).sign(self.message)), 96)
+
+    def test_client_signer(self):
+        client = BinanceWSClient(api_key="key", api_secret=self.secret)
+        signer = client._signer
+
+        # (Created once for credentials and kept by the client)
+        self.assertIsInstance(signer, Signer)
+        self.assertEqual(signer.sign(self.message), self.signature)
+        self.assertIsNone(BinanceWSClient()._signer)
+
+        client.set_credentials("key", "other")
+        self.assertIsNot(client._signer, signer)
+        self.assertNotEqual(client._signer.sign(self.message), self.signature)
+        client.set_credentials(None, None)
+        self.assertIsNone(client._signer)
+
+
 # Common client
 
 class TestClient(TestCase):
@@ -1096,3 +1135,85 @@ class TestWSClient(TestClient):
         self.assertGreaterEqual(len(self.received_items), 1)
         for item in self.received_items:
             assertIsValidFun(item, symbols)
+
+
+class TestWSClientReconnection(TestCase):
+    # (Local server broadcasting same trades to all connections)
+
+    def setUp(self):
+        super().setUp()
+        self.paths = []
+        self.connections = set()
+        self.loop = asyncio.new_event_loop()
+        server_thread = Thread(target=self.loop.run_forever)
+        server_thread.daemon = True
+        server_thread.start()
+        self.server = asyncio.run_coroutine_threadsafe(self._start_server(), self.loop).result()
+
+        self.client = BinanceWSClient()
+        self.client.converter.base_url = "ws://127.0.0.1:%s/" % self.server.sockets[0].getsockname()[1]
+        self.received = []
+        self.client.on_data_item = self.received.append
+
+    def tearDown(self):
+        self.client.close()
+        asyncio.run_coroutine_threadsafe(self._stop_server(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        super().tearDown()
+
+    async def _start_server(self):
+        self.broadcasting = self.loop.create_task(self._broadcast())
+        return await websockets.serve(self._serve, "127.0.0.1", 0)
+
+    async def _stop_server(self):
+        self.broadcasting.cancel()
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _serve(self, ws, path):
+        self.paths.append(path)
+        self.connections.add(ws)
+        try:
+            await ws.wait_closed()
+        finally:
+            self.connections.discard(ws)
+
+    async def _broadcast(self):
+        from hyperquant.clients.mock import make_binance_trade_message
+
+        item_id = 0
+        while True:
+            message = make_binance_trade_message(item_id)
+            for ws in list(self.connections):
+                await ws.send(message)
+            item_id += 1
+            await asyncio.sleep(0.005)
+
+    def test_make_before_break(self):
+        self.client.subscribe([Endpoint.TRADE], ["ETHBTC"])
+        wait_for(lambda: len(self.received) >= 20)
+
+        self.client.reconnect()
+        wait_for(lambda: len(self.paths) == 2 and len(self.connections) == 1 and
+                 self.client._prev_ws is None)
+        wait_for(lambda: len(self.received) >= 100)
+
+        # (No gaps and no duplicates)
+        item_ids = [int(item.item_id) for item in self.received]
+        self.assertEqual(item_ids, list(range(item_ids[0], item_ids[0] + len(item_ids))))
+        self.assertEqual(self.paths, ["/ws/ethbtc@trade"] * 2)
+
+    def test_reconnect_delay(self):
+        self.client.reconnect_delay_sec = 2
+        self.client.max_reconnect_delay_sec = 5
+        self.client.reconnect_jitter = 0.5
+
+        delays = []
+        for tries in range(5):
+            self.client._reconnect_tries = tries
+            delays.append(self.client._get_reconnect_delay())
+
+        self.assertEqual(delays[0], 0)
+        for delay, max_delay in zip(delays[1:], [2, 4, 5, 5]):
+            self.assertGreater(delay, max_delay * 0.5)
+            self.assertLessEqual(delay, max_delay)
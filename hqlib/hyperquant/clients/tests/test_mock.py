@@ -0,0 +1,134 @@
+import time
+from unittest import TestCase
+
+import requests
+
+from hyperquant.api import ErrorCode, Sorting, Interval
+from hyperquant.clients import Error, Trade, Candle
+from hyperquant.clients.binance import BinanceRESTClient
+from hyperquant.clients.bitfinex import BitfinexRESTClient
+from hyperquant.clients.bitmex import BitMEXRESTClient
+from hyperquant.clients.mock import MockExchangeServer
+from hyperquant.clients.okex import OkexRESTClient
+
+
+class TestMockExchangeServer(TestCase):
+    symbol_by_client_class = {
+        BinanceRESTClient: "ETHBTC",
+        BitfinexRESTClient: "ETHBTC",
+        BitMEXRESTClient: "XBTUSD",
+        OkexRESTClient: "eth_btc",
+    }
+
+    def setUp(self):
+        super().setUp()
+        self.server = MockExchangeServer(trade_count=100)
+        self.server.start()
+
+    def tearDown(self):
+        self.server.close()
+        super().tearDown()
+
+    def _create_client(self, client_class=BinanceRESTClient):
+        client = client_class()
+        self.server.set_up_client(client)
+        return client
+
+    def test_fetch_trades(self):
+        for client_class, symbol in self.symbol_by_client_class.items():
+            client = self._create_client(client_class)
+
+            trades = client.fetch_trades(symbol, limit=3)
+            first_trade = min(trades, key=lambda item: item.timestamp)
+            history = client.fetch_trades_history(symbol, limit=3, from_item=first_trade, sorting=Sorting.ASCENDING)
+
+            for result in (trades, history):
+                self.assertEqual(len(result), 3, client_class)
+                self.assertTrue(all(isinstance(item, Trade) for item in result))
+                self.assertEqual({item.timestamp for item in result}, {1540000097, 1540000098, 1540000099})
+
+    def test_history_paging(self):
+        client = self._create_client()
+        item_ids = []
+
+        trades = client.fetch_trades_history("ETHBTC", limit=30, from_item=0)
+        while trades:
+            item_ids += [int(item.item_id) for item in trades if int(item.item_id) not in item_ids]
+            if len(trades) < 30:
+                break
+            trades = client.fetch_trades_history("ETHBTC", limit=30, from_item=trades[-1])
+
+        self.assertEqual(item_ids, list(range(100)))
+        self.assertEqual(self.server.request_count, 4)
+
+    def test_errors(self):
+        client = self._create_client()
+
+        result = client.fetch_trades("XXXYYY")
+
+        self.assertIsInstance(result, Error)
+        self.assertEqual(result.code, ErrorCode.WRONG_SYMBOL)
+
+        self.server.set_response("/binance/api/v1/trades", [])
+        self.assertEqual(client.fetch_trades("ETHBTC"), [])
+
+    def test_rate_limit(self):
+        self.server.rate_limit = 2
+        self.server.rate_limit_period_sec = 5
+        self.server.ban_after_rate_limit_count = 1
+        client = self._create_client()
+
+        results = [client.fetch_trades("ETHBTC", limit=1) for _ in range(4)]
+
+        self.assertIsInstance(results[1], list)
+        self.assertIsInstance(results[2], Error)
+        self.assertEqual(results[2].code, ErrorCode.RATE_LIMIT)
+        self.assertEqual(results[3].code, ErrorCode.IP_BAN)
+        self.assertGreater(client.delay_before_next_request_sec, 0)
+
+    def test_injected_error_and_latency(self):
+        self.server.latency_sec = 0.05
+        self.server.inject_error(429, retry_after_sec=3)
+        client = self._create_client(BitfinexRESTClient)
+
+        start_time = time.time()
+        result = client.fetch_trades("ETHBTC")
+
+        self.assertGreaterEqual(time.time() - start_time, 0.05)
+        self.assertIsInstance(result, Error)
+        self.assertEqual(client.delay_before_next_request_sec, 3)
+        self.assertIsInstance(client.fetch_trades("ETHBTC"), list)
+
+    def test_candles_ticker_order_book(self):
+        # (Clients of other platforms have no such endpoints yet, so request directly)
+        for path, check in [
+            ("binance/api/v1/klines?symbol=ETHBTC&interval=1m&limit=2", lambda data: len(data) == 2),
+            ("binance/api/v3/ticker/price?symbol=ETHBTC", lambda data: data["price"]),
+            ("binance/api/v1/depth?symbol=ETHBTC&limit=5", lambda data: len(data["asks"]) == 5),
+            ("okex/api/v1/kline.do?symbol=eth_btc&type=1min&size=2", lambda data: len(data[0]) == 6),
+            ("okex/api/v1/ticker.do?symbol=eth_btc", lambda data: data["ticker"]["last"]),
+            ("okex/api/v1/depth.do?symbol=eth_btc&size=5", lambda data: data["asks"][0][0] > data["asks"][-1][0]),
+            ("bitmex/api/v1/trade/bucketed?symbol=XBTUSD&binSize=1m&count=2", lambda data: data[0]["trades"]),
+            ("bitmex/api/v1/instrument?symbol=XBTUSD", lambda data: data[0]["lastPrice"]),
+            ("bitmex/api/v1/orderBook/L2?symbol=XBTUSD&depth=5", lambda data: len(data) == 10),
+            ("bitfinex/v1/pubticker/ethbtc", lambda data: data["last_price"]),
+            ("bitfinex/v1/book/ethbtc?limit_bids=5&limit_asks=5", lambda data: len(data["bids"]) == 5),
+            ("bitfinex/v2/candles/trade:1m:tETHBTC/hist?limit=2", lambda data: data[0][0] > data[1][0]),
+            ("bitfinex/v2/ticker/tETHBTC", lambda data: len(data) == 10),
+            ("bitfinex/v2/book/tETHBTC/P0?len=5", lambda data: len(data) == 10 and data[-1][2] < 0),
+        ]:
+            response = requests.get(self.server.url + path)
+
+            self.assertEqual(response.status_code, 200, path)
+            self.assertTrue(check(response.json()), path)
+
+    def test_fetch_candles(self):
+        for client_class, symbol in [(BinanceRESTClient, "ETHBTC"), (OkexRESTClient, "eth_btc")]:
+            client = self._create_client(client_class)
+
+            candles = client.fetch_candles(symbol, Interval.MIN_1, limit=2)
+
+            self.assertEqual(len(candles), 2, client_class)
+            self.assertTrue(all(isinstance(item, Candle) for item in candles))
+            # (Price of the last trade)
+            self.assertEqual(candles[-1].price_close, "0.03099000")
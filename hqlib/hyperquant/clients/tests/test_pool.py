@@ -0,0 +1,105 @@
+from unittest import TestCase
+
+from hyperquant.api import Platform
+from hyperquant.clients import Trade
+from hyperquant.clients.binance import BinanceWSClient
+from hyperquant.clients.mock import make_binance_trade_message
+from hyperquant.clients.pool import ParserPool, parse_message, decode_items, get_precisions
+from hyperquant.clients.symbols import SymbolRegistry
+from hyperquant.clients.tests.utils import wait_for
+
+
+class TestParserPool(TestCase):
+
+    def test_parse_message(self):
+        client = BinanceWSClient()
+        message = make_binance_trade_message(1)
+
+        items = decode_items(parse_message(Platform.BINANCE, client.version, False, message))
+        expected = client._decode_and_parse(message)
+
+        self.assertEqual(len(items), 1)
+        self.assertIsInstance(items[0], Trade)
+        self.assertEqual(items[0], expected)
+        self.assertEqual(items[0].price, expected.price)
+        self.assertEqual(items[0].amount, expected.amount)
+        self.assertEqual(items[0].symbol, "ETHBTC")
+
+    def test_ordering(self):
+        received = []
+        client = BinanceWSClient()
+        client.on_data_item = received.append
+
+        with ParserPool(processes=3) as pool:
+            client.parser_pool = pool
+            for i in range(100):
+                client._on_message(make_binance_trade_message(i, "ETHBTC" if i % 2 else "BNBBTC"))
+            wait_for(received, 100)
+
+        self.assertEqual([int(item.item_id) for item in received], list(range(100)))
+
+    def test_batches_by_client(self):
+        received1, received2 = [], []
+        client1, client2 = BinanceWSClient(), BinanceWSClient()
+        client1.on_data_item = received1.append
+        client2.on_data_item = received2.append
+        batch_sizes = []
+
+        with ParserPool(processes=2, max_batch_size=50) as pool:
+            parse_batch = pool._parse_batch
+            pool._parse_batch = lambda client, messages: (batch_sizes.append(len(messages)),
+                                                          parse_batch(client, messages))
+            client1.parser_pool = client2.parser_pool = pool
+            for i in range(200):
+                client1._on_message(make_binance_trade_message(i))
+                client2._on_message(make_binance_trade_message(1000 + i, "BNBBTC"))
+            wait_for(received1, 200)
+            wait_for(received2, 200)
+
+        self.assertEqual([int(item.item_id) for item in received1], list(range(200)))
+        self.assertEqual([int(item.item_id) for item in received2], list(range(1000, 1200)))
+        self.assertEqual(sum(batch_sizes), 400)
+        self.assertLess(len(batch_sizes), 400)
+        self.assertLessEqual(max(batch_sizes), 50)
+
+    def test_canonical_symbols(self):
+        received = []
+        symbol_registry = SymbolRegistry()
+        symbol_registry.set_symbols(Platform.BINANCE, [("ETHBTC", ("ETH", "BTC")), ("BNBBTC", ("BNB", "BTC"))])
+        client = BinanceWSClient(symbol_registry=symbol_registry)
+        client.on_data_item = received.append
+        message = make_binance_trade_message(1, "BNBBTC")
+
+        with ParserPool(processes=1) as pool:
+            client.parser_pool = pool
+            client._on_message(message)
+            wait_for(received, 1)
+
+        self.assertEqual(received[0].symbol, "BNB/BTC")
+        self.assertEqual(received[0].symbol, client._decode_and_parse(message).symbol)
+
+    def test_fixed_point(self):
+        received = []
+        symbol_registry = SymbolRegistry()
+        symbol_registry.set_symbols(Platform.BINANCE, [("ETHBTC", ("ETH", "BTC"))])
+        symbol_registry.set_precisions(Platform.BINANCE, {"ETHBTC": (6, 3)})
+        client = BinanceWSClient(symbol_registry=symbol_registry)
+        client.is_fixed_point = True
+        client.on_data_item = received.append
+        message = make_binance_trade_message(1)
+        expected = client._decode_and_parse(message)
+
+        items = decode_items(parse_message(Platform.BINANCE, client.version, False, message, get_precisions(client)))
+        self.assertIsInstance(items[0].price, int)
+        self.assertEqual(items[0].price, expected.price)
+        self.assertEqual(items[0].amount, expected.amount)
+
+        with ParserPool(processes=1) as pool:
+            client.parser_pool = pool
+            client._on_message(message)
+            wait_for(received, 1)
+
+        self.assertIsInstance(received[0].price, int)
+        self.assertEqual(received[0].price, expected.price)
+        self.assertEqual(received[0].amount, expected.amount)
+        self.assertEqual(received[0].symbol, "ETH/BTC")
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import time
+from unittest import TestCase
+
+from hyperquant.api import Endpoint
+from hyperquant.clients.binance import BinanceWSClient
+from hyperquant.clients.mock import make_binance_trade_message, make_okex_trade_message
+from hyperquant.clients.okex import OkexWSClient
+from hyperquant.clients.replay import FrameRecorder, ReplayServer, load_frames, measure_parsing
+from hyperquant.clients.tests.utils import wait_for
+
+
+class TestReplay(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        file, self.path = tempfile.mkstemp(suffix=".jsonl")
+        os.close(file)
+
+    def tearDown(self):
+        os.remove(self.path)
+        super().tearDown()
+
+    def _record(self, client, messages):
+        received = []
+        client.on_data_item = received.append
+        with FrameRecorder(client, self.path) as recorder:
+            for message in messages:
+                client._on_message(message)
+        self.assertEqual(recorder.frame_count, len(messages))
+        return received
+
+    def test_record_and_load(self):
+        messages = [make_binance_trade_message(i) for i in range(3)] + [make_okex_trade_message(3)]
+        self._record(BinanceWSClient(), messages[:3])
+        self._record(OkexWSClient(), messages[3:])
+
+        frames = load_frames(self.path)
+
+        self.assertEqual([message for _, message in frames], messages)
+        self.assertIsInstance(frames[-1][1], bytes)
+        timestamps = [timestamp for timestamp, _ in frames]
+        self.assertEqual(timestamps, sorted(timestamps))
+
+    def test_replay(self):
+        self._record(BinanceWSClient(), [make_binance_trade_message(i) for i in range(50)])
+        frames = load_frames(self.path)
+        # (Recorded in 0.5 sec)
+        frames = [(i * 0.01, message) for i, (_, message) in enumerate(frames)]
+
+        for speed, min_duration_sec in [(None, 0), (5, 0.49 / 5)]:
+            with ReplayServer(frames, speed=speed) as server:
+                client = BinanceWSClient()
+                client.converter.base_url = server.url
+                received = []
+                client.on_data_item = received.append
+                start_time = time.time()
+
+                client.subscribe([Endpoint.TRADE], ["ETHBTC"])
+                wait_for(received, 50)
+                client.close()
+
+                self.assertGreaterEqual(time.time() - start_time, min_duration_sec)
+                self.assertEqual([int(item.item_id) for item in received], list(range(50)))
+
+    def test_measure_parsing(self):
+        frames = [(0, make_binance_trade_message(i)) for i in range(100)]
+
+        items_per_sec = measure_parsing(BinanceWSClient(), frames, repeat=2)
+
+        self.assertGreater(items_per_sec, 0)
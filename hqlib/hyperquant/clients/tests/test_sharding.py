@@ -0,0 +1,89 @@
+from unittest import TestCase
+
+from hyperquant.api import Endpoint
+from hyperquant.clients import Trade
+from hyperquant.clients.binance import BinanceWSClient
+from hyperquant.clients.sharding import ShardedWSClient
+
+
+class NotConnectingBinanceWSClient(BinanceWSClient):
+    # (To test subscriptions without connecting)
+
+    def _subscribe(self, subscriptions):
+        pass
+
+    def _unsubscribe(self, subscriptions):
+        pass
+
+
+class TestShardedWSClient(TestCase):
+    symbols = ["SYM%sBTC" % i for i in range(10)]
+
+    def setUp(self):
+        super().setUp()
+        self.client = ShardedWSClient(NotConnectingBinanceWSClient, max_subscriptions_per_connection=4)
+        # (Use max_subscriptions_per_connection defined above)
+        self.client.converter.MAX_SUBSCRIPTIONS_PER_CONNECTION = None
+
+    def test_subscribe_by_count(self):
+        self.client.subscribe([Endpoint.TRADE, Endpoint.TICKER], self.symbols)
+
+        self.assertEqual(len(self.client.shards), 5)
+        self.assertEqual(len(self.client.current_subscriptions), 20)
+        for shard in self.client.shards:
+            self.assertLessEqual(len(shard.current_subscriptions), 4)
+        # (All subscriptions of a symbol are in the same shard)
+        for symbol in self.symbols:
+            shards = [shard for shard in self.client.shards
+                      if any(symbol.lower() in s for s in shard.current_subscriptions)]
+            self.assertEqual(len(shards), 1)
+
+    def test_subscribe_by_rate(self):
+        self.client.max_subscriptions_per_connection = 100
+        self.client.max_message_rate_per_connection = 25
+
+        self.client.subscribe([Endpoint.ORDER_BOOK_DIFF], self.symbols)
+
+        # (2 symbols of 10 items/sec in each)
+        self.assertEqual(len(self.client.shards), 5)
+        for shard in self.client.shards:
+            self.assertLessEqual(self.client._get_shard_load(shard), 25)
+
+    def test_unsubscribe_and_rebalance(self):
+        self.client.max_subscriptions_per_connection = 100
+        self.client.rebalance_ratio = 1
+        self.client.subscribe([Endpoint.TRADE], self.symbols)
+        self.assertEqual(len(self.client.shards), 1)
+        self.client._create_shard()
+        self.client.rebalance()
+
+        self.assertEqual([len(shard.current_subscriptions) for shard in self.client.shards], [5, 5])
+
+        self.client.unsubscribe(symbols=self.symbols[:5])
+
+        self.assertEqual(len(self.client.current_subscriptions), 5)
+        self.client.unsubscribe()
+        self.assertEqual(self.client.current_subscriptions, set())
+
+    def test_merging_items(self):
+        received = []
+        self.client.on_data_item = received.append
+        self.client.subscribe([Endpoint.TRADE], self.symbols)
+
+        for i, shard in enumerate(self.client.shards):
+            shard._process_result([Trade(symbol=self.symbols[i], item_id=str(i))])
+
+        self.assertEqual([item.item_id for item in received], [str(i) for i in range(len(self.client.shards))])
+
+    def test_running_totals(self):
+        self.client.subscribe([Endpoint.TRADE], self.symbols)
+        self.client.subscribe([Endpoint.TICKER], self.symbols[:3])
+        self.client.unsubscribe([Endpoint.TRADE], self.symbols[:2])
+        self.client.unsubscribe(symbols=self.symbols[5:7])
+
+        for shard in self.client.shards:
+            symbols = [symbol for symbol, s in self.client._shard_by_symbol.items() if s is shard]
+            self.assertEqual(self.client._symbol_count_by_shard[shard], len(symbols))
+            self.assertEqual(self.client._subscription_count_by_shard[shard], len(shard.current_subscriptions))
+            self.assertAlmostEqual(self.client._get_shard_load(shard),
+                                   sum(self.client._get_symbol_load(symbol) for symbol in symbols))
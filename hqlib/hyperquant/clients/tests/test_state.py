@@ -0,0 +1,132 @@
+from unittest import TestCase
+
+from hyperquant.api import OrderType, Direction, OrderStatus
+from hyperquant.clients import Order, Account, Balance
+from hyperquant.clients.binance import BinanceRESTClient
+from hyperquant.clients.mock import MockExchangeServer
+from hyperquant.clients.state import AccountState
+from hyperquant.clients.tests.utils import wait_for
+
+
+class TestAccountState(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.server = MockExchangeServer(balances={"BTC": "1.00000000", "ETH": "10.00000000"})
+        self.server.start()
+        self.client = BinanceRESTClient("key", "secret")
+        self.server.set_up_client(self.client)
+        self.state = AccountState(self.client)
+
+    def tearDown(self):
+        self.state.close()
+        self.client.close()
+        self.server.close()
+        super().tearDown()
+
+    def _create_order(self, symbol="ETHBTC", price="0.03000"):
+        return self.client.create_order(symbol, OrderType.LIMIT, Direction.BUY, price, 1)
+
+    def test_updated_by_client(self):
+        order1 = self._create_order()
+        order2 = self._create_order("BNBBTC")
+        self.client.create_order("ETHBTC", OrderType.LIMIT, Direction.BUY, "0.03", 1, True)
+
+        self.assertIs(self.state.get_order(order1.item_id), order1)
+        self.assertEqual(self.state.get_open_orders("ETHBTC"), [order1])
+        self.assertEqual(self.state.get_open_orders(), [order1, order2])
+
+        self.client.cancel_order(order1)
+        self.server.fill_order(order2.item_id)
+        self.assertEqual(self.state.get_open_orders(), [order2])
+        self.client.check_order(order2)
+
+        self.assertEqual(self.state.get_open_orders(), [])
+        self.assertIsNone(self.state.get_order(order1.item_id))
+
+    def test_updated_by_batch(self):
+        orders = self.client.create_orders([{"symbol": "ETHBTC", "order_type": OrderType.LIMIT,
+                                             "direction": Direction.SELL, "price": "0.04", "amount": 1}] * 5)
+        self.assertEqual(len(self.state.get_open_orders("ETHBTC")), 5)
+
+        self.client.cancel_orders(orders[:3])
+
+        self.assertEqual({order.item_id for order in self.state.get_open_orders()},
+                         {order.item_id for order in orders[3:]})
+
+    def test_close(self):
+        other_state = AccountState(self.client)
+        self.assertEqual(len(self.client._order_listeners), 2)
+        order = self._create_order()
+        self.assertIs(other_state.get_order(order.item_id), order)
+
+        # (No more updates, other states are still updated)
+        other_state.close()
+        order = self._create_order()
+        self.assertIsNone(other_state.get_order(order.item_id))
+        self.assertIs(self.state.get_order(order.item_id), order)
+        self.assertEqual(len(self.client._order_listeners), 1)
+        self.assertNotIn("create_order", vars(self.client))
+
+    def test_reconcile(self):
+        # (Created not by this client)
+        other_client = BinanceRESTClient("key", "secret")
+        self.server.set_up_client(other_client)
+        other_order = other_client.create_order("ETHBTC", OrderType.LIMIT, Direction.BUY, "0.03", 1)
+        order = self._create_order()
+        self.server.fill_order(order.item_id)
+        self.assertEqual(len(self.state.get_open_orders()), 1)
+        self.assertIsNone(self.state.get_balance("BTC"))
+
+        self.assertTrue(self.state.reconcile())
+
+        self.assertEqual([item.item_id for item in self.state.get_open_orders()], [other_order.item_id])
+        self.assertEqual(self.state.get_balance("BTC").amount_available, "1.00000000")
+        self.assertEqual({balance.symbol for balance in self.state.get_balances()}, {"BTC", "ETH"})
+        self.assertEqual(self.state.reconcile_count, 1)
+        other_client.close()
+
+    def test_reconcile_in_background(self):
+        self.state.reconcile_interval_sec = 0.05
+        self.state.start()
+        wait_for(lambda: self.state.reconcile_count >= 1, timeout_sec=3)
+        self.assertIsNotNone(self.state.get_balance("ETH"))
+
+        self.server.balances = {"BTC": "2.00000000"}
+        reconcile_count = self.state.reconcile_count
+        wait_for(lambda: self.state.reconcile_count >= reconcile_count + 2, timeout_sec=3)
+
+        self.assertEqual(self.state.get_balance("BTC").amount_available, "2.00000000")
+        self.assertIsNone(self.state.get_balance("ETH"))
+
+    def test_ws_items(self):
+        order = Order(symbol="ETHBTC", item_id=5, order_status=OrderStatus.NEW)
+        self.state.on_data_item(order)
+        self.state.on_data_item(Balance(symbol="BTC", amount_available=3))
+        self.assertEqual(self.state.get_open_orders(), [order])
+        self.assertEqual(self.state.get_balance("BTC").amount_available, 3)
+
+        # (Fields not sent are taken from previous state)
+        self.state.on_data_item(Order(item_id=5, order_status=OrderStatus.PARTIALLY_FILLED, amount_executed=1))
+        self.assertEqual(self.state.get_order(5).symbol, "ETHBTC")
+        self.assertEqual(self.state.get_open_orders("ETHBTC")[0].amount_executed, 1)
+
+        self.state.on_data_item(Order(symbol="ETHBTC", item_id=5, order_status=OrderStatus.FILLED))
+        self.state.on_data_item(Account(balances=[Balance(symbol="ETH", amount_available=1)]))
+        self.assertEqual(self.state.get_open_orders(), [])
+        self.assertIsNone(self.state.get_balance("BTC"))
+
+    def test_changes_while_reconciling(self):
+        fetch_orders = self.client.fetch_orders
+        created = []
+
+        def fetch_orders_and_create(*args, **kwargs):
+            result = fetch_orders(*args, **kwargs)
+            created.append(self._create_order())
+            return result
+
+        self.client.fetch_orders = fetch_orders_and_create
+
+        self.state.reconcile()
+
+        self.assertEqual(self.state.get_open_orders(), created)
@@ -0,0 +1,199 @@
+import shutil
+import tempfile
+from unittest import TestCase
+
+from hyperquant.api import Platform, Endpoint
+from hyperquant.clients.binance import BinanceRESTClient, BinanceWSClient
+from hyperquant.clients.mock import MockExchangeServer, make_binance_trade_message, make_okex_trade_message
+from hyperquant.clients.okex import OkexRESTClient, OkexWSClient
+from hyperquant.clients.symbols import SymbolRegistry, split_symbol
+
+
+class TestSymbolRegistry(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.path = tempfile.mkdtemp()
+        self.server = MockExchangeServer()
+        self.server.start()
+        self.registry = SymbolRegistry(path=self.path)
+        self.registry.set_symbols(Platform.OKEX, [(symbol, split_symbol(symbol))
+                                                  for symbol in ["eth_btc", "bnb_usdt", "ltc_btc"]])
+
+    def tearDown(self):
+        self.server.close()
+        shutil.rmtree(self.path)
+        super().tearDown()
+
+    def _create_client(self, client_class=BinanceRESTClient):
+        client = client_class(symbol_registry=self.registry)
+        self.server.set_up_client(client)
+        return client
+
+    def test_split_symbol(self):
+        self.assertEqual(split_symbol("eth_btc"), ("ETH", "BTC"))
+        self.assertEqual(split_symbol("ETHBTC"), ("ETH", "BTC"))
+        self.assertEqual(split_symbol("ETHUSDT"), ("ETH", "USDT"))
+        self.assertEqual(split_symbol("XBTUSD"), ("BTC", "USD"))
+        self.assertEqual(split_symbol("tBTCUSD"), ("BTC", "USD"))
+        self.assertEqual(split_symbol("TUSDBTC"), ("TUSD", "BTC"))
+        self.assertIsNone(split_symbol("XBTZ18"))
+        self.assertIsNone(split_symbol(".BXBT"))
+        self.assertIsNone(split_symbol(None))
+
+    def test_mapping(self):
+        registry = self.registry
+
+        self.assertEqual(registry.get_pair(Platform.OKEX, "eth_btc"), ("ETH", "BTC"))
+        self.assertEqual(registry.get_pair(Platform.OKEX, "ETH_BTC"), ("ETH", "BTC"))
+        self.assertIsNone(registry.get_pair(Platform.OKEX, "xxx_yyy"))
+        self.assertIsNone(registry.get_pair(Platform.BINANCE, "ETHBTC"))
+        for symbol in [("ETH", "BTC"), "ETH/BTC", "eth/btc", "ETHBTC", "ethbtc", "eth_btc", "ETH_BTC"]:
+            self.assertEqual(registry.get_platform_symbol(Platform.OKEX, symbol), "eth_btc", symbol)
+        # (Unknown symbols are not changed)
+        self.assertEqual(registry.get_platform_symbol(Platform.OKEX, "XXXYYY"), "XXXYYY")
+        self.assertEqual(registry.get_platform_symbol(Platform.BINANCE, "eth/btc"), "eth/btc")
+
+        registry.add(Platform.BITMEX, "XBTUSD")
+        registry.add(Platform.BITMEX, "XBTZ18", ("BTC", "USD.Z18"))
+        self.assertEqual(registry.get_platform_symbol(Platform.BITMEX, "BTC/USD"), "XBTUSD")
+        self.assertEqual(registry.get_platform_symbol(Platform.BITMEX, "BTC/USD.Z18"), "XBTZ18")
+        self.assertEqual(registry.get_symbols(Platform.BITMEX), ["XBTUSD", "XBTZ18"])
+
+    def test_load_and_cache_to_file(self):
+        client = self._create_client()
+
+        self.assertTrue(self.registry.load(client))
+        self.assertEqual(self.server.request_count, 1)
+        self.assertEqual(self.registry.get_platform_symbol(Platform.BINANCE, "eth/btc"), "ETHBTC")
+        self.assertEqual(self.registry.get_pair(Platform.BINANCE, "XBTUSD"), ("BTC", "USD"))
+
+        # (From file)
+        registry = SymbolRegistry(path=self.path)
+        self.assertTrue(registry.load(client))
+        self.assertEqual(self.server.request_count, 1)
+        self.assertEqual(registry.get_pair(Platform.BINANCE, "EOSETH"), ("EOS", "ETH"))
+
+        registry.max_age_sec = 0
+        self.assertTrue(registry.load(client))
+        self.assertEqual(self.server.request_count, 2)
+
+        self.server.inject_error(500)
+        self.assertFalse(SymbolRegistry().load(client))
+
+    def test_converters(self):
+        rest_client = OkexRESTClient(symbol_registry=self.registry)
+        params = rest_client.converter.preprocess_params(Endpoint.TRADE, {"symbol": "ETH/BTC"})
+        url, platform_params = rest_client.converter.make_url_and_platform_params(Endpoint.TRADE, params)
+        self.assertEqual(platform_params["symbol"], "eth_btc")
+
+        ws_client = OkexWSClient(symbol_registry=self.registry)
+        subscriptions = ws_client.converter.generate_subscriptions([Endpoint.TRADE], ["ETHBTC", ("LTC", "BTC")])
+        self.assertEqual({channel for channel, _ in subscriptions},
+                         {"ok_sub_spot_eth_btc_deals", "ok_sub_spot_ltc_btc_deals"})
+
+        # (Set after creating)
+        ws_client = BinanceWSClient()
+        ws_client.symbol_registry = self.registry
+        self.registry.set_symbols(Platform.BINANCE, [("ETHBTC", ("ETH", "BTC"))])
+        self.assertEqual(ws_client.converter.generate_subscriptions([Endpoint.TRADE], ["ETH/BTC"]),
+                         {"ethbtc@trade"})
+
+    def test_fetch_tickers(self):
+        client = self._create_client()
+        self.registry.load(client)
+        self.server.set_response("/binance/api/v3/ticker/price", [
+            {"symbol": "ETHBTC", "price": "0.03"}, {"symbol": "BNBBTC", "price": "0.001"},
+            {"symbol": "EOSETH", "price": "0.02"}])
+
+        tickers = client.fetch_tickers(["eth/btc", "EOSETH"])
+
+        self.assertEqual([ticker.symbol for ticker in tickers], ["ETH/BTC", "EOS/ETH"])
+
+    def test_canonical_symbols_of_items(self):
+        registry = self.registry
+        self.assertEqual(registry.get_symbol(Platform.OKEX, "eth_btc"), "ETH/BTC")
+        self.assertEqual(registry.get_symbol(Platform.OKEX, "ETHBTC"), "ETH/BTC")
+        self.assertEqual(registry.get_symbol(Platform.OKEX, "XXXYYY"), "XXXYYY")
+
+        # REST
+        client = self._create_client()
+        registry.load(client)
+        trades = client.fetch_trades("eth/btc")
+        self.assertTrue(trades)
+        self.assertEqual({trade.symbol for trade in trades}, {"ETH/BTC"})
+
+        # WS
+        ws_client = BinanceWSClient(symbol_registry=registry)
+        self.assertEqual(ws_client._decode_and_parse(make_binance_trade_message(1)).symbol, "ETH/BTC")
+        ws_client = OkexWSClient(symbol_registry=registry)
+        self.assertEqual([item.symbol for item in ws_client._decode_and_parse(make_okex_trade_message(1))],
+                         ["ETH/BTC"])
+
+    def test_precisions(self):
+        client = self._create_client()
+        self.assertEqual(self.registry.get_precision(Platform.BINANCE, "ETHBTC"), (8, 8))
+
+        self.assertTrue(self.registry.load_precisions(client))
+        self.assertTrue(self.registry.load_precisions(client))
+
+        self.assertEqual(self.server.request_count, 1)
+        self.assertEqual(self.registry.get_precision(Platform.BINANCE, "ETHBTC"), (6, 3))
+        self.assertEqual(self.registry.get_precision(Platform.OKEX, "eth_btc"), (8, 8))
+        # (From file)
+        registry = SymbolRegistry(path=self.path)
+        self.assertTrue(registry.load_precisions(client))
+        self.assertEqual(self.server.request_count, 1)
+        self.assertEqual(registry.get_precision(Platform.BINANCE, "EOSETH"), (6, 3))
+        self.assertTrue(registry.load(client))
+        self.assertEqual(self.server.request_count, 2)
+        self.assertEqual(registry.get_precision(Platform.BINANCE, "EOS/ETH"), (6, 3))
+
+        self.assertIsNone(OkexRESTClient().get_precisions())
+
+    def test_fixed_point_items(self):
+        client = self._create_client()
+        client.is_fixed_point = True
+        self.registry.load_precisions(client)
+        self.server.set_response("/binance/api/v1/trades", [
+            {"id": 1, "price": "0.03120000", "qty": "1.50000000", "time": 1500000000000, "isBuyerMaker": True}])
+        self.server.set_response("/binance/api/v1/depth", {
+            "lastUpdateId": 1, "bids": [["0.03110000", "2.00000000", []]], "asks": [["0.0313", "0.5", []]]})
+
+        trade = client.fetch_trades("ETHBTC")[0]
+        order_book = client.fetch_order_book("ETHBTC")
+
+        self.assertEqual((trade.price, trade.amount), (31200, 1500))
+        self.assertEqual([(item.price, item.amount) for item in order_book.asks + order_book.bids],
+                         [(31300, 500), (31100, 2000)])
+
+    def test_fixed_point_ws_items(self):
+        ws_client = BinanceWSClient(symbol_registry=self.registry, is_fixed_point=True)
+        self.registry.set_precisions(Platform.BINANCE, {"ETHBTC": (6, 3)})
+        data = {"e": "trade", "s": "ETHBTC", "t": 1, "p": "0.0312", "q": "1.5", "T": 1500000000000, "m": True}
+
+        trade = ws_client.converter.parse(None, data)
+        self.assertEqual((trade.price, trade.amount), (31200, 1500))
+
+        # (Default precisions for unknown symbols)
+        trade = ws_client.converter.parse(None, dict(data, s="BNBBTC"))
+        self.assertEqual((trade.price, trade.amount), (3120000, 150000000))
+
+        ws_client.is_fixed_point = False
+        self.assertEqual(ws_client.converter.parse(None, data).price, "0.0312")
+
+    def test_fixed_point_params(self):
+        client = self._create_client()
+        client.is_fixed_point = True
+        self.registry.set_precisions(Platform.BINANCE, {"ETHBTC": (6, 3)})
+
+        params = client.converter.preprocess_params(Endpoint.ORDER, {"symbol": "ETHBTC", "price": 31200,
+                                                                     "amount": 1500, "is_test": True})
+
+        self.assertEqual((params["price"], params["amount"], params["is_test"]), ("0.031200", "1.500", True))
+        # (Not fixed-point values are not changed)
+        params = client.converter.preprocess_params(Endpoint.ORDER, {"symbol": "BNBBTC", "price": "0.001"})
+        self.assertEqual(params["price"], "0.001")
+        client.is_fixed_point = False
+        params = client.converter.preprocess_params(Endpoint.ORDER, {"symbol": "ETHBTC", "price": 1})
+        self.assertEqual(params["price"], 1)
@@ -0,0 +1,114 @@
+import json
+import time
+from unittest import TestCase
+
+from hyperquant.clients import Ticker, Error
+from hyperquant.clients.binance import BinanceRESTClient, BinanceWSClient
+from hyperquant.clients.mock import MockExchangeServer
+from hyperquant.clients.tickers import TickerSnapshot
+
+
+class TestFetchTickers(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.server = MockExchangeServer()
+        self.server.start()
+        self.client = BinanceRESTClient()
+        self.server.set_up_client(self.client)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+        super().tearDown()
+
+    def _get_ticker_request_symbols(self):
+        return [params.get("symbol") for method, path, params in self.server.request_log
+                if path.endswith("ticker/price")]
+
+    def test_cost_model(self):
+        # (1 request with symbol is cheaper than 1 request for all symbols)
+        tickers = self.client.fetch_tickers(["ETHBTC"])
+        self.assertEqual([ticker.symbol for ticker in tickers], ["ETHBTC"])
+        self.assertEqual(self._get_ticker_request_symbols(), ["ETHBTC"])
+
+        # (2 requests are not)
+        self.server.request_log.clear()
+        tickers = self.client.fetch_tickers(["EOSETH", "ETHBTC"])
+        self.assertEqual({ticker.symbol for ticker in tickers}, {"EOSETH", "ETHBTC"})
+        self.assertEqual(self._get_ticker_request_symbols(), [None])
+
+        self.server.request_log.clear()
+        tickers = self.client.fetch_tickers()
+        self.assertEqual(len(tickers), len(self.server.symbols))
+        self.assertEqual(self._get_ticker_request_symbols(), [None])
+
+    def test_no_server_time_request(self):
+        tickers = self.client.fetch_tickers(["ETHBTC", "BNBBTC"])
+
+        self.assertEqual(self.server.request_count, 1)
+        self.assertAlmostEqual(tickers[0].timestamp, time.time(), delta=5)
+
+    def test_error(self):
+        self.server.inject_error(500)
+
+        self.assertIsInstance(self.client.fetch_tickers(["ETHBTC"]), Error)
+
+
+class TestTickerSnapshot(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.server = MockExchangeServer()
+        self.server.start()
+        self.ws_client = BinanceWSClient()
+        self.received = []
+        self.snapshot = TickerSnapshot(self.ws_client, on_data_item=self.received.append)
+        self.client = BinanceRESTClient(ticker_snapshot=self.snapshot)
+        self.server.set_up_client(self.client)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+        super().tearDown()
+
+    def _send_message(self, *symbols_and_prices):
+        timestamp_ms = int(time.time() * 1000)
+        self.ws_client._on_message(json.dumps({"stream": "!miniTicker@arr", "data": [
+            {"e": "24hrMiniTicker", "E": timestamp_ms, "s": symbol, "c": price}
+            for symbol, price in symbols_and_prices]}))
+
+    def test_from_snapshot(self):
+        self._send_message(("ETHBTC", "0.031"), ("BNBBTC", "0.0015"))
+        self._send_message(("ETHBTC", "0.032"))
+
+        tickers = self.client.fetch_tickers(["ethbtc", "BNBBTC"])
+
+        self.assertEqual(self.server.request_count, 0)
+        self.assertEqual([(ticker.symbol, ticker.price) for ticker in tickers],
+                         [("ETHBTC", "0.032"), ("BNBBTC", "0.0015")])
+        self.assertIsNotNone(tickers[0].timestamp)
+        self.assertEqual(len(self.received), 3)
+        self.assertIsInstance(self.received[0], Ticker)
+
+    def test_fallback_to_rest(self):
+        self._send_message(("ETHBTC", "0.031"))
+
+        # (No symbol in snapshot)
+        self.client.fetch_tickers(["BNBBTC"])
+        self.assertEqual(self.server.request_count, 1)
+
+        # (Stale)
+        self.snapshot.max_age_sec = 0
+        time.sleep(0.01)
+        self.client.fetch_tickers(["ETHBTC"])
+        self.assertEqual(self.server.request_count, 2)
+
+        # (Disconnected)
+        self.snapshot.max_age_sec = 5
+        self._send_message(("ETHBTC", "0.031"))
+        self.client.fetch_tickers(["ETHBTC"])
+        self.assertEqual(self.server.request_count, 2)
+        self.ws_client.on_disconnect()
+        self.client.fetch_tickers(["ETHBTC"])
+        self.assertEqual(self.server.request_count, 3)
@@ -0,0 +1,149 @@
+from unittest import TestCase
+
+from hyperquant import api
+from hyperquant.api import Endpoint, set_use_milliseconds, get_column_types, item_format_by_endpoint
+from hyperquant.clients import Trade
+from hyperquant.clients.binance import BinanceRESTClient, BinanceWSClient
+from hyperquant.clients.mock import MockExchangeServer
+from hyperquant.clients.bitmex import BitMEXRESTClient
+from hyperquant.clients.timestamps import TimestampCodec
+
+
+class TestTimestampCodec(TestCase):
+
+    def test_milliseconds(self):
+        codec = TimestampCodec(is_source_in_milliseconds=True)
+
+        self.assertEqual(codec.decode(1530448496789, True), 1530448496789)
+        self.assertEqual(codec.decode("1530448496789", True), 1530448496789)
+        self.assertEqual(codec.decode(1530448496789), 1530448496.789)
+        self.assertEqual(codec.encode(1530448496789, True), 1530448496789)
+        # (Not 1530448496788 as int(1530448496.789 * 1000))
+        self.assertEqual(codec.encode(1530448496.789), 1530448496789)
+        self.assertEqual(codec.encode(1.001), 1001)
+        for value in (None, 0):
+            self.assertEqual(codec.decode(value), value)
+            self.assertEqual(codec.encode(value), value)
+
+    def test_seconds(self):
+        codec = TimestampCodec()
+
+        self.assertEqual(codec.decode(1530448496, True), 1530448496000)
+        self.assertEqual(codec.decode("1530448496.789", True), 1530448496789)
+        self.assertEqual(codec.decode(1530448496.789), 1530448496.789)
+        self.assertEqual(codec.encode(1530448496789, True), 1530448496.789)
+        self.assertEqual(codec.encode(1530448496), 1530448496)
+
+    def test_timestring(self):
+        codec = TimestampCodec(is_source_in_timestring=True)
+
+        for value, expected in [
+            ("2018-07-01T12:34:56.789Z", 1530448496789),
+            ("2018-07-01T12:34:56.789", 1530448496789),
+            ("2018-07-01 12:34:56.7Z", 1530448496700),
+            ("2018-07-01T12:34:56.789999Z", 1530448496789),
+            ("2018-07-01T12:34:56Z", 1530448496000),
+            ("2018-07-01T12:34:56", 1530448496000),
+            # (By dateutil)
+            ("2018-07-01T15:34:56.789+03:00", 1530448496789),
+            ("2018-07-01", 1530403200000),
+            ("1 Jul 2018 12:34:56", 1530448496000),
+        ]:
+            self.assertEqual(codec.decode_ms(value), expected, value)
+        self.assertEqual(codec.decode("2018-07-01T12:34:56.789Z"), 1530448496.789)
+        self.assertEqual(codec.encode(1530448496789, True), "2018-07-01T12:34:56.789000")
+        self.assertEqual(codec.encode(1530448496), "2018-07-01T12:34:56")
+
+    def test_memo(self):
+        codec = TimestampCodec(is_source_in_timestring=True, max_memo_size=2)
+
+        for i in range(5):
+            self.assertEqual(codec.decode_ms("2018-07-01T12:34:5%s.%03dZ" % (i, i)),
+                             1530448490000 + i * 1001)
+            self.assertEqual(codec.decode_ms("2018-07-01T12:34:5%s.500Z" % i), 1530448490500 + i * 1000)
+        self.assertLessEqual(len(codec._seconds_by_prefix), 2)
+
+
+class TestConverterTimestamps(TestCase):
+
+    def test_bitmex(self):
+        converter = BitMEXRESTClient().converter
+        data = [{"timestamp": "2018-07-01T12:34:56.789Z", "symbol": "XBTUSD", "side": "Buy", "size": 10,
+                 "price": 6400.5, "trdMatchID": "id%s" % i} for i in range(3)]
+
+        items = converter.parse(Endpoint.TRADE, data)
+        self.assertEqual([item.timestamp for item in items], [1530448496.789] * 3)
+
+        converter.use_milliseconds = True
+        items = converter.parse(Endpoint.TRADE, data)
+        self.assertEqual([item.timestamp for item in items], [1530448496789] * 3)
+
+        url, params = converter.make_url_and_platform_params(Endpoint.TRADE, {"startTime": 1530448496789})
+        self.assertEqual(params["startTime"], "2018-07-01T12:34:56.789000")
+
+    def test_binance(self):
+        converter = BinanceRESTClient().converter
+        converter.use_milliseconds = True
+
+        item = converter.parse(Endpoint.TRADE, {"id": 1, "price": "0.03", "qty": "1", "time": 1530448496789})
+
+        self.assertEqual(item.timestamp, 1530448496789)
+
+
+class TestMillisecondsMode(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        set_use_milliseconds()
+
+    def tearDown(self):
+        set_use_milliseconds(False)
+        super().tearDown()
+
+    def test_items(self):
+        self.assertTrue(Trade().is_milliseconds)
+        self.assertFalse(Trade(is_milliseconds=False).is_milliseconds)
+
+        ws_client = BinanceWSClient()
+        trade = ws_client.converter.parse(None, {"e": "trade", "s": "ETHBTC", "t": 1, "p": "0.03", "q": "1",
+                                                 "T": 1530448496789, "m": True})
+        self.assertEqual(trade.timestamp, 1530448496789)
+        self.assertIsInstance(trade.timestamp, int)
+        self.assertTrue(trade.is_milliseconds)
+        self.assertEqual(hash(trade), hash(Trade(trade.platform_id, "ETHBTC", 1530448496789, "1")))
+
+        set_use_milliseconds(False)
+        self.assertFalse(BinanceWSClient().use_milliseconds)
+        self.assertFalse(Trade().is_milliseconds)
+
+    def test_rest_client(self):
+        server = MockExchangeServer()
+        server.start()
+        client = BinanceRESTClient()
+        server.set_up_client(client)
+        try:
+            trades = client.fetch_trades("ETHBTC")
+            tickers = client.fetch_tickers(["ETHBTC"])
+            server_timestamp = client.get_server_timestamp()
+        finally:
+            client.close()
+            server.close()
+
+        self.assertTrue(all(isinstance(item.timestamp, int) and item.is_milliseconds for item in trades + tickers))
+        self.assertIsInstance(server_timestamp, int)
+
+    def test_client_setting(self):
+        set_use_milliseconds(False)
+        client = BinanceRESTClient(use_milliseconds=True)
+
+        self.assertTrue(client.use_milliseconds)
+        # (For converters of all versions)
+        self.assertTrue(client.get_or_create_converter("3").use_milliseconds)
+
+    def test_column_types(self):
+        item_format = item_format_by_endpoint[Endpoint.TRADE]
+        self.assertTrue(api.use_milliseconds)
+
+        self.assertEqual(get_column_types(item_format)[2], "int64")
+        set_use_milliseconds(False)
+        self.assertEqual(get_column_types(item_format)[2], "float64")
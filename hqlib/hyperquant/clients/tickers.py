@@ -0,0 +1,89 @@
+import time
+from threading import RLock
+
+from hyperquant.api import Endpoint
+from hyperquant.clients import Ticker
+
+"""
+Latest tickers of all symbols received by WebSocket to not request them by
+REST API.
+
+    snapshot = TickerSnapshot(ws_client)
+    # (Instead of ws_client.on_data_item)
+    snapshot.on_data_item = lambda item: print(item)
+    snapshot.subscribe()
+    rest_client = BinanceRESTClient(ticker_snapshot=snapshot)
+    # (From snapshot if WS client is receiving data, otherwise from REST API)
+    tickers = rest_client.fetch_tickers(["ETHBTC", "BNBBTC"])
+
+Platforms send tickers of all symbols (Endpoint.TICKER_ALL) only for
+symbols changed since previous message, so a ticker received long ago is
+still actual while the connection is alive. That's why the snapshot is used
+only if any message was received in last max_age_sec.
+"""
+
+
+class TickerSnapshot:
+    """
+    Thread-safe.
+    """
+
+    # Settings:
+    max_age_sec = 5
+
+    on_data_item = None
+
+    # State:
+    last_receive_time = None
+
+    @property
+    def is_actual(self):
+        return self.last_receive_time is not None and time.time() - self.last_receive_time <= self.max_age_sec
+
+    def __init__(self, ws_client, **kwargs) -> None:
+        super().__init__()
+        self.ws_client = ws_client
+
+        # Set up settings
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+        # {symbol.upper(): Ticker}
+        self._ticker_by_symbol = {}
+        self._lock = RLock()
+
+        # Wrap client's callbacks
+        self._prev_on_disconnect = ws_client.on_disconnect
+        ws_client.on_disconnect = self._on_disconnect
+        ws_client.on_data_item = self._on_data_item
+
+    def subscribe(self):
+        self.ws_client.subscribe([Endpoint.TICKER_ALL])
+
+    def get_tickers(self, symbols=None):
+        # -> [Ticker, ...] in the order of symbols or None if snapshot is not actual or has no some of symbols
+        if not self.is_actual:
+            return None
+        with self._lock:
+            if not symbols:
+                return list(self._ticker_by_symbol.values())
+            result = [self._ticker_by_symbol.get(symbol.upper()) for symbol in symbols]
+        return result if all(result) else None
+
+    def _on_data_item(self, item):
+        if isinstance(item, Ticker) and item.symbol:
+            with self._lock:
+                self._ticker_by_symbol[item.symbol.upper()] = item
+                self.last_receive_time = time.time()
+
+        if self.on_data_item:
+            self.on_data_item(item)
+
+    def _on_disconnect(self):
+        # (Tickers can be changed while disconnected)
+        with self._lock:
+            self._ticker_by_symbol.clear()
+            self.last_receive_time = None
+
+        if self._prev_on_disconnect:
+            self._prev_on_disconnect()
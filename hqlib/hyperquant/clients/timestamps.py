@@ -0,0 +1,107 @@
+import calendar
+from datetime import datetime
+
+from dateutil import parser
+
+from hyperquant.api import to_fixed_point
+
+"""
+Conversion of timestamps between platforms' formats and ours.
+
+    codec = TimestampCodec(is_source_in_timestring=True)
+    codec.decode_ms("2018-07-01T12:34:56.789Z")  # 1530448496789
+    codec.decode("2018-07-01T12:34:56.789Z", use_milliseconds=False)  # 1530448496.789
+    codec.encode(1530448496789, use_milliseconds=True)  # "2018-07-01T12:34:56.789000"
+
+All values are converted through integer milliseconds, so 1530448496.789 can't
+become 1530448496788 because of float errors. ISO 8601 strings of fixed format
+("YYYY-MM-DDTHH:MM:SS[.fff][Z]", UTC) are parsed without dateutil, and seconds
+of recent "YYYY-MM-DDTHH:MM:SS" prefixes are memoized, as trades of a burst
+usually have the same second. Other strings are parsed by dateutil (strings
+without timezone are in UTC). Digits after milliseconds are dropped.
+"""
+
+
+class TimestampCodec:
+    """
+    Thread-safe. One for each converter.
+    """
+
+    # Settings:
+    is_source_in_milliseconds = False
+    is_source_in_timestring = False
+    # (Max count of memoized prefixes, cleared when reached)
+    max_memo_size = 1024
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__()
+
+        # Set up settings
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+        # {"YYYY-MM-DDTHH:MM:SS": seconds}
+        self._seconds_by_prefix = {}
+
+    def decode(self, value, use_milliseconds=False):
+        # Platform's timestamp -> our timestamp (int milliseconds or seconds)
+        ms = self.decode_ms(value)
+        if not ms or use_milliseconds:
+            return ms
+        return ms / 1000
+
+    def decode_ms(self, value):
+        # Platform's timestamp -> int milliseconds (None and 0 are returned as is)
+        if not value:
+            return value
+        if self.is_source_in_timestring:
+            return self.parse_iso_ms(value)
+        if self.is_source_in_milliseconds:
+            return int(value)
+        return to_fixed_point(value, 3)
+
+    def encode(self, timestamp, use_milliseconds=False):
+        # Our timestamp (milliseconds or seconds) -> platform's timestamp
+        if not timestamp:
+            return timestamp
+        if self.is_source_in_milliseconds:
+            return int(timestamp) if use_milliseconds else to_fixed_point(timestamp, 3)
+        if self.is_source_in_timestring:
+            return self.format_iso(int(timestamp) if use_milliseconds else to_fixed_point(timestamp, 3))
+        return timestamp / 1000 if use_milliseconds else timestamp
+
+    def parse_iso_ms(self, value):
+        # "2018-07-01T12:34:56.789Z" -> 1530448496789
+        prefix = value[:19]
+        seconds = self._seconds_by_prefix.get(prefix)
+        if seconds is None:
+            if len(prefix) != 19 or prefix[4] != "-" or prefix[7] != "-" or prefix[10] not in "T " or \
+                    prefix[13] != ":" or prefix[16] != ":":
+                return self._parse_iso_ms_slow(value)
+            try:
+                seconds = calendar.timegm((int(prefix[:4]), int(prefix[5:7]), int(prefix[8:10]),
+                                           int(prefix[11:13]), int(prefix[14:16]), int(prefix[17:19])))
+            except ValueError:
+                return self._parse_iso_ms_slow(value)
+            if len(self._seconds_by_prefix) >= self.max_memo_size:
+                self._seconds_by_prefix.clear()
+            self._seconds_by_prefix[prefix] = seconds
+
+        rest = value[19:]
+        if rest.endswith("Z"):
+            rest = rest[:-1]
+        if not rest:
+            return seconds * 1000
+        if rest[0] == "." and rest[1:].isdigit():
+            return seconds * 1000 + int(rest[1:4].ljust(3, "0"))
+        # (Timezone offset)
+        return self._parse_iso_ms_slow(value)
+
+    def format_iso(self, ms):
+        # 1530448496789 -> "2018-07-01T12:34:56.789000" (same as datetime.isoformat())
+        return datetime.utcfromtimestamp(ms // 1000).replace(microsecond=ms % 1000 * 1000).isoformat()
+
+    def _parse_iso_ms_slow(self, value):
+        dt = parser.parse(value)
+        # (utctimetuple() of naive datetime is the same as for UTC)
+        return calendar.timegm(dt.utctimetuple()) * 1000 + dt.microsecond // 1000
@@ -1,7 +1,14 @@
-from unittest import TestCase
+import gzip
+import json
+import time
+from decimal import Decimal
+from unittest import TestCase, mock, skipIf
 
-from hyperquant.api import item_format_by_endpoint, Endpoint, Direction, convert_items_obj_to_list, \
-    convert_items_dict_to_list, convert_items_list_to_dict, convert_items_obj_to_dict, ParamName
+from hyperquant.api import item_format_by_endpoint, Endpoint, Direction, ErrorCode, convert_items_obj_to_list, \
+    convert_items_dict_to_list, convert_items_list_to_dict, convert_items_obj_to_dict, ParamName, \
+    make_data_response, make_data_stream_response, parse_response_format, ResponseFormat, decode_msgpack_data, \
+    msgpack, ResponseCache, make_format_response, parse_accept_encoding, compress_response, brotli, to_fixed_point, \
+    from_fixed_point, get_precision_by_step, convert_items_to_fixed_point, set_use_milliseconds, parse_timestamp
 from hyperquant.clients import Trade, ItemObject
 
 
@@ -65,6 +72,73 @@ class TestConverting(TestCase):
         self._test_convert_items([None, None], [None, None], convert_items_obj_to_dict)
         self._test_convert_items(None, None, convert_items_obj_to_dict)
 
+    def test_convert_ragged_items(self):
+        # Items of different length in one list
+        self._test_convert_items([self.obj_items[0], None, self.obj_item_short],
+                                 [self.list_items[0], None, self.list_item_short], convert_items_obj_to_list)
+        self._test_convert_items([self.dict_items[0], None, self.dict_item_short],
+                                 [self.list_items[0], None, self.list_item_short], convert_items_dict_to_list)
+        self._test_convert_items([self.obj_items[0], None, self.obj_item_short],
+                                 [self.dict_items[0], None, self.dict_item_short], convert_items_obj_to_dict)
+
+    def test_convert_items_with_one_field_format(self):
+        self.item_format = [ParamName.SYMBOL]
+        symbols = [[item[ParamName.SYMBOL]] for item in self.dict_items]
+
+        self._test_convert_items(self.obj_items, symbols, convert_items_obj_to_list)
+        self._test_convert_items(self.dict_items, symbols, convert_items_dict_to_list)
+
+    def test_make_data_response(self):
+        for items in (self.obj_items, self.dict_items, self.list_items):
+            self._test_make_data_response(items, self.list_items, True)
+            self._test_make_data_response(items, self.dict_items, False)
+        # Item to items
+        self._test_make_data_response(self.obj_items[0], self.list_items[:1], True)
+        self._test_make_data_response(self.list_items[0], self.list_items[:1], True)
+
+        self._test_make_data_response([], [], True)
+        self._test_make_data_response(None, [], True)
+
+    def test_make_data_stream_response(self):
+        for items in (self.obj_items, self.dict_items, self.list_items):
+            for is_convert_to_list in (True, False):
+                # (By 1 item in chunk)
+                with mock.patch("hyperquant.api.STREAM_CHUNK_SIZE", 1):
+                    response = make_data_stream_response(iter(items), self.item_format, is_convert_to_list)
+                    content = b"".join(response.streaming_content)
+
+                    ndjson_response = make_data_stream_response(
+                        iter(items), self.item_format, is_convert_to_list, is_ndjson=True)
+                    ndjson_lines = b"".join(ndjson_response.streaming_content).decode().splitlines()
+
+                # (Same as not streaming response)
+                self.assertEqual(content, make_data_response(items, self.item_format, is_convert_to_list).content)
+                self.assertEqual([json.loads(line) for line in ndjson_lines],
+                                 self.list_items if is_convert_to_list else self.dict_items)
+
+        self.assertEqual(b"".join(make_data_stream_response([], self.item_format).streaming_content),
+                         make_data_response([], self.item_format).content)
+
+    def test_make_data_stream_response_error(self):
+        def generate_items():
+            yield from self.obj_items
+            raise Exception("DB error")
+
+        response = make_data_stream_response(generate_items(), self.item_format)
+        ndjson_response = make_data_stream_response(generate_items(), self.item_format, is_ndjson=True)
+
+        result = json.loads(b"".join(response.streaming_content).decode())
+        ndjson_result = [json.loads(line) for line in
+                         b"".join(ndjson_response.streaming_content).decode().splitlines()]
+        self.assertEqual(result["data"], self.list_items)
+        self.assertEqual(result["error"]["code"], ErrorCode.APP_ERROR)
+        self.assertEqual(ndjson_result, self.list_items + [{"error": result["error"]}])
+
+    def _test_make_data_response(self, items, expected, is_convert_to_list):
+        response = make_data_response(items, self.item_format, is_convert_to_list)
+
+        self.assertEqual(json.loads(response.content.decode()), {"data": expected})
+
     def _test_convert_items(self, items, expected, fun):
         result = fun(items, self.item_format)
 
@@ -109,3 +183,232 @@ class TestConvertingTrade(TestConverting):
     list_item_short = [None, "ETHUSD", 143423531, "14121214"]
     dict_item_short = {ParamName.PLATFORM_ID: None, ParamName.SYMBOL: "ETHUSD",
                        ParamName.TIMESTAMP: 143423531, ParamName.ITEM_ID: "14121214"}
+
+
+class TestResponseFormat(TestCase):
+    item_format = item_format_by_endpoint[Endpoint.TRADE]
+    list_items = TestConvertingTrade.list_items
+
+    def test_parse_response_format(self):
+        self.assertEqual(parse_response_format({}), ResponseFormat.JSON)
+        self.assertEqual(parse_response_format({}, "text/html, */*"), ResponseFormat.JSON)
+        self.assertEqual(parse_response_format({"response_format": "xxx"}), ResponseFormat.JSON)
+        self.assertEqual(parse_response_format({"response_format": "json"}, "application/msgpack"),
+                         ResponseFormat.JSON)
+        if msgpack:
+            self.assertEqual(parse_response_format({"response_format": "msgpack"}), ResponseFormat.MSGPACK)
+            self.assertEqual(parse_response_format({}, "application/x-msgpack;q=1.0, application/json"),
+                             ResponseFormat.MSGPACK)
+
+    @skipIf(not msgpack, "msgpack is not installed")
+    def test_make_msgpack_data_response(self):
+        for items in (TestConvertingTrade.obj_items, TestConvertingTrade.dict_items, self.list_items):
+            response = make_data_response(items, self.item_format, False, ResponseFormat.MSGPACK)
+
+            self.assertEqual(response["Content-Type"], "application/x-msgpack")
+            self.assertEqual(decode_msgpack_data(response.content), (self.item_format, [
+                [0, "ETHUSD", 143423531, "14121214", "23424546543.3", "1110.0034", Direction.SELL],
+                [2, "BNBUSD", 143423537, "15121215", "23.235656723", "0.0034345452", Direction.BUY]]))
+
+        # (Prices and amounts are not rounded to float64)
+        items = [[0, "ETHUSD", 143423531, "1", "9007199254740993.00000001", "0.12345678901234567", 1]]
+        response = make_data_response(items, self.item_format, False, ResponseFormat.MSGPACK)
+        self.assertEqual(decode_msgpack_data(response.content)[1], items)
+
+        # Short items and empty response
+        response = make_data_response([[1, "ETHUSD"], [2]], self.item_format, True, ResponseFormat.MSGPACK)
+        self.assertEqual(decode_msgpack_data(response.content)[1], [
+            [1, "ETHUSD", None, None, None, None, 0], [2, None, None, None, None, None, 0]])
+        response = make_data_response([], self.item_format, True, ResponseFormat.MSGPACK)
+        self.assertEqual(decode_msgpack_data(response.content), (self.item_format, []))
+
+
+class TestFixedPoint(TestCase):
+    item_format = item_format_by_endpoint[Endpoint.TRADE]
+
+    def test_to_fixed_point(self):
+        for value in ("0.03", "0.030", 0.03, Decimal("0.03"), "3E-2", ".03"):
+            self.assertEqual(to_fixed_point(value), 3000000, value)
+        self.assertEqual(to_fixed_point("-1.5", 2), -150)
+        self.assertEqual(to_fixed_point(-0.5, 2), -50)
+        self.assertEqual(to_fixed_point(7, 3), 7000)
+        self.assertEqual(to_fixed_point("6500"), 650000000000)
+        self.assertEqual(to_fixed_point("92233720368.54775807"), 9223372036854775807)
+        # (Rounded half to even)
+        self.assertEqual(to_fixed_point("0.125", 2), 12)
+        self.assertEqual(to_fixed_point("0.135", 2), 14)
+        self.assertIsNone(to_fixed_point(None))
+
+        self.assertEqual(from_fixed_point(3000000), Decimal("0.03"))
+        self.assertEqual(from_fixed_point(-150, 2), Decimal("-1.5"))
+        self.assertIsNone(from_fixed_point(None))
+
+    def test_get_precision_by_step(self):
+        self.assertEqual(get_precision_by_step("0.00100000"), 3)
+        self.assertEqual(get_precision_by_step("0.00000100"), 6)
+        self.assertEqual(get_precision_by_step("1.00000000"), 0)
+        self.assertEqual(get_precision_by_step(0.5), 1)
+        self.assertIsNone(get_precision_by_step(None))
+
+    def test_convert_items_to_fixed_point(self):
+        precision_by_symbol = {"ETHUSD": (2, 4)}
+        items = [[0, "ETHUSD", 143423531, "14121214", "231.45", "1.00345", Direction.SELL],
+                 [2, "BNBUSD", 143423537, "15121215", 23.235656723, 0.5, Direction.BUY],
+                 [1, "ETHUSD"], None]
+
+        result = convert_items_to_fixed_point(items, self.item_format,
+                                              lambda symbol: precision_by_symbol.get(symbol, (8, 8)))
+
+        self.assertEqual(result, [[0, "ETHUSD", 143423531, "14121214", 23145, 10034, Direction.SELL],
+                                  [2, "BNBUSD", 143423537, "15121215", 2323565672, 50000000, Direction.BUY],
+                                  [1, "ETHUSD"], None])
+        # (Not changed)
+        self.assertEqual(items[0][4], "231.45")
+
+    def test_make_data_response(self):
+        items = [[0, "ETHUSD", 143423531, "14121214", "231.45", "1.5", Direction.SELL]]
+
+        response = make_data_response(items, self.item_format, False, get_precision=lambda symbol: (2, 4))
+
+        self.assertEqual(json.loads(response.content.decode())["data"][0][ParamName.PRICE], 23145)
+
+    @skipIf(not msgpack, "msgpack is not installed")
+    def test_make_msgpack_data_response(self):
+        items = TestConvertingTrade.obj_items
+
+        response = make_data_response(items, self.item_format, True, ResponseFormat.MSGPACK,
+                                      lambda symbol: (2, 8))
+
+        self.assertEqual(msgpack.unpackb(response.content, raw=False)["types"][4:6], ["int64", "int64"])
+        self.assertEqual(decode_msgpack_data(response.content)[1], [
+            [0, "ETHUSD", 143423531, "14121214", 2342454654330, 111000340000, Direction.SELL],
+            [2, "BNBUSD", 143423537, "15121215", 2324, 343455, Direction.BUY]])
+
+
+class TestMillisecondsMode(TestCase):
+    item_format = item_format_by_endpoint[Endpoint.TRADE]
+
+    def tearDown(self):
+        set_use_milliseconds(False)
+        super().tearDown()
+
+    def test_parse_timestamp(self):
+        params = {"a": "1530448496789", "b": "1530448496789.0", "c": "2018-07-01T12:34:56.789Z"}
+        self.assertEqual(parse_timestamp(params, "c"), 1530448496.789)
+
+        set_use_milliseconds()
+
+        for name in params:
+            self.assertEqual(parse_timestamp(params, name), 1530448496789, name)
+            self.assertIsInstance(parse_timestamp(params, name), int)
+
+    def test_response_cache_is_immutable(self):
+        cache = ResponseCache(immutable_after_sec=60)
+        now = time.time()
+        self.assertTrue(cache.is_immutable(now - 100))
+        self.assertFalse(cache.is_immutable(now - 10))
+
+        set_use_milliseconds()
+
+        self.assertTrue(cache.is_immutable(int((now - 100) * 1000)))
+        self.assertFalse(cache.is_immutable(int((now - 10) * 1000)))
+        self.assertFalse(cache.is_immutable(None))
+
+    @skipIf(not msgpack, "msgpack is not installed")
+    def test_make_msgpack_data_response(self):
+        set_use_milliseconds()
+        items = [[0, "ETHUSD", 1530448496789, "14121214", "231.45", "1.5", Direction.SELL]]
+
+        response = make_data_response(items, self.item_format, True, ResponseFormat.MSGPACK)
+
+        self.assertEqual(msgpack.unpackb(response.content, raw=False)["types"][2], "int64")
+        self.assertEqual(decode_msgpack_data(response.content)[1], items)
+
+
+class TestResponseCache(TestCase):
+    item_format = item_format_by_endpoint[Endpoint.TRADE]
+    # (Bigger than COMPRESS_MIN_SIZE)
+    list_items = TestConvertingTrade.list_items * 50
+
+    def setUp(self):
+        super().setUp()
+        self.cache = ResponseCache(immutable_after_sec=60)
+        self.make_count = 0
+
+    def _make_response(self):
+        self.make_count += 1
+        return make_data_response(self.list_items, self.item_format)
+
+    def test_parse_accept_encoding(self):
+        self.assertEqual(parse_accept_encoding(None), None)
+        self.assertEqual(parse_accept_encoding("identity"), None)
+        self.assertEqual(parse_accept_encoding("gzip, deflate"), "gzip")
+        self.assertEqual(parse_accept_encoding("gzip;q=1.0, br;q=0"), "gzip")
+        self.assertEqual(parse_accept_encoding("gzip, deflate, br"), "br" if brotli else "gzip")
+
+    def test_compress_response(self):
+        content = self._make_response().content
+
+        response = compress_response(self._make_response(), "gzip")
+        small_response = compress_response(make_data_response(self.list_items[:1], self.item_format), "gzip")
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(gzip.decompress(response.content), content)
+        self.assertFalse(small_response.has_header("Content-Encoding"))
+
+    def test_make_format_response(self):
+        response1 = make_format_response(self.item_format)
+        response2 = make_format_response(list(self.item_format))
+
+        self.assertIsNot(response1, response2)
+        self.assertEqual(response1.content, response2.content)
+        self.assertEqual(json.loads(response1.content.decode())["item_format"], self.item_format)
+
+    def test_get_response(self):
+        to_time = time.time() - 100
+        key = self.cache.make_key(Endpoint.TRADE, [1, 2], ["ETHBTC"], to_time - 3600, to_time)
+
+        response1 = self.cache.get_response(key, to_time, self._make_response)
+        response2 = self.cache.get_response(key, to_time, self._make_response, accept_encoding="gzip")
+        response3 = self.cache.get_response(key, to_time, self._make_response,
+                                            if_none_match=response2["ETag"], accept_encoding="gzip")
+
+        self.assertEqual(self.make_count, 1)
+        self.assertEqual(response1.content, self._make_response().content)
+        self.assertIn("immutable", response1["Cache-Control"])
+        self.assertEqual(response2["ETag"], "W/" + response1["ETag"])
+        self.assertEqual(gzip.decompress(response2.content), response1.content)
+        self.assertEqual(response3.status_code, 304)
+        self.assertEqual(self.cache.size_bytes, len(response1.content) + len(response2.content))
+
+    def test_mutable_range(self):
+        to_time = time.time() - 10
+
+        for to_time in (to_time, None):
+            response1 = self.cache.get_response(("key",), to_time, self._make_response)
+            response2 = self.cache.get_response(("key",), to_time, self._make_response,
+                                                if_none_match=response1["ETag"])
+
+            self.assertFalse(response1.has_header("Cache-Control"))
+            self.assertEqual(response2.status_code, 304)
+        self.assertEqual(self.make_count, 4)
+        self.assertEqual(self.cache.size_bytes, 0)
+
+    def test_errors_not_cached(self):
+        self.cache.get_response(("key",), 0, lambda: make_data_response(Exception(), self.item_format))
+
+        self.assertEqual(self.cache.size_bytes, 0)
+
+    def test_eviction(self):
+        content_size = len(self._make_response().content)
+        self.cache.max_size_bytes = content_size * 2
+
+        for i in (1, 2, 1, 3):
+            self.cache.get_response((i,), 0, self._make_response)
+
+        self.assertEqual(self.make_count, 1 + 3)
+        self.assertEqual(self.cache.size_bytes, content_size * 2)
+        self.cache.get_response((1,), 0, self._make_response)
+        self.cache.get_response((2,), 0, self._make_response)
+        self.assertEqual(self.make_count, 4 + 1)